@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Benchmark the columnar ContactStore against the list-of-dicts contact path.
+
+Reports retained memory per contact (tracemalloc) and render throughput of
+compress_profile / format_full_profile for both representations. Uses the
+network DB, or a synthetic network of --synthetic N contacts. Examples:
+
+    python scripts/bench_contact_store.py
+    python scripts/bench_contact_store.py --synthetic 10000
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import argparse
+import gc
+import random
+import tempfile
+import time
+import tracemalloc
+
+from src.config import DB_PATH
+from src.contact_store import ContactStore
+from src.db import iter_enriched_profiles
+from src.profiles import compress_profile, format_full_profile
+from tests.test_fixtures import build_network_db
+
+
+def synthetic_network(path: str, n: int, seed: int = 0) -> str:
+    """A network DB of n contacts with realistic categorical repetition."""
+    rng = random.Random(seed)
+    companies = [f"Company {i}" for i in range(n // 8 or 1)]
+    contacts = [
+        {
+            "contact_id": i,
+            "full_name": f"Contact {i}",
+            "current_title": rng.choice(["CEO", "CTO", "VP Sales", "Partner", "Head of Growth"]) + f" {i % 97}",
+            "current_company": rng.choice(companies),
+            "seniority": rng.choice(["C-Suite", "VP", "Director", "Manager"]),
+            "persona_category": rng.choice(["Operator", "Investor", "Founder", "Advisor"]),
+            "contact_type": rng.choice(["Mentor", "Alumni", "Investor"]),
+            "primary_expertise": f"Expertise {rng.randrange(10**6)} in go-to-market and enterprise sales",
+            "secondary_expertise": f"Secondary {rng.randrange(10**6)}",
+            "industry_verticals": rng.choice(["Fintech", "Healthtech", "SaaS", "Climate"]),
+            "actively_advising_startups": rng.choice(["yes", "no", "unknown"]),
+            "open_to_outreach": rng.choice(["yes", "no", "unknown"]),
+        }
+        for i in range(1, n + 1)
+    ]
+    return build_network_db(path, contacts)
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = build()
+    load_secs = time.perf_counter() - t0
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, retained, load_secs
+
+
+def _throughput(render, contacts) -> float:
+    t0 = time.perf_counter()
+    for contact in contacts:
+        render(contact)
+    return len(contacts) / (time.perf_counter() - t0)
+
+
+def run(db_path: str) -> list[dict]:
+    def load_dicts():
+        columns, rows = iter_enriched_profiles(db_path)
+        return [dict(zip(columns, row)) for row in rows]
+
+    def load_store():
+        columns, rows = iter_enriched_profiles(db_path)
+        return ContactStore.from_rows(columns, rows)
+
+    dicts, dict_bytes, dict_load = _measure(load_dicts)
+    store, store_bytes, store_load = _measure(load_store)
+    records = list(store)
+    n = len(dicts)
+
+    results = []
+    for name, contacts, retained, load_secs in (("dicts", dicts, dict_bytes, dict_load),
+                                                ("store", records, store_bytes, store_load)):
+        results.append({
+            "path": name,
+            "contacts": n,
+            "bytes_per_contact": retained / n if n else 0,
+            "load_secs": load_secs,
+            "compress_per_sec": _throughput(compress_profile, contacts),
+            "full_per_sec": _throughput(lambda c: format_full_profile(c, []), contacts),
+        })
+    return results
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DB_PATH, help="network database")
+    parser.add_argument("--synthetic", type=int, help="benchmark a synthetic network of this many contacts")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = synthetic_network(os.path.join(tmp, "network.db"), args.synthetic) if args.synthetic else args.db
+        results = run(db_path)
+
+    print(f"{'path':<6} {'contacts':>8} {'bytes/contact':>14} {'load':>8} {'compress/s':>11} {'full/s':>9}")
+    for r in results:
+        print(f"{r['path']:<6} {r['contacts']:>8} {r['bytes_per_contact']:>14.0f} {r['load_secs']:>7.2f}s "
+              f"{r['compress_per_sec']:>11.0f} {r['full_per_sec']:>9.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Output tokens and wall time of the full vs lean Stage 1 / Stage 2 response schemas.
+
+For each ask, Stage 1 screens the same seeded corpus once per schema, and
+Stage 2 ranks the same candidates (those lean Stage 1 picked) once per
+schema, so each stage differs only in what the model is asked to write.
+The schema that goes first alternates between trials, so prompt caching
+favours neither. Examples:
+
+    python scripts/bench_lean_schemas.py
+    python scripts/bench_lean_schemas.py --trials 3 --json lean.json
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import argparse
+import json
+import statistics
+import time
+
+from src.config import DB_PATH
+from src.db import get_company_context
+from src.matching import _format_company_context, stage1_screen, stage2_rank
+from src.profiles import get_full_profiles, get_stage1_corpus
+from tests.test_fixtures import TEST_CASES
+
+SCHEMAS = {"full": False, "lean": True}
+
+
+def _timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    result, usage = fn(*args, **kwargs)
+    return result, usage, time.perf_counter() - t0
+
+
+def run_benchmark(cases: list[dict] | None = None, db_path: str = DB_PATH, trials: int = 1) -> list[dict]:
+    """One row per stage and schema: mean output tokens and seconds, and savings of lean vs full."""
+    samples = {(stage, schema): {"output_tokens": [], "secs": []}
+               for stage in ("stage1", "stage2") for schema in SCHEMAS}
+    for case in cases or TEST_CASES:
+        company_ctx = _format_company_context(get_company_context(db_path, case["company"]))
+        for seed in range(trials):
+            corpus = get_stage1_corpus(db_path, seed=seed)
+            order = list(SCHEMAS.items())[::1 if seed % 2 == 0 else -1]
+            candidates = None
+            for schema, lean in order:
+                ids, usage, secs = _timed(stage1_screen, case["ask"], company_ctx, corpus, lean=lean)
+                samples["stage1", schema]["output_tokens"].append(usage.output_tokens)
+                samples["stage1", schema]["secs"].append(secs)
+                if lean:
+                    candidates = corpus.resolve(ids)
+            full_profiles = get_full_profiles(db_path, candidates)
+            for schema, lean in order:
+                _, usage, secs = _timed(stage2_rank, case["ask"], company_ctx, full_profiles, lean=lean)
+                samples["stage2", schema]["output_tokens"].append(usage.output_tokens)
+                samples["stage2", schema]["secs"].append(secs)
+
+    rows = []
+    for (stage, schema), values in samples.items():
+        full = samples[stage, "full"]
+        out, secs = statistics.mean(values["output_tokens"]), statistics.mean(values["secs"])
+        full_out, full_secs = statistics.mean(full["output_tokens"]), statistics.mean(full["secs"])
+        rows.append({
+            "stage": stage, "schema": schema, "runs": len(values["secs"]),
+            "output_tokens": out, "secs": secs,
+            "output_tokens_saved_pct": 1 - out / full_out if full_out else 0.0,
+            "secs_saved_pct": 1 - secs / full_secs if full_secs else 0.0,
+        })
+    return rows
+
+
+def _print_table(rows: list[dict]):
+    print(f"{'stage':<8}{'schema':<8}{'runs':>5}{'out tokens':>12}{'secs':>8}{'tokens saved':>14}{'time saved':>12}")
+    for r in rows:
+        print(f"{r['stage']:<8}{r['schema']:<8}{r['runs']:>5}{r['output_tokens']:>12.0f}{r['secs']:>8.2f}"
+              f"{r['output_tokens_saved_pct']:>14.1%}{r['secs_saved_pct']:>12.1%}")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DB_PATH, help="network database")
+    parser.add_argument("--trials", type=int, default=1, help="seeded runs per case")
+    parser.add_argument("--json", help="write the table to this JSON file")
+    args = parser.parse_args(argv)
+
+    rows = run_benchmark(db_path=args.db, trials=args.trials)
+    _print_table(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Per-query allocation of Stage 1 prompt assembly, measured with tracemalloc.
+
+Compares the old path (join the shuffled corpus into a string, then format it
+into the Claude system prompt / Gemini user message) with the current one
+(a Stage1Corpus rendered once into its final prompt form). Reports peak bytes
+allocated per query and that peak as a multiple of the finished prompt's
+size, i.e. how many prompt-sized strings a query allocates (1.0 = only the
+prompt itself). The corpus itself is built before measuring. Examples:
+
+    python scripts/bench_prompt_assembly.py
+    python scripts/bench_prompt_assembly.py --synthetic 5000 --queries 20
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import argparse
+import random
+import statistics
+import tempfile
+import tracemalloc
+
+from src.backends.base import fill_profiles
+from src.backends.gemini_backend import _PROFILES_PART
+from src.config import DB_PATH
+from src.profiles import _corpus_cache, _corpus_lock, get_stage1_corpus, refresh_corpus
+from src.prompts import STAGE1_SYSTEM_PROMPT
+from scripts.bench_contact_store import synthetic_network
+
+ASK = "Looking for an intro to a VP of Sales who has scaled enterprise SaaS"
+COMPANY = "<company_context>\nCompany: Aerium\n</company_context>\n\n<ask>\n" + ASK + "\n</ask>"
+
+
+def legacy_query(entries: list[str], provider: str) -> str:
+    """The pre-rendering path: shuffle, join with markers, then copy into the prompt."""
+    shuffled = random.sample(entries, len(entries))
+    segments = []
+    for i, entry in enumerate(shuffled):
+        if i > 0 and i % 100 == 0:
+            segments.append(f"--- PROFILES {i+1}-{min(i+100, len(shuffled))} ---")
+        segments.append(entry)
+    compressed = "\n\n".join(segments)
+    if provider == "claude":
+        return STAGE1_SYSTEM_PROMPT.format(profiles=compressed)
+    return f"<profiles>\n{compressed}\n</profiles>\n\n{COMPANY}"
+
+
+def current_query(db_path: str, provider: str):
+    corpus = get_stage1_corpus(db_path)
+    if provider == "claude":
+        return fill_profiles(STAGE1_SYSTEM_PROMPT, corpus)
+    return [fill_profiles(_PROFILES_PART, corpus), COMPANY]
+
+
+def _peak(query) -> tuple[int, int]:
+    """Peak bytes allocated by one query, and the in-memory size of the prompt it produced."""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    result = query()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    parts = [result] if isinstance(result, str) else result
+    return peak, sum(sys.getsizeof(part) for part in parts)
+
+
+def run(db_path: str, queries: int = 10) -> list[dict]:
+    refresh_corpus(db_path)
+    with _corpus_lock:
+        corpus = _corpus_cache[db_path]
+        entries = list(corpus.ordered)
+    get_stage1_corpus(db_path)  # build the alias table outside the measurement
+
+    results = []
+    for provider in ("claude", "gemini"):
+        for path, query in (("legacy", lambda: legacy_query(entries, provider)),
+                            ("current", lambda: current_query(db_path, provider))):
+            runs = [_peak(query) for _ in range(queries)]
+            peak = statistics.median(p for p, _ in runs)
+            prompt_bytes = statistics.median(size for _, size in runs)
+            results.append({
+                "provider": provider,
+                "path": path,
+                "prompt_bytes": prompt_bytes,
+                "peak_bytes": peak,
+                "prompt_copies": peak / prompt_bytes if prompt_bytes else 0.0,
+            })
+    return results
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DB_PATH, help="network database")
+    parser.add_argument("--synthetic", type=int, help="use a synthetic network of this many contacts")
+    parser.add_argument("--queries", type=int, default=10, help="queries measured per path (median reported)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = synthetic_network(os.path.join(tmp, "network.db"), args.synthetic) if args.synthetic else args.db
+        results = run(db_path, args.queries)
+
+    print(f"{'provider':<8} {'path':<8} {'prompt':>10} {'peak/query':>12} {'copies':>7}")
+    for r in results:
+        print(f"{r['provider']:<8} {r['path']:<8} {r['prompt_bytes']:>10.0f} {r['peak_bytes']:>12.0f} "
+              f"{r['prompt_copies']:>7.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Agreement of the local clarity fast path with the LLM on logged asks.
+
+Every query_log row whose clarity check went to the LLM is labelled by its
+outcome (result_type "clarification" = vague, "matches" = clear). The
+local classifier (src.clarity) is run on the same asks and the report gives
+its coverage (share settled without the LLM) and its agreement with the LLM
+on the asks it settles. Examples:
+
+    python scripts/clarity_agreement.py
+    python scripts/clarity_agreement.py --disagreements --json clarity.json
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import argparse
+import json
+import sqlite3
+import time
+from contextlib import closing
+
+import src.query_log as ql
+from src.clarity import ClarityLexicon
+from src.config import DB_PATH
+from src.db import get_enriched_contacts
+
+# Rows where the LLM made the clarity call: logged before usage tracking, or with a clarity LLM call
+_LLM_LABELLED = """
+    SELECT ask_text, result_type FROM query_log
+    WHERE result_type IN ('matches', 'clarification')
+      AND (usage_by_stage IS NULL OR json_extract(usage_by_stage, '$.clarity.calls') > 0)
+"""
+
+
+def llm_labelled_asks(log_db_path: str) -> list[tuple[str, str]]:
+    """(ask, "clear" | "vague") for every logged ask the LLM classified."""
+    with closing(sqlite3.connect(log_db_path)) as conn:
+        query = _LLM_LABELLED
+        # Coalesced rows repeat another run's outcome; logs from before coalescing have no such rows
+        if "coalesced" in {row[1] for row in conn.execute("PRAGMA table_info(query_log)")}:
+            query += " AND COALESCE(coalesced, 0) = 0"
+        rows = conn.execute(query).fetchall()
+    return [(ask, "vague" if result_type == "clarification" else "clear") for ask, result_type in rows]
+
+
+def agreement(lexicon: ClarityLexicon, labelled: list[tuple[str, str]]) -> dict:
+    """Coverage and agreement of the local classifier against LLM labels."""
+    counts = {"clear_clear": 0, "clear_vague": 0, "vague_vague": 0, "vague_clear": 0, "llm": 0}
+    disagreements = []
+    t0 = time.perf_counter()
+    for ask, llm in labelled:
+        local = lexicon.classify(ask)
+        if local is None:
+            counts["llm"] += 1
+            continue
+        counts[f"{local}_{llm}"] += 1
+        if local != llm:
+            disagreements.append({"ask": ask, "local": local, "llm": llm})
+    elapsed = time.perf_counter() - t0
+
+    n = len(labelled)
+    settled = n - counts["llm"]
+    agreed = counts["clear_clear"] + counts["vague_vague"]
+    return {
+        "asks": n,
+        "settled_locally": settled,
+        "coverage": settled / n if n else 0.0,
+        "agreement": agreed / settled if settled else 0.0,
+        # Local "clear" where the LLM asked for clarification, and the reverse
+        "local_clear_llm_vague": counts["clear_vague"],
+        "local_vague_llm_clear": counts["vague_clear"],
+        "us_per_ask": elapsed / n * 1e6 if n else 0.0,
+        "disagreements": disagreements,
+    }
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DB_PATH, help="network database (lexicon source)")
+    parser.add_argument("--log-db", default=ql.LOG_DB_PATH, help="query log database")
+    parser.add_argument("--disagreements", action="store_true", help="list asks where the two disagree")
+    parser.add_argument("--json", help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    lexicon = ClarityLexicon.from_contacts(get_enriched_contacts(args.db))
+    report = agreement(lexicon, llm_labelled_asks(args.log_db))
+    print(f"Asks labelled by the LLM: {report['asks']}")
+    print(f"Settled locally:          {report['settled_locally']} ({report['coverage']:.1%})")
+    print(f"Agreement when settled:   {report['agreement']:.1%}")
+    print(f"  local clear, LLM vague: {report['local_clear_llm_vague']}")
+    print(f"  local vague, LLM clear: {report['local_vague_llm_clear']}")
+    print(f"Classifier time:          {report['us_per_ask']:.1f} us/ask")
+    if args.disagreements:
+        for d in report["disagreements"]:
+            print(f"  [{d['local']} vs LLM {d['llm']}] {d['ask']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,8 +4,8 @@ import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 import tiktoken
-from src.config import DB_PATH
-from src.profiles import get_compressed_profiles, get_full_profiles
+from src.config import DB_PATH, STAGE2_PROFILE_TOKENS
+from src.profiles import alias_token_savings, get_compressed_profiles, get_full_profiles
 from src.db import get_enriched_contacts
 
 def main():
@@ -16,6 +16,9 @@ def main():
     enc = tiktoken.get_encoding("cl100k_base")
     tokens = len(enc.encode(compressed))
     print(f"Compressed profiles: {tokens} tokens, {len(compressed)} chars")
+    savings = alias_token_savings(DB_PATH)
+    print(f"Short-ID aliases: {savings['alias_tokens']} tokens, saves {savings['saved_tokens']} "
+          f"({savings['saved_pct']:.1%})")
 
     # Show first 3 profiles
     lines = compressed.split("\n\n")
@@ -30,5 +33,13 @@ def main():
     print(f"--- Full profile (ID:{cid}) ---")
     print(full)
 
+    # Stage 2 input for a 30-candidate query, unbudgeted vs per-candidate budget (400 when the mode is off)
+    ids = [c["contact_id"] for c in contacts[:30]]
+    budget = STAGE2_PROFILE_TOKENS or 400
+    unbudgeted = len(enc.encode(get_full_profiles(DB_PATH, ids)))
+    budgeted = len(enc.encode(get_full_profiles(DB_PATH, ids, budget)))
+    print(f"\nStage 2 profiles for {len(ids)} candidates: {unbudgeted} tokens in full, "
+          f"{budgeted} with a {budget}-token budget each")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Add change tracking and the contact_facets tables to the network DB.
+
+Run once after loading (or re-enriching) a network DB. The bot only reads
+the network DB while serving asks: without this step it rebuilds the Stage 1
+corpus in full whenever the file changes, and the facet pre-filter is off.
+
+    python scripts/migrate_network_db.py
+    python scripts/migrate_network_db.py --db path/to/network.db
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import argparse
+
+from src.config import DB_PATH
+from src.db import migrate_network_db
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DB_PATH, help="network database")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"No network DB at {args.db}", file=sys.stderr)
+        return 1
+    if not migrate_network_db(args.db):
+        print(f"Could not migrate {args.db} (see the log)", file=sys.stderr)
+        return 1
+    print(f"Migrated {args.db}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
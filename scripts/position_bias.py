@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Positional-bias harness: Stage 1 selection probability by corpus position.
+
+Runs one ask against many seeded orderings of the compressed corpus (per
+ordering strategy, concurrently), records where each selected contact sat in
+the list, and reports the selection-probability-by-position curve plus how
+stable the final top 3 is across orderings. Responses go through a
+record-missing replay cache keyed on the exact ordering, so reruns are free.
+Examples:
+
+    python scripts/position_bias.py --case legaltech_warm_intro --seeds 20
+    python scripts/position_bias.py --ask "enterprise sales in fintech" --company Passu --strategy db_order
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import argparse
+import itertools
+import json
+import re
+import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from src.backends import _provider_backend
+from src.backends.replay import ReplayBackend, ReplayCache
+from src.config import DB_PATH, LLM_PROVIDER, LLM_REPLAY_DIR, TOP_K_RESULTS
+from src.db import get_company_context
+from src.matching import Stage1Result, Stage2Result, _format_company_context
+from src.profiles import get_full_profiles
+from src.prompts import STAGE2_SYSTEM_PROMPT
+from scripts.stage1_benchmark import CONFIGS, Stage1Config, corpus_text_and_resolver
+from tests.test_fixtures import TEST_CASES
+
+_ID_PATTERN = re.compile(r"\[ID:(c?\d+)\]")
+
+
+def corpus_positions(corpus: str) -> dict[int | str, float]:
+    """Relative position (0 = first, just under 1 = last) of each ID (contact ID or alias) in a corpus."""
+    ids = [int(i) if i.isdigit() else i for i in _ID_PATTERN.findall(corpus)]
+    return {cid: i / len(ids) for i, cid in enumerate(ids)}
+
+
+def run_ordering(backend, strategy: Stage1Config, ask: str, company_ctx: str, db_path: str,
+                 seed: int, rank: bool = True) -> dict:
+    """Stage 1 (and optionally Stage 2) on one seeded ordering."""
+    text, resolve = corpus_text_and_resolver(strategy.build_corpus(db_path, seed, ask))
+    positions = corpus_positions(text)
+    selected, usage = backend.screen_candidates(ask, company_ctx, text, strategy.system_prompt, Stage1Result)
+    top = []
+    if rank and selected:
+        result, stage2_usage = backend.rank_matches(
+            ask, company_ctx, get_full_profiles(db_path, resolve(selected)), STAGE2_SYSTEM_PROMPT,
+            Stage2Result, TOP_K_RESULTS)
+        top = [m["contact_id"] for m in result["matches"]]
+        usage = usage + stage2_usage
+    return {
+        "seed": seed,
+        "corpus_size": len(positions),
+        "selected_positions": [positions[cid] for cid in selected if cid in positions],
+        "top": top,
+        "prompt_tokens": usage.prompt_tokens,
+        "cost_usd": usage.cost_usd,
+    }
+
+
+def position_curve(runs: list[dict], bins: int = 10) -> list[float]:
+    """P(selected) for a contact in each of `bins` equal slices of the list."""
+    selected = [0] * bins
+    slots = 0
+    for run in runs:
+        slots += run["corpus_size"]
+        for pos in run["selected_positions"]:
+            selected[min(int(pos * bins), bins - 1)] += 1
+    per_bin = slots / bins
+    return [count / per_bin if per_bin else 0.0 for count in selected]
+
+
+def top_stability(runs: list[dict]) -> dict:
+    """How much the final top-k varies across orderings."""
+    tops = [set(run["top"]) for run in runs if run["top"]]
+    appearances = Counter(cid for top in tops for cid in top)
+    jaccards = [len(a & b) / len(a | b) for a, b in itertools.combinations(tops, 2)]
+    return {
+        "mean_jaccard": statistics.fmean(jaccards) if jaccards else 1.0,
+        "distinct_contacts": len(appearances),
+        "top_frequency": {cid: n / len(tops) for cid, n in appearances.most_common()},
+    }
+
+
+def measure(backend, strategies: list[Stage1Config], ask: str, company_name: str, seeds: int = 20,
+            db_path: str = DB_PATH, bins: int = 10, workers: int = 8, rank: bool = True) -> list[dict]:
+    """One summary per strategy: position curve, bias spread, top-k stability and mean cost."""
+    company_ctx = _format_company_context(get_company_context(db_path, company_name))
+    jobs = [(strategy, seed) for strategy in strategies for seed in range(seeds)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        runs = list(pool.map(
+            lambda job: run_ordering(backend, job[0], ask, company_ctx, db_path, job[1], rank), jobs))
+
+    summaries = []
+    for strategy in strategies:
+        strategy_runs = [run for (s, _), run in zip(jobs, runs) if s is strategy]
+        curve = position_curve(strategy_runs, bins)
+        mean_p = statistics.fmean(curve)
+        summaries.append({
+            "strategy": strategy.name,
+            "orderings": len(strategy_runs),
+            "curve": curve,
+            # Max/min bin probability relative to the mean; 0 means position has no effect
+            "spread": (max(curve) - min(curve)) / mean_p if mean_p else 0.0,
+            **top_stability(strategy_runs),
+            "prompt_tokens": statistics.fmean(r["prompt_tokens"] for r in strategy_runs),
+            "cost_usd": statistics.fmean(r["cost_usd"] for r in strategy_runs),
+        })
+    return summaries
+
+
+def _print_summaries(summaries: list[dict]):
+    for s in summaries:
+        print(f"\n{s['strategy']} ({s['orderings']} orderings, ${s['cost_usd']:.4f}/ordering, "
+              f"{s['prompt_tokens']:.0f} prompt tokens)")
+        for i, p in enumerate(s["curve"]):
+            lo, hi = i / len(s["curve"]), (i + 1) / len(s["curve"])
+            print(f"  {lo:>4.0%}-{hi:<4.0%} {p:>6.3f} {'#' * round(p * 50)}")
+        print(f"  spread={s['spread']:.2f} top-{TOP_K_RESULTS} mean_jaccard={s['mean_jaccard']:.2f} "
+              f"distinct={s['distinct_contacts']}")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--case", choices=[tc["id"] for tc in TEST_CASES], help="evaluation case to use")
+    parser.add_argument("--ask", help="ask text (instead of --case)")
+    parser.add_argument("--company", help="ERA30 company (with --ask)")
+    parser.add_argument("--strategy", action="append", choices=sorted(CONFIGS),
+                        help="ordering strategy (repeatable; default: all)")
+    parser.add_argument("--seeds", type=int, default=20, help="orderings per strategy")
+    parser.add_argument("--bins", type=int, default=10, help="position slices in the curve")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--no-rank", action="store_true", help="skip Stage 2 (no top-3 stability)")
+    parser.add_argument("--db", default=DB_PATH, help="network database")
+    parser.add_argument("--replay-dir", default=LLM_REPLAY_DIR, help="response cache directory")
+    parser.add_argument("--json", help="write the summaries to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.case:
+        case = next(tc for tc in TEST_CASES if tc["id"] == args.case)
+        ask, company = case["ask"], case["company"]
+    elif args.ask and args.company:
+        ask, company = args.ask, args.company
+    else:
+        parser.error("give --case, or --ask and --company")
+
+    backend = ReplayBackend(LLM_PROVIDER, ReplayCache(args.replay_dir, "record-missing"),
+                            lambda: _provider_backend(LLM_PROVIDER), canonical_order=False)
+    strategies = [CONFIGS[name] for name in (args.strategy or sorted(CONFIGS))]
+    summaries = measure(backend, strategies, ask, company, args.seeds, args.db, args.bins, args.workers,
+                        rank=not args.no_rank)
+    _print_summaries(summaries)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summaries, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Latency report over the query log: per-stage p50/p90/p99 by rolling window.
+
+The log is read in a single streaming pass (SQLite does the window
+bucketing), so the report stays fast on logs of hundreds of thousands of
+rows. Examples:
+
+    python scripts/query_log_report.py --window 1d --windows 7 --by company
+    python scripts/query_log_report.py --by backend --json report.json
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import argparse
+import csv
+import json
+import math
+import sqlite3
+import time
+from collections import defaultdict
+
+import src.query_log as ql
+
+STAGES = ("clarity", "stage1", "stage2", "total")
+
+# Grouping dimension -> SQL expression over query_log
+GROUP_COLUMNS = {
+    "all": "'all'",
+    "company": "COALESCE(company_name, '?')",
+    "result_type": "result_type",
+    "backend": "COALESCE(backend, '?')",
+}
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+REPORT_FIELDS = ["window", "window_start", "window_end", "group", "stage", "n", "p50", "p90", "p99"]
+
+
+def parse_duration(text: str) -> float:
+    """Parse '90s', '15m', '6h', '7d' or '2w' into seconds."""
+    text = text.strip().lower()
+    if text and text[-1] in _UNITS:
+        return float(text[:-1]) * _UNITS[text[-1]]
+    return float(text)
+
+
+def _nearest_rank(sorted_values: list[float], p: float) -> float:
+    """Nearest-rank percentile: the smallest value whose rank reaches p * n."""
+    rank = max(math.ceil(p * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def latency_report(db_path: str, window_secs: float, windows: int, by: str = "all",
+                   now: float | None = None) -> list[dict]:
+    """Per-stage latency percentiles for each rolling window (0 = most recent) and group."""
+    if by not in GROUP_COLUMNS:
+        raise ValueError(f"Unknown grouping: {by}. Available: {sorted(GROUP_COLUMNS)}")
+    now = time.time() if now is None else now
+    params = {"now": now, "window": window_secs, "since": now - window_secs * windows}
+    stage_columns = ", ".join(f"{stage}_secs" for stage in STAGES)
+
+    # SQLite buckets rows into windows; the cursor is consumed row by row so
+    # only the per-group latency samples are held in memory
+    samples = defaultdict(list)
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute(
+            f"""SELECT CAST((:now - timestamp) / :window AS INTEGER), {GROUP_COLUMNS[by]}, {stage_columns}
+                FROM query_log
+                WHERE timestamp > :since AND timestamp <= :now""",
+            params,
+        )
+        for window_idx, grp, *values in cursor:
+            for stage, secs in zip(STAGES, values):
+                if secs is not None:
+                    samples[(window_idx, grp, stage)].append(secs)
+    finally:
+        conn.close()
+
+    report = []
+    for (window_idx, grp, stage), values in sorted(samples.items()):
+        values.sort()
+        report.append({
+            "window": window_idx,
+            "window_start": now - window_secs * (window_idx + 1),
+            "window_end": now - window_secs * window_idx,
+            "group": grp,
+            "stage": stage,
+            "n": len(values),
+            "p50": _nearest_rank(values, 0.50),
+            "p90": _nearest_rank(values, 0.90),
+            "p99": _nearest_rank(values, 0.99),
+        })
+    return report
+
+
+def find_regressions(report: list[dict], metric: str = "p90", threshold: float = 0.2,
+                     min_samples: int = 5) -> list[dict]:
+    """Flag groups whose latest-window metric exceeds the previous window's by more than threshold."""
+    by_key = {(r["window"], r["group"], r["stage"]): r for r in report}
+    regressions = []
+    for (window, grp, stage), current in by_key.items():
+        if window != 0:
+            continue
+        previous = by_key.get((1, grp, stage))
+        if previous is None or min(current["n"], previous["n"]) < min_samples:
+            continue
+        if previous[metric] and current[metric] > previous[metric] * (1 + threshold):
+            regressions.append({
+                "group": grp,
+                "stage": stage,
+                "metric": metric,
+                "previous": previous[metric],
+                "current": current[metric],
+                "change": current[metric] / previous[metric] - 1,
+            })
+    return sorted(regressions, key=lambda r: r["change"], reverse=True)
+
+
+def _print_table(report: list[dict], regressions: list[dict]):
+    print(f"{'win':>3}  {'group':<22} {'stage':<8} {'n':>6} {'p50':>8} {'p90':>8} {'p99':>8}")
+    for r in report:
+        print(f"{r['window']:>3}  {str(r['group'])[:22]:<22} {r['stage']:<8} {r['n']:>6} "
+              f"{r['p50']:>8.2f} {r['p90']:>8.2f} {r['p99']:>8.2f}")
+    if regressions:
+        print("\nREGRESSIONS (latest window vs previous):")
+        for reg in regressions:
+            print(f"  {reg['group']} / {reg['stage']}: {reg['metric']} "
+                  f"{reg['previous']:.2f}s -> {reg['current']:.2f}s (+{reg['change']:.0%})")
+    else:
+        print("\nNo regressions flagged.")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=ql.LOG_DB_PATH, help="query log database")
+    parser.add_argument("--window", default="1d", help="window length, e.g. 6h, 1d, 1w")
+    parser.add_argument("--windows", type=int, default=7, help="number of windows to report")
+    parser.add_argument("--by", default="all", choices=sorted(GROUP_COLUMNS))
+    parser.add_argument("--metric", default="p90", choices=["p50", "p90", "p99"],
+                        help="percentile compared for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative increase that counts as a regression")
+    parser.add_argument("--min-samples", type=int, default=5)
+    parser.add_argument("--csv", help="write the report rows to this CSV file")
+    parser.add_argument("--json", help="write the report and regressions to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = latency_report(args.db, parse_duration(args.window), args.windows, args.by)
+    regressions = find_regressions(report, args.metric, args.threshold, args.min_samples)
+    _print_table(report, regressions)
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"report": report, "regressions": regressions}, f, indent=2)
+
+    # Non-zero exit lets a cron job or CI step alert on regressions
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,30 @@
 #!/usr/bin/env python3
 """Run the full evaluation suite and output scores."""
-import sys, os
+import sys, os, argparse
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from tests.test_evaluation import run_full_evaluation
+from src.backends import replay
+from tests.test_evaluation import CHECKPOINT_DIR, run_full_evaluation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent cases (default: 4)")
+    parser.add_argument("--trials", type=int, default=1, help="Runs per case, for score variance (default: 1)")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR, help="Per-case checkpoint directory")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Ignore checkpoints and run every case live")
+    parser.add_argument("--replay", choices=replay.MODES, default=None,
+                        help="Record/replay LLM responses (default: LLM_REPLAY_MODE)")
+    parser.add_argument("--replay-dir", default=None, help="Response store (default: LLM_REPLAY_DIR)")
+    args = parser.parse_args(argv)
+    if args.replay:
+        replay.configure(args.replay, args.replay_dir)
+    run_full_evaluation(
+        workers=args.workers,
+        trials=args.trials,
+        checkpoint_dir=None if args.no_checkpoint else args.checkpoint_dir,
+    )
+
 
 if __name__ == "__main__":
-    run_full_evaluation()
+    main()
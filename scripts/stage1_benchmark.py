@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Stage 1 recall benchmark: recall@k vs latency and token cost per configuration.
+
+For each ask in a fixed set, a reference ranking is computed once by
+exhaustive Stage 2-style ranking: every enriched contact's full profile is
+ranked in chunks, chunk winners are re-ranked round by round, and the
+result is cached on disk. Each Stage 1 configuration is then scored by how much of that
+reference its candidate list recovers. Examples:
+
+    python scripts/stage1_benchmark.py
+    python scripts/stage1_benchmark.py --config shuffled --trials 3 --json stage1.json
+
+Combine with LLM_REPLAY_MODE=record-missing to rerun configurations offline.
+"""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import argparse
+import csv
+import hashlib
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+from src.config import DB_PATH, LEAN_SCHEMAS, LLM_PROVIDER, PROJECT_ROOT
+from src.db import get_enriched_contacts, get_company_context
+from src.facets import facet_prefilter
+from src.matching import LeanStage1Result, Stage1Result, Stage2Result, _format_company_context, _get_backend
+from src.profiles import Stage1Corpus, get_compressed_profiles, get_full_profiles, get_stage1_corpus
+from src.prompts import STAGE1_SYSTEM_PROMPT, STAGE2_SYSTEM_PROMPT
+from tests.test_fixtures import TEST_CASES
+
+REFERENCE_CACHE = str(PROJECT_ROOT / ".stage1_reference.json")
+KS = (3, 5, 10)
+
+
+@dataclass
+class Stage1Config:
+    """A Stage 1 variant: how the corpus is built (db_path, seed, ask) and which prompt screens it.
+
+    build_corpus returns the profiles block, or a Stage1Corpus whose IDs are resolved after screening.
+    """
+    name: str
+    build_corpus: Callable[[str, int, str], "str | Stage1Corpus"]
+    system_prompt: str = STAGE1_SYSTEM_PROMPT
+
+
+CONFIGS = {
+    "shuffled": Stage1Config("shuffled", lambda db_path, seed, ask: get_compressed_profiles(db_path, seed=seed)),
+    "db_order": Stage1Config("db_order", lambda db_path, seed, ask: get_compressed_profiles(db_path, shuffle=False)),
+    "short_ids": Stage1Config("short_ids", lambda db_path, seed, ask: get_stage1_corpus(db_path, seed=seed)),
+    # FACET_PUSHDOWN: only the contacts the ask's facet filter keeps (needs scripts/migrate_network_db.py)
+    "facet_pushdown": Stage1Config("facet_pushdown", lambda db_path, seed, ask: get_stage1_corpus(
+        db_path, seed=seed, only_ids=facet_prefilter(db_path, ask))),
+}
+
+
+def corpus_text_and_resolver(corpus) -> tuple[str, Callable[[list[int]], list[int]]]:
+    """The block to send and a function mapping Stage 1's IDs back to contact IDs."""
+    if isinstance(corpus, Stage1Corpus):
+        return corpus.text, corpus.resolve
+    return corpus, list
+
+
+# --- Reference ranking ---
+
+_reference_lock = threading.Lock()
+
+
+def _load_references(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _reference_key(ask: str, company_ctx: str, corpus: list[str], chunk_size: int, per_chunk: int,
+                   ref_size: int) -> str:
+    payload = json.dumps([LLM_PROVIDER, STAGE2_SYSTEM_PROMPT, ask, company_ctx, corpus,
+                          chunk_size, per_chunk, ref_size])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def reference_ranking(ask: str, company_ctx: str, db_path: str, chunk_size: int = 25, per_chunk: int = 10,
+                      ref_size: int = 10, workers: int = 4, cache_path: str = REFERENCE_CACHE) -> list[int]:
+    """Best ref_size contact IDs for an ask by exhaustive Stage 2 ranking, cached on disk.
+
+    A knockout tournament: the corpus (in contact_id order) is ranked in
+    chunks of chunk_size full profiles, each chunk's top per_chunk go through
+    to the next round, until one chunk remains for the final ranking. With
+    per_chunk >= ref_size no true top-ref_size contact is knocked out early.
+    """
+    if chunk_size <= per_chunk:
+        raise ValueError("chunk_size must be larger than per_chunk")
+    contact_ids = sorted(c["contact_id"] for c in get_enriched_contacts(db_path))
+    corpus = [get_full_profiles(db_path, [cid]) for cid in contact_ids]
+    key = _reference_key(ask, company_ctx, corpus, chunk_size, per_chunk, ref_size)
+
+    with _reference_lock:
+        cached = _load_references(cache_path).get(key)
+    if cached is not None:
+        return cached
+
+    backend = _get_backend()
+
+    def rank(ids: list[int], top_k: int) -> list[int]:
+        result, _ = backend.rank_matches(ask, company_ctx, get_full_profiles(db_path, ids), STAGE2_SYSTEM_PROMPT,
+                                         Stage2Result, top_k)
+        # Only contacts this round was shown go through, each once
+        shown = set(ids)
+        return list(dict.fromkeys(m["contact_id"] for m in result["matches"] if m["contact_id"] in shown))
+
+    remaining = contact_ids
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while len(remaining) > chunk_size:
+            chunks = [remaining[i:i + chunk_size] for i in range(0, len(remaining), chunk_size)]
+            remaining = [cid for ids in pool.map(lambda chunk: rank(chunk, per_chunk), chunks) for cid in ids]
+    ranking = rank(remaining, ref_size)
+
+    with _reference_lock:
+        references = _load_references(cache_path)
+        references[key] = ranking
+        with open(cache_path, "w") as f:
+            json.dump(references, f)
+    return ranking
+
+
+# --- Benchmark ---
+
+def recall_at_k(reference: list[int], candidates, k: int) -> float:
+    """Share of the top-k reference contacts that Stage 1 kept."""
+    top = reference[:k]
+    if not top:
+        return 0.0
+    kept = set(candidates)
+    return sum(1 for cid in top if cid in kept) / len(top)
+
+
+def _screen(config: Stage1Config, ask: str, company_ctx: str, db_path: str, seed: int) -> dict:
+    corpus = config.build_corpus(db_path, seed, ask)
+    _, resolve = corpus_text_and_resolver(corpus)
+    schema = LeanStage1Result if LEAN_SCHEMAS else Stage1Result  # the schema production screens with
+    t0 = time.time()
+    ids, usage = _get_backend().screen_candidates(ask, company_ctx, corpus, config.system_prompt, schema)
+    return {"ids": resolve(ids), "latency": time.time() - t0, "prompt_tokens": usage.prompt_tokens,
+            "cost_usd": usage.cost_usd}
+
+
+def run_benchmark(configs: list[Stage1Config], cases: list[dict] | None = None, db_path: str = DB_PATH,
+                  trials: int = 1, workers: int = 4, ks=KS, cache_path: str = REFERENCE_CACHE) -> list[dict]:
+    """One row per configuration: mean recall@k, latency, prompt tokens and cost over cases x trials."""
+    cases = cases or TEST_CASES
+    contexts = {tc["id"]: _format_company_context(get_company_context(db_path, tc["company"])) for tc in cases}
+    references = {
+        tc["id"]: reference_ranking(tc["ask"], contexts[tc["id"]], db_path, workers=workers,
+                                    cache_path=cache_path)
+        for tc in cases
+    }
+
+    jobs = [(config, tc, trial) for config in configs for tc in cases for trial in range(trials)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        runs = list(pool.map(
+            lambda job: _screen(job[0], job[1]["ask"], contexts[job[1]["id"]], db_path, seed=job[2]), jobs))
+
+    rows = []
+    for config in configs:
+        results = [(tc, run) for (cfg, tc, _), run in zip(jobs, runs) if cfg is config]
+        row = {"config": config.name, "n": len(results)}
+        for k in ks:
+            row[f"recall@{k}"] = statistics.fmean(
+                recall_at_k(references[tc["id"]], run["ids"], k) for tc, run in results)
+        for field in ("latency", "prompt_tokens", "cost_usd"):
+            row[field] = statistics.fmean(run[field] for _, run in results)
+        row["candidates"] = statistics.fmean(len(run["ids"]) for _, run in results)
+        rows.append(row)
+    return rows
+
+
+def _print_table(rows: list[dict], ks=KS):
+    recall_header = " ".join(f"{f'R@{k}':>6}" for k in ks)
+    print(f"{'config':<16} {'n':>4} {recall_header} {'cands':>6} {'latency':>8} {'tokens':>8} {'cost':>8}")
+    for r in rows:
+        recalls = " ".join(f"{r[f'recall@{k}']:>6.2f}" for k in ks)
+        print(f"{r['config'][:16]:<16} {r['n']:>4} {recalls} {r['candidates']:>6.1f} "
+              f"{r['latency']:>7.1f}s {r['prompt_tokens']:>8.0f} ${r['cost_usd']:>7.4f}")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DB_PATH, help="network database")
+    parser.add_argument("--config", action="append", choices=sorted(CONFIGS),
+                        help="configuration to benchmark (repeatable; default: all)")
+    parser.add_argument("--trials", type=int, default=1, help="seeded runs per case and configuration")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--reference-cache", default=REFERENCE_CACHE, help="cached reference rankings")
+    parser.add_argument("--csv", help="write the table to this CSV file")
+    parser.add_argument("--json", help="write the table to this JSON file")
+    args = parser.parse_args(argv)
+
+    configs = [CONFIGS[name] for name in (args.config or sorted(CONFIGS))]
+    rows = run_benchmark(configs, db_path=args.db, trials=args.trials, workers=args.workers,
+                         cache_path=args.reference_cache)
+    _print_table(rows)
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,21 @@
-from src.backends.base import LLMBackend
+from src.backends.base import LLMBackend, LLMUsage
 
 
 def get_backend(provider: str) -> LLMBackend:
-    """Factory function to create backend instance."""
+    """Factory function to create backend instance.
+
+    When record/replay is configured the backend is wrapped in a ReplayBackend.
+    """
+    from src.backends import replay
+    cache = replay.active_cache()
+    if cache is not None:
+        if provider not in ("claude", "gemini"):
+            raise ValueError(f"Unknown provider: {provider}. Available: ['claude', 'gemini']")
+        return replay.ReplayBackend(provider, cache, lambda: _provider_backend(provider))
+    return _provider_backend(provider)
+
+
+def _provider_backend(provider: str) -> LLMBackend:
     if provider == "claude":
         from src.backends.claude_backend import ClaudeBackend
         return ClaudeBackend()
@@ -13,4 +26,4 @@ def get_backend(provider: str) -> LLMBackend:
         raise ValueError(f"Unknown provider: {provider}. Available: ['claude', 'gemini']")
 
 
-__all__ = ["LLMBackend", "get_backend"]
+__all__ = ["LLMBackend", "LLMUsage", "get_backend"]
@@ -1,31 +1,134 @@
+import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import Type
+from dataclasses import dataclass, asdict
+from typing import TYPE_CHECKING, Type
 from pydantic import BaseModel
 
+from src.config import MODEL_PRICING
+
+if TYPE_CHECKING:
+    from src.profiles import Stage1Corpus
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("clarity", "stage1", "stage2")
+
+
+def fill_profiles(template: str, compressed_profiles) -> str:
+    """Fill a template's {profiles} slot with a Stage 1 block.
+
+    A Stage1Corpus renders (and keeps) the filled prompt in a single pass;
+    a plain string is formatted in as-is.
+    """
+    if isinstance(compressed_profiles, str):
+        return template.format(profiles=compressed_profiles)
+    return compressed_profiles.prompt(template)
+
+
+@dataclass
+class LLMUsage:
+    """Token usage and cost of one or more LLM calls.
+
+    input_tokens counts only uncached prompt tokens; cached prompt tokens are
+    split into cache_read_tokens and cache_creation_tokens.
+    """
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_creation_tokens: int = 0
+    cost_usd: float = 0.0
+
+    @classmethod
+    def for_call(cls, model: str, input_tokens: int, output_tokens: int,
+                 cache_read_tokens: int = 0, cache_creation_tokens: int = 0) -> "LLMUsage":
+        """Build the usage record for a single call, pricing it from MODEL_PRICING."""
+        pricing = MODEL_PRICING.get(model)
+        if pricing is None:
+            logger.warning("No pricing configured for model %s; cost recorded as 0", model)
+            cost = 0.0
+        else:
+            cost = (
+                input_tokens * pricing["input"]
+                + output_tokens * pricing["output"]
+                + cache_read_tokens * pricing["cache_read"]
+                + cache_creation_tokens * pricing["cache_write"]
+            ) / 1_000_000
+        return cls(1, input_tokens, output_tokens, cache_read_tokens, cache_creation_tokens, cost)
+
+    def __add__(self, other: "LLMUsage") -> "LLMUsage":
+        return LLMUsage(
+            self.calls + other.calls,
+            self.input_tokens + other.input_tokens,
+            self.output_tokens + other.output_tokens,
+            self.cache_read_tokens + other.cache_read_tokens,
+            self.cache_creation_tokens + other.cache_creation_tokens,
+            self.cost_usd + other.cost_usd,
+        )
+
+    @property
+    def prompt_tokens(self) -> int:
+        """All prompt tokens, cached or not."""
+        return self.input_tokens + self.cache_read_tokens + self.cache_creation_tokens
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        """Share of prompt tokens served from cache."""
+        return self.cache_read_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "cache_hit_ratio": self.cache_hit_ratio}
+
 
 class LLMBackend(ABC):
     """Abstract base class for LLM provider backends."""
 
+    def __init__(self):
+        self._cache_lock = threading.Lock()
+        self._cache_stats = {
+            stage: {"calls": 0, "cache_read_tokens": 0, "cache_creation_tokens": 0}
+            for stage in STAGES
+        }
+
+    def _track_cache(self, stage: str, cache_read: int, cache_creation: int):
+        """Accumulate prompt-cache token counts for a pipeline stage."""
+        with self._cache_lock:
+            stats = self._cache_stats[stage]
+            stats["calls"] += 1
+            stats["cache_read_tokens"] += cache_read or 0
+            stats["cache_creation_tokens"] += cache_creation or 0
+
+    def get_cache_stats(self) -> dict[str, dict]:
+        """Return a snapshot of cache read/create token counts per stage."""
+        with self._cache_lock:
+            return {stage: dict(stats) for stage, stats in self._cache_stats.items()}
+
+    # Each method returns (result, LLMUsage) so callers can account for tokens per stage
+
     @abstractmethod
     def assess_clarity(
         self, ask: str, company_context: str,
         system_prompt: str, response_schema: Type[BaseModel]
-    ) -> dict:
+    ) -> tuple[dict, LLMUsage]:
         """Assess whether an ask is clear enough."""
         pass
 
     @abstractmethod
     def screen_candidates(
-        self, ask: str, company_context: str, compressed_profiles: str,
+        self, ask: str, company_context: str, compressed_profiles: "str | Stage1Corpus",
         system_prompt: str, response_schema: Type[BaseModel]
-    ) -> list[int]:
-        """Screen compressed profiles (Stage 1). Returns list of contact IDs."""
+    ) -> tuple[list[int], LLMUsage]:
+        """Screen compressed profiles (Stage 1). Returns list of contact IDs.
+
+        Fill the profiles in with fill_profiles() so a Stage1Corpus is not copied.
+        """
         pass
 
     @abstractmethod
     def rank_matches(
         self, ask: str, company_context: str, full_profiles: str,
         system_prompt: str, response_schema: Type[BaseModel], top_k: int
-    ) -> list[dict]:
+    ) -> tuple[dict, LLMUsage]:
         """Rank candidates and return top matches (Stage 2)."""
         pass
@@ -1,60 +1,102 @@
+import json
 import time
 import logging
 from pydantic import BaseModel
 import anthropic
 
-from src.backends.base import LLMBackend
+from src.backends.base import LLMBackend, LLMUsage, fill_profiles
+from src.metrics import LLM_RATE_LIMITS, LLM_RETRIES, record_llm_call
+from src.tracing import span
 from src.config import ANTHROPIC_API_KEY, STAGE1_MODEL, STAGE2_MODEL, CLARITY_MODEL, TOP_K_RESULTS
+from src.profiles import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+# Anthropic ignores cache breakpoints on prefixes shorter than this (Sonnet/Opus)
+_MIN_CACHEABLE_TOKENS = 1024
+
 
 class ClaudeBackend(LLMBackend):
     """Claude backend using Anthropic API with tool-use and prompt caching."""
 
     def __init__(self):
+        super().__init__()
         self.client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+        # Request pieces that only depend on static inputs, built on first use
+        self._tools = {}  # (tool_name, schema_class) -> (tools, tool_choice)
+        self._instruction_blocks = {}  # (system_prompt, tool) -> (text block, prefix tokens)
+
+    def _tool_template(self, schema_class, tool_name):
+        """Return the (tools, tool_choice) pair for a schema, generating its JSON schema once."""
+        key = (tool_name, schema_class)
+        template = self._tools.get(key)
+        if template is None:
+            tools = [{
+                "name": tool_name,
+                "description": f"Report the {tool_name} results",
+                "input_schema": schema_class.model_json_schema(),
+            }]
+            template = (tools, {"type": "tool", "name": tool_name})
+            self._tools[key] = template
+        return template
+
+    def _tool_use_call(self, model, system, messages, schema_class, tool_name, stage, retries=1, **kwargs):
+        """Make an API call using tool-use for structured output, with retry on failure.
 
-    def _tool_use_call(self, model, system, messages, schema_class, tool_name, retries=1, **kwargs):
-        """Make an API call using tool-use for structured output, with retry on failure."""
-        tools = [{
-            "name": tool_name,
-            "description": f"Report the {tool_name} results",
-            "input_schema": schema_class.model_json_schema(),
-        }]
+        Returns the validated schema instance and the call's LLMUsage.
+        """
+        tools, tool_choice = self._tool_template(schema_class, tool_name)
         last_err = None
         for attempt in range(1 + retries):
             try:
                 start = time.time()
-                message = self.client.messages.create(
-                    model=model,
-                    max_tokens=4096,
-                    system=system,
-                    messages=messages,
-                    tools=tools,
-                    tool_choice={"type": "tool", "name": tool_name},
-                    **kwargs,
-                )
+                with span("llm.claude", stage=stage, model=model, attempt=attempt) as call_span:
+                    message = self.client.messages.create(
+                        model=model,
+                        max_tokens=4096,
+                        system=system,
+                        messages=messages,
+                        tools=tools,
+                        tool_choice=tool_choice,
+                        **kwargs,
+                    )
                 elapsed = time.time() - start
 
                 usage = getattr(message, "usage", None)
+                cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+                cache_create = getattr(usage, "cache_creation_input_tokens", 0) or 0
+                self._track_cache(stage, cache_read, cache_create)
+                record_llm_call("claude", stage, cache_read)
+                call_usage = LLMUsage.for_call(
+                    model,
+                    input_tokens=getattr(usage, "input_tokens", 0) or 0,
+                    output_tokens=getattr(usage, "output_tokens", 0) or 0,
+                    cache_read_tokens=cache_read,
+                    cache_creation_tokens=cache_create,
+                )
+                call_span.set_attribute("input_tokens", call_usage.input_tokens)
+                call_span.set_attribute("output_tokens", call_usage.output_tokens)
+                call_span.set_attribute("cache_read_tokens", cache_read)
                 logger.info(
                     "API call %s: model=%s elapsed=%.1fs stop=%s input=%s output=%s cache_read=%s cache_create=%s",
                     tool_name, model, elapsed,
                     message.stop_reason,
                     getattr(usage, "input_tokens", "?"),
                     getattr(usage, "output_tokens", "?"),
-                    getattr(usage, "cache_read_input_tokens", 0),
-                    getattr(usage, "cache_creation_input_tokens", 0),
+                    cache_read,
+                    cache_create,
                 )
 
                 for block in message.content:
                     if block.type == "tool_use":
-                        return schema_class.model_validate(block.input)
+                        return schema_class.model_validate(block.input), call_usage
                 raise ValueError(f"No tool_use block in response for {tool_name}")
             except (anthropic.APITimeoutError, anthropic.APIConnectionError, anthropic.RateLimitError) as e:
                 last_err = e
+                if isinstance(e, anthropic.RateLimitError):
+                    LLM_RATE_LIMITS.inc(backend="claude", stage=stage)
                 if attempt < retries:
+                    LLM_RETRIES.inc(backend="claude", stage=stage)
                     wait = 2 ** attempt
                     logger.warning("Retrying %s after %s (attempt %d): %s", tool_name, wait, attempt + 1, e)
                     time.sleep(wait)
@@ -62,27 +104,50 @@ class ClaudeBackend(LLMBackend):
                     raise
         raise last_err  # unreachable but satisfies type checker
 
+    def _cached_system(self, system_prompt, company_context, schema_class, tool_name):
+        """Static instructions, then company context, each ending a cache breakpoint.
+
+        The instructions are shared by every query and the company context by
+        every query from the same founder, so both sit ahead of the per-query
+        content where they form a byte-stable prefix. A breakpoint is only set
+        once the prefix (tools, then system blocks) reaches the minimum
+        cacheable length; below it the API would not cache anyway.
+        """
+        key = (system_prompt, tool_name, schema_class)
+        cached = self._instruction_blocks.get(key)
+        if cached is None:
+            tools, _ = self._tool_template(schema_class, tool_name)
+            prefix_tokens = estimate_tokens(json.dumps(tools)) + estimate_tokens(system_prompt)
+            block = {"type": "text", "text": system_prompt}
+            if prefix_tokens >= _MIN_CACHEABLE_TOKENS:
+                block["cache_control"] = {"type": "ephemeral"}
+            cached = self._instruction_blocks[key] = (block, prefix_tokens)
+        instructions, prefix_tokens = cached
+        context = {"type": "text", "text": f"<company_context>\n{company_context}\n</company_context>"}
+        if prefix_tokens + estimate_tokens(context["text"]) >= _MIN_CACHEABLE_TOKENS:
+            context["cache_control"] = {"type": "ephemeral"}
+        return [instructions, context]
+
     def assess_clarity(self, ask, company_context, system_prompt, response_schema):
-        result = self._tool_use_call(
+        result, usage = self._tool_use_call(
             model=CLARITY_MODEL,
-            system=[{"type": "text", "text": system_prompt}],
+            system=self._cached_system(system_prompt, company_context, response_schema, "report_clarity"),
             messages=[{
                 "role": "user",
-                "content": f"<company_context>\n{company_context}\n</company_context>\n\n<ask>\n{ask}\n</ask>",
+                "content": f"<ask>\n{ask}\n</ask>",
             }],
             schema_class=response_schema,
             tool_name="report_clarity",
+            stage="clarity",
         )
-        return result.model_dump()
+        return result.model_dump(), usage
 
     def screen_candidates(self, ask, company_context, compressed_profiles, system_prompt, response_schema):
-        formatted_prompt = system_prompt.format(profiles=compressed_profiles)
-
-        result = self._tool_use_call(
+        result, usage = self._tool_use_call(
             model=STAGE1_MODEL,
             system=[{
                 "type": "text",
-                "text": formatted_prompt,
+                "text": fill_profiles(system_prompt, compressed_profiles),
                 "cache_control": {"type": "ephemeral"},
             }],
             messages=[{
@@ -91,24 +156,24 @@ class ClaudeBackend(LLMBackend):
             }],
             schema_class=response_schema,
             tool_name="report_screening",
+            stage="stage1",
             extra_headers={"anthropic-beta": "prompt-caching-2024-07-31"},
         )
-        return result.selected_contact_ids
+        return result.selected_contact_ids, usage
 
     def rank_matches(self, ask, company_context, full_profiles, system_prompt, response_schema, top_k):
-        formatted_prompt = system_prompt.format(
-            company_context=company_context,
-            full_profiles=full_profiles,
-        )
-
-        result = self._tool_use_call(
+        result, usage = self._tool_use_call(
             model=STAGE2_MODEL,
-            system=[{"type": "text", "text": formatted_prompt}],
+            system=self._cached_system(system_prompt, company_context, response_schema, "report_ranking"),
             messages=[{
                 "role": "user",
-                "content": f"<ask>\n{ask}\n</ask>\n\nReturn the top {top_k} matches.",
+                "content": (
+                    f"<candidates>\n{full_profiles}\n</candidates>\n\n"
+                    f"<ask>\n{ask}\n</ask>\n\nReturn the top {top_k} matches."
+                ),
             }],
             schema_class=response_schema,
             tool_name="report_ranking",
+            stage="stage2",
         )
-        return {"matches": [m.model_dump() for m in result.matches], "notes": result.notes}
+        return {"matches": [m.model_dump() for m in result.matches], "notes": result.notes}, usage
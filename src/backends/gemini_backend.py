@@ -2,35 +2,92 @@ import time
 import logging
 from pydantic import BaseModel
 
-from src.backends.base import LLMBackend
+from src.backends.base import LLMBackend, LLMUsage, fill_profiles
+from src.metrics import LLM_RATE_LIMITS, LLM_RETRIES, record_llm_call
+from src.tracing import span
 from src.config import GEMINI_API_KEY, GEMINI_STAGE1_MODEL, GEMINI_STAGE2_MODEL, GEMINI_CLARITY_MODEL
 
 logger = logging.getLogger(__name__)
 
+# Per-stage (max_output_tokens, thinking_budget)
+_STAGE_LIMITS = {
+    "clarity": (8192, 1024),
+    "stage1": (16384, 4096),
+    "stage2": (16384, 4096),
+}
+
+# Stage 1 profiles go in their own leading part of the user turn, so the corpus
+# is never copied into a per-query message string
+_PROFILES_PART = "<profiles>\n{profiles}\n</profiles>\n\n"
+
+
+def _strip_profiles_placeholder(system_prompt: str) -> str:
+    """Gemini: profiles go in the user message, so drop the {profiles} slot from the system prompt."""
+    formatted = system_prompt.replace("{profiles}", "").strip()
+    # Clean up empty <profiles> tags if any remain
+    return formatted.replace("<profiles>\n\n</profiles>", "").strip()
+
 
 class GeminiBackend(LLMBackend):
     """Gemini backend using Google GenAI API with native response schemas and extended thinking."""
 
     def __init__(self):
+        super().__init__()
         from google import genai
+        from google.genai import types
         self.client = genai.Client(api_key=GEMINI_API_KEY)
-
-    def _generate_with_retry(self, model, contents, config, max_retries=1):
-        """Call Gemini API with retry logic."""
-        from google.genai.types import GenerateContentConfig, ThinkingConfig
+        self._types = types
+        # (stage, system_prompt, response_schema) -> GenerateContentConfig
+        self._configs = {}
+
+    def _config_for(self, stage, system_prompt, response_schema):
+        """Return the request config for a stage, building it on first use only."""
+        key = (stage, system_prompt, response_schema)
+        config = self._configs.get(key)
+        if config is None:
+            max_output_tokens, thinking_budget = _STAGE_LIMITS[stage]
+            system_instruction = system_prompt
+            if stage == "stage1":
+                system_instruction = _strip_profiles_placeholder(system_prompt)
+            config = self._types.GenerateContentConfig(
+                system_instruction=system_instruction,
+                response_mime_type="application/json",
+                response_schema=response_schema,
+                max_output_tokens=max_output_tokens,
+                thinking_config=self._types.ThinkingConfig(thinking_budget=thinking_budget),
+            )
+            self._configs[key] = config
+        return config
+
+    @staticmethod
+    def _usage_for(model, response) -> LLMUsage:
+        """Normalize usage_metadata: prompt_token_count includes cached tokens, thinking bills as output."""
+        usage = getattr(response, "usage_metadata", None)
+        if not usage:
+            return LLMUsage.for_call(model, 0, 0)
+        cached = getattr(usage, "cached_content_token_count", 0) or 0
+        prompt = getattr(usage, "prompt_token_count", 0) or 0
+        output = (getattr(usage, "candidates_token_count", 0) or 0) + (getattr(usage, "thoughts_token_count", 0) or 0)
+        return LLMUsage.for_call(model, input_tokens=prompt - cached, output_tokens=output, cache_read_tokens=cached)
+
+    def _generate_with_retry(self, model, contents, config, stage, max_retries=1):
+        """Call Gemini API with retry logic. Returns the response and its LLMUsage."""
         last_err = None
         for attempt in range(1 + max_retries):
             try:
                 start = time.time()
-                response = self.client.models.generate_content(
-                    model=model,
-                    contents=contents,
-                    config=config,
-                )
+                with span("llm.gemini", stage=stage, model=model, attempt=attempt) as call_span:
+                    response = self.client.models.generate_content(
+                        model=model,
+                        contents=contents,
+                        config=config,
+                    )
                 elapsed = time.time() - start
 
                 if hasattr(response, "usage_metadata") and response.usage_metadata:
                     usage = response.usage_metadata
+                    # Implicit caching has no separate write charge, so only reads are reported
+                    self._track_cache(stage, getattr(usage, "cached_content_token_count", 0) or 0, 0)
                     logger.info(
                         "Gemini call: model=%s elapsed=%.1fs input=%s output=%s cached=%s",
                         model, elapsed,
@@ -41,91 +98,78 @@ class GeminiBackend(LLMBackend):
                 else:
                     logger.info("Gemini call: model=%s elapsed=%.1fs", model, elapsed)
 
-                return response
+                call_usage = self._usage_for(model, response)
+                record_llm_call("gemini", stage, call_usage.cache_read_tokens)
+                call_span.set_attribute("input_tokens", call_usage.input_tokens)
+                call_span.set_attribute("output_tokens", call_usage.output_tokens)
+                call_span.set_attribute("cache_read_tokens", call_usage.cache_read_tokens)
+                return response, call_usage
             except (ConnectionError, TimeoutError, RuntimeError) as exc:
                 last_err = exc
                 if attempt < max_retries:
+                    LLM_RETRIES.inc(backend="gemini", stage=stage)
                     wait = 2 ** attempt
                     logger.warning("Gemini call failed (attempt %d), retrying in %ds: %s", attempt + 1, wait, exc)
                     time.sleep(wait)
                 else:
                     raise
+            except Exception as exc:
+                # google.genai surfaces quota errors as APIError with HTTP code 429
+                if getattr(exc, "code", None) == 429:
+                    LLM_RATE_LIMITS.inc(backend="gemini", stage=stage)
+                raise
         raise last_err
 
     def assess_clarity(self, ask, company_context, system_prompt, response_schema):
-        from google.genai.types import GenerateContentConfig, ThinkingConfig
-
         user_msg = (
             f"<company_context>\n{company_context}\n</company_context>\n\n"
             f"<ask>\n{ask}\n</ask>"
         )
 
-        response = self._generate_with_retry(
+        response, usage = self._generate_with_retry(
             model=GEMINI_CLARITY_MODEL,
             contents=[{"role": "user", "parts": [{"text": user_msg}]}],
-            config=GenerateContentConfig(
-                system_instruction=system_prompt,
-                response_mime_type="application/json",
-                response_schema=response_schema,
-                max_output_tokens=8192,
-                thinking_config=ThinkingConfig(thinking_budget=1024),
-            ),
+            config=self._config_for("clarity", system_prompt, response_schema),
+            stage="clarity",
         )
 
         result = response_schema.model_validate_json(response.text)
-        return result.model_dump()
+        return result.model_dump(), usage
 
     def screen_candidates(self, ask, company_context, compressed_profiles, system_prompt, response_schema):
-        from google.genai.types import GenerateContentConfig, ThinkingConfig
-
-        # Gemini: profiles go in user message, not system prompt
-        # Strip the {profiles} placeholder from the system prompt
-        formatted_system = system_prompt.replace("{profiles}", "").strip()
-        # Clean up empty <profiles> tags if any remain
-        formatted_system = formatted_system.replace("<profiles>\n\n</profiles>", "").strip()
-
         user_msg = (
-            f"<profiles>\n{compressed_profiles}\n</profiles>\n\n"
             f"<company_context>\n{company_context}\n</company_context>\n\n"
             f"<ask>\n{ask}\n</ask>"
         )
 
-        response = self._generate_with_retry(
+        response, usage = self._generate_with_retry(
             model=GEMINI_STAGE1_MODEL,
-            contents=[{"role": "user", "parts": [{"text": user_msg}]}],
-            config=GenerateContentConfig(
-                system_instruction=formatted_system,
-                response_mime_type="application/json",
-                response_schema=response_schema,
-                max_output_tokens=16384,
-                thinking_config=ThinkingConfig(thinking_budget=4096),
-            ),
+            contents=[{"role": "user", "parts": [
+                {"text": fill_profiles(_PROFILES_PART, compressed_profiles)},
+                {"text": user_msg},
+            ]}],
+            config=self._config_for("stage1", system_prompt, response_schema),
+            stage="stage1",
         )
 
         result = response_schema.model_validate_json(response.text)
-        return result.selected_contact_ids
+        return result.selected_contact_ids, usage
 
     def rank_matches(self, ask, company_context, full_profiles, system_prompt, response_schema, top_k):
-        from google.genai.types import GenerateContentConfig, ThinkingConfig
-
-        formatted_system = system_prompt.format(
-            company_context=company_context,
-            full_profiles=full_profiles,
+        # Implicit caching matches on prefix: static system prompt, then company
+        # context, then the per-query candidates and ask
+        user_msg = (
+            f"<company_context>\n{company_context}\n</company_context>\n\n"
+            f"<candidates>\n{full_profiles}\n</candidates>\n\n"
+            f"<ask>\n{ask}\n</ask>\n\nReturn the top {top_k} matches."
         )
 
-        user_msg = f"<ask>\n{ask}\n</ask>\n\nReturn the top {top_k} matches."
-
-        response = self._generate_with_retry(
+        response, usage = self._generate_with_retry(
             model=GEMINI_STAGE2_MODEL,
             contents=[{"role": "user", "parts": [{"text": user_msg}]}],
-            config=GenerateContentConfig(
-                system_instruction=formatted_system,
-                response_mime_type="application/json",
-                response_schema=response_schema,
-                max_output_tokens=16384,
-                thinking_config=ThinkingConfig(thinking_budget=4096),
-            ),
+            config=self._config_for("stage2", system_prompt, response_schema),
+            stage="stage2",
         )
 
         result = response_schema.model_validate_json(response.text)
-        return {"matches": [m.model_dump() for m in result.matches], "notes": result.notes}
+        return {"matches": [m.model_dump() for m in result.matches], "notes": result.notes}, usage
@@ -0,0 +1,201 @@
+"""Record/replay of LLM responses for offline, zero-cost regression runs.
+
+Responses are stored one JSON file per request under LLM_REPLAY_DIR, keyed
+on a SHA-256 of (model, system prompt, messages, response schema). Modes:
+
+- "record": always call the provider and (over)write the stored response.
+- "replay": only serve stored responses; a miss raises ReplayMiss.
+- "record-missing": serve stored responses, call and store on a miss.
+
+A served response reports its recorded token counts at zero cost.
+
+The Stage 1 corpus is reshuffled for every ask, so by default its key uses
+the profiles in sorted order; pass canonical_order=False to key on the
+exact ordering (e.g. when measuring positional effects).
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Callable
+
+from src.backends.base import LLMBackend, LLMUsage
+from src.config import (
+    LLM_REPLAY_MODE, LLM_REPLAY_DIR,
+    CLARITY_MODEL, STAGE1_MODEL, STAGE2_MODEL,
+    GEMINI_CLARITY_MODEL, GEMINI_STAGE1_MODEL, GEMINI_STAGE2_MODEL,
+)
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay", "record-missing")
+
+_STAGE_MODELS = {
+    "claude": {"clarity": CLARITY_MODEL, "stage1": STAGE1_MODEL, "stage2": STAGE2_MODEL},
+    "gemini": {"clarity": GEMINI_CLARITY_MODEL, "stage1": GEMINI_STAGE1_MODEL, "stage2": GEMINI_STAGE2_MODEL},
+}
+
+
+class ReplayMiss(KeyError):
+    """No stored response for a request in replay mode."""
+
+
+class ReplayCache:
+    """File store of LLM responses keyed on a hash of the request."""
+
+    def __init__(self, directory: str, mode: str = "record-missing"):
+        if mode not in MODES or mode == "off":
+            raise ValueError(f"Unknown replay mode: {mode}. Available: {list(MODES[1:])}")
+        self.directory = directory
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0}
+
+    @staticmethod
+    def key(model: str, system: str, messages, schema) -> str:
+        payload = json.dumps(
+            {"model": model, "system": system, "messages": messages, "schema": schema},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, payload):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def call(self, model: str, system: str, messages, schema, compute: Callable[[], object]):
+        """Return the stored response for the request, or compute (and store) it per the mode."""
+        key = self.key(model, system, messages, schema)
+        if self.mode != "record":
+            stored = self.get(key)
+            if stored is not None:
+                self._count("hits")
+                return stored
+            self._count("misses")
+            if self.mode == "replay":
+                raise ReplayMiss(f"No recorded response for {model} request {key[:12]}")
+        payload = compute()
+        self.put(key, payload)
+        self._count("recorded")
+        return payload
+
+
+class ReplayBackend(LLMBackend):
+    """Wraps a provider backend, serving its responses through a ReplayCache.
+
+    The wrapped backend is only constructed on the first live call, so
+    "replay" mode needs no API key or provider SDK.
+    """
+
+    def __init__(self, provider: str, cache: ReplayCache, factory: Callable[[], LLMBackend],
+                 canonical_order: bool = True):
+        super().__init__()
+        self.provider = provider
+        self.cache = cache
+        self.canonical_order = canonical_order
+        self._factory = factory
+        self._inner: LLMBackend | None = None
+        self._inner_lock = threading.Lock()
+
+    @property
+    def inner(self) -> LLMBackend:
+        if self._inner is None:
+            with self._inner_lock:
+                if self._inner is None:
+                    self._inner = self._factory()
+        return self._inner
+
+    def get_cache_stats(self):
+        return self._inner.get_cache_stats() if self._inner is not None else super().get_cache_stats()
+
+    def _call(self, stage, system_prompt, response_schema, messages, live):
+        live_usage = []
+
+        def compute():
+            result, usage = live()
+            live_usage.append(usage)
+            return {"result": result, "usage": usage.to_dict()}
+
+        payload = self.cache.call(
+            _STAGE_MODELS[self.provider][stage], system_prompt, messages,
+            response_schema.model_json_schema(), compute,
+        )
+        if live_usage:
+            return payload["result"], live_usage[0]
+        # Served from the store: the recorded token counts, but nothing was spent this time
+        usage = {k: v for k, v in payload["usage"].items() if k != "cache_hit_ratio"}
+        return payload["result"], LLMUsage(**{**usage, "cost_usd": 0.0})
+
+    def _corpus_key(self, compressed_profiles) -> str:
+        if not isinstance(compressed_profiles, str):  # Stage1Corpus
+            if not self.canonical_order:
+                return compressed_profiles.text
+            entries = compressed_profiles.segments
+        elif not self.canonical_order:
+            return compressed_profiles
+        else:
+            entries = compressed_profiles.split("\n\n")
+        return "\n\n".join(sorted(e for e in entries if not e.startswith("--- PROFILES")))
+
+    def assess_clarity(self, ask, company_context, system_prompt, response_schema):
+        return self._call(
+            "clarity", system_prompt, response_schema,
+            {"ask": ask, "company_context": company_context},
+            lambda: self.inner.assess_clarity(ask, company_context, system_prompt, response_schema),
+        )
+
+    def screen_candidates(self, ask, company_context, compressed_profiles, system_prompt, response_schema):
+        return self._call(
+            "stage1", system_prompt, response_schema,
+            {"ask": ask, "company_context": company_context, "profiles": self._corpus_key(compressed_profiles)},
+            lambda: self.inner.screen_candidates(
+                ask, company_context, compressed_profiles, system_prompt, response_schema),
+        )
+
+    def rank_matches(self, ask, company_context, full_profiles, system_prompt, response_schema, top_k):
+        return self._call(
+            "stage2", system_prompt, response_schema,
+            {"ask": ask, "company_context": company_context, "candidates": full_profiles, "top_k": top_k},
+            lambda: self.inner.rank_matches(
+                ask, company_context, full_profiles, system_prompt, response_schema, top_k),
+        )
+
+
+_active: ReplayCache | None = None
+
+
+def configure(mode: str, directory: str | None = None):
+    """Select the process-wide replay mode; "off" disables record/replay."""
+    global _active
+    if mode == "off":
+        _active = None
+    else:
+        _active = ReplayCache(directory or LLM_REPLAY_DIR, mode)
+        logger.info("LLM record/replay: mode=%s dir=%s", mode, _active.directory)
+
+
+def active_cache() -> ReplayCache | None:
+    """The process-wide ReplayCache, or None when record/replay is off."""
+    return _active
+
+
+configure(LLM_REPLAY_MODE)
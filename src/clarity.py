@@ -0,0 +1,142 @@
+"""Local fast path for the clarity check.
+
+CLARITY_SYSTEM_PROMPT's rule is simple: an ask is clear if it names a
+domain, a type of help, a role or a goal that implies a kind of person,
+and only too vague if anyone in the network could match it. Most asks are
+obviously one or the other, so they are settled here from a lexicon and
+only the rest go to the LLM.
+
+The lexicon has two parts:
+
+- the prompt's categories (common domains, types of help, roles,
+  fundraising goals), as fixed term lists below;
+- network vocabulary: words and two-word phrases from enriched contacts'
+  titles, expertise and industry verticals. Terms that appear in a large
+  share of profiles are dropped, since words like "startup" or "help"
+  don't narrow anything.
+
+classify() returns "clear", "vague" or None (ambiguous: ask the LLM).
+scripts/clarity_agreement.py measures agreement with the LLM on the asks
+in query_log.
+"""
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from src.db import get_enriched_contacts
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.&'-]*[a-z0-9+#]|[a-z0-9]")
+
+# The prompt's categories. Any of these makes an ask clear.
+HELP_TERMS = {
+    "feedback", "intro", "intros", "introduction", "introductions", "warm intro", "advice", "advise", "advisor",
+    "mentor", "mentorship", "customers", "customer", "users", "potential users", "pilot", "pilots", "partners",
+    "partnership", "partnerships", "hire", "hiring", "recruit", "recruiting", "co-founder", "cofounder",
+    "design partner", "beta testers", "distribution", "pricing", "go-to-market", "gtm", "expansion",
+}
+ROLE_TERMS = {
+    "vp", "cto", "ceo", "cfo", "coo", "cmo", "cro", "founder", "founders", "operator", "operators", "engineer",
+    "engineers", "engineering", "technical", "developer", "designer", "investor", "investors", "vc", "vcs",
+    "angel", "angels", "partner at", "head of", "director", "executive", "executives", "lawyer", "attorney",
+    "accountant", "scientist", "researcher", "doctor", "physician", "buyer", "buyers", "procurement",
+}
+GOAL_TERMS = {
+    "raise", "raising", "fundraise", "fundraising", "seed", "pre-seed", "series a", "series b", "round",
+    "funding", "capital", "term sheet", "valuation", "acquisition", "exit", "ipo",
+}
+DOMAIN_TERMS = {
+    "sales", "enterprise sales", "marketing", "growth", "product", "regulatory", "compliance", "legal",
+    "finance", "fintech", "healthcare", "healthtech", "hospitality", "real estate", "ai", "ml", "saas", "b2b",
+    "b2c", "ecommerce", "e-commerce", "supply chain", "logistics", "security", "crypto", "climate", "energy",
+}
+CATEGORY_TERMS = HELP_TERMS | ROLE_TERMS | GOAL_TERMS | DOMAIN_TERMS
+
+# Words that carry no information about who would match
+GENERIC_WORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "for", "with", "at", "by", "from", "about",
+    "is", "are", "be", "am", "was", "do", "does", "did", "can", "could", "would", "should", "will", "may",
+    "i", "me", "my", "we", "us", "our", "you", "your", "it", "its", "this", "that", "there", "here", "so",
+    "any", "anyone", "anybody", "someone", "somebody", "something", "anything", "who", "what", "which", "how",
+    "know", "need", "want", "looking", "look", "find", "get", "have", "has", "like", "just", "really", "some",
+    "help", "helpful", "useful", "good", "great", "people", "person", "folks", "one", "ones", "network",
+    "startup", "company", "business", "team", "please", "thanks", "hi", "hey", "hello",
+    "connect", "talk", "chat", "meet", "speak", "work", "working", "things", "stuff", "general", "right",
+    "now", "also", "more", "other", "out", "up", "if", "not", "no", "yes",
+}
+
+# Network terms found in more than this share of profiles are too common to count
+_MAX_TERM_SHARE = 0.15
+_VOCABULARY_FIELDS = ("current_title", "primary_expertise", "secondary_expertise", "industry_verticals")
+# Asks this long with no lexicon hit are left to the LLM rather than called vague
+_MAX_VAGUE_WORDS = 12
+
+
+def _terms(text: str) -> set[str]:
+    """Words and adjacent-word pairs of a text, lowercased."""
+    words = _WORD.findall(text.lower())
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+@dataclass(frozen=True)
+class ClarityLexicon:
+    vocabulary: frozenset[str]  # distinctive network terms
+
+    @classmethod
+    def from_contacts(cls, contacts: list[dict]) -> "ClarityLexicon":
+        counts = Counter()
+        for contact in contacts:
+            text = " ".join(str(contact.get(name) or "") for name in _VOCABULARY_FIELDS)
+            counts.update(_terms(text))
+        limit = max(1, int(len(contacts) * _MAX_TERM_SHARE))
+        vocabulary = {
+            term for term, n in counts.items()
+            if n <= limit and len(term) > 2 and not set(term.split()) & GENERIC_WORDS
+            and not term.replace(" ", "").isdigit()
+        }
+        return cls(frozenset(vocabulary))
+
+    def classify(self, ask: str) -> str | None:
+        """Return "clear", "vague", or None when the ask should go to the LLM."""
+        terms = _terms(ask)
+        if terms & CATEGORY_TERMS:
+            return "clear"
+        words = {term for term in terms if " " not in term}
+        content = words - GENERIC_WORDS
+        if not content:
+            return "vague" if len(words) <= _MAX_VAGUE_WORDS else None
+        network_hits = terms & self.vocabulary
+        # A phrase, or two separate words, from the network is a domain the ask names
+        if any(" " in term for term in network_hits) or len(network_hits) >= 2:
+            return "clear"
+        return None
+
+
+_lexicon_lock = threading.Lock()
+_lexicons: dict[tuple, ClarityLexicon] = {}
+
+
+def get_lexicon(db_path: str, version=None) -> ClarityLexicon:
+    """The lexicon for a network DB, rebuilt when version (e.g. corpus_version()) changes."""
+    key = (db_path, version)
+    lexicon = _lexicons.get(key)
+    if lexicon is None:
+        with _lexicon_lock:
+            lexicon = _lexicons.get(key)
+            if lexicon is None:
+                lexicon = ClarityLexicon.from_contacts(get_enriched_contacts(db_path))
+                # Only the newest version of each DB is kept
+                for stale in [k for k in _lexicons if k[0] == db_path]:
+                    del _lexicons[stale]
+                _lexicons[key] = lexicon
+    return lexicon
+
+
+def clarifying_question(company_context: str) -> str:
+    """The question returned for an ask settled as vague without the LLM."""
+    first_line = company_context.splitlines()[0] if company_context else ""
+    company = first_line.removeprefix("Company: ").strip() if first_line.startswith("Company: ") else "your company"
+    return (
+        f"Happy to help! What would be most useful for {company} right now? For example: "
+        "intros to potential customers, fundraising, hiring, or advice on a specific area like sales or product."
+    )
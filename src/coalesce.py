@@ -0,0 +1,44 @@
+"""In-process single-flight: concurrent calls with the same key share one execution.
+
+The first caller for a key runs the function; callers arriving while it is
+in flight wait on its Future and get the same result (or exception). The
+key is forgotten as soon as the run finishes, so this never serves stale
+results, only duplicates that overlap in time.
+"""
+import threading
+from concurrent.futures import Future
+from typing import Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, Future] = {}
+
+    def run(self, key: Hashable, fn: Callable[[], T]) -> tuple[T, bool]:
+        """Run fn, or wait for the in-flight run with the same key. Returns (result, shared)."""
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = Future()
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
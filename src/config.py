@@ -25,6 +25,13 @@ GEMINI_STAGE1_MODEL = os.getenv("GEMINI_STAGE1_MODEL", "gemini-2.5-pro")
 GEMINI_STAGE2_MODEL = os.getenv("GEMINI_STAGE2_MODEL", "gemini-2.5-pro")
 GEMINI_CLARITY_MODEL = os.getenv("GEMINI_CLARITY_MODEL", "gemini-2.5-pro")
 
+# Pricing in USD per million tokens, used for per-query cost accounting
+MODEL_PRICING = {
+    "claude-sonnet-4-5-20250929": {"input": 3.00, "output": 15.00, "cache_write": 3.75, "cache_read": 0.30},
+    "gemini-2.5-pro": {"input": 1.25, "output": 10.00, "cache_write": 1.25, "cache_read": 0.31},
+    "gemini-2.5-flash": {"input": 0.30, "output": 2.50, "cache_write": 0.30, "cache_read": 0.075},
+}
+
 # Pipeline defaults
 STAGE1_MIN_CANDIDATES = 15
 STAGE1_MAX_CANDIDATES = 30
@@ -32,3 +39,54 @@ TOP_K_RESULTS = 3
 
 # Input limits
 MAX_ASK_LENGTH = int(os.getenv("MAX_ASK_LENGTH", "2000"))
+
+# Metrics endpoint (Prometheus text format); 0 disables the HTTP listener
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Tracing: "none" (no-op), "memory" or "otel"; TRACE_FILE dumps spans as JSON at exit
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "100000"))
+
+# Pipeline profiling: "cprofile" or "sampling"; runs are profiled at PROFILE_SAMPLE_RATE or on request
+PROFILE_DIR = os.getenv("PROFILE_DIR", str(PROJECT_ROOT / "profiles"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile").lower()
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+PROFILE_MAX_BYTES = int(os.getenv("PROFILE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Bot start-up: warm caches before accepting events; READY_FILE is touched once warm
+WARM_PROMPT_CACHE = os.getenv("WARM_PROMPT_CACHE", "").lower() in ("1", "true", "yes")
+READY_FILE = os.getenv("READY_FILE", "")
+
+# LLM record/replay: "off", "record", "replay" or "record-missing"
+LLM_REPLAY_MODE = os.getenv("LLM_REPLAY_MODE", "off").lower()
+LLM_REPLAY_DIR = os.getenv("LLM_REPLAY_DIR", str(PROJECT_ROOT / ".llm_replay"))
+
+# Rendered Stage 2 profiles kept in memory (LRU); prewarmed from the most-matched contacts at start-up
+FULL_PROFILE_CACHE_SIZE = int(os.getenv("FULL_PROFILE_CACHE_SIZE", "512"))
+PREWARM_FULL_PROFILES = int(os.getenv("PREWARM_FULL_PROFILES", "0"))
+
+# Settle obviously clear / vague asks locally (src.clarity) and only send the rest to the LLM.
+# Off until scripts/clarity_agreement.py shows enough coverage and agreement on the query log
+CLARITY_FAST_PATH = os.getenv("CLARITY_FAST_PATH", "").lower() in ("1", "true", "yes")
+
+# Per-thread sessions for follow-up refinements (src.sessions): idle TTL in seconds and max sessions held
+THREAD_SESSION_TTL = float(os.getenv("THREAD_SESSION_TTL", "1800"))
+THREAD_SESSION_MAX = int(os.getenv("THREAD_SESSION_MAX", "500"))
+
+# Push obvious ask requirements (fundraising -> investors, technical roles) down to a SQL pre-filter over
+# contact_facets (src.facets); the full corpus is kept when a filter leaves fewer than FACET_MIN_CORPUS contacts.
+# Off until its recall is measured (scripts/stage1_benchmark.py --config facet_pushdown)
+FACET_PUSHDOWN = os.getenv("FACET_PUSHDOWN", "").lower() in ("1", "true", "yes")
+FACET_MIN_CORPUS = int(os.getenv("FACET_MIN_CORPUS", "60"))
+
+# Lean Stage 1/2 response schemas: the model returns IDs, explanations and hooks only, and match details
+# (name, title, company, LinkedIn) are filled from the DB. Off until scripts/bench_lean_schemas.py and an
+# eval run (LEAN_SCHEMAS=1 scripts/run_evaluation.py) show the savings and unchanged explanations
+LEAN_SCHEMAS = os.getenv("LEAN_SCHEMAS", "").lower() in ("1", "true", "yes")
+
+# Stage 2 per-candidate budget in (estimated) tokens; verbose profiles keep their most ask-relevant sections
+# (src.profiles.stage2_field_priority). 0 (the default) renders every profile in full; compare a budget with
+# scripts/run_evaluation.py before turning it on
+STAGE2_PROFILE_TOKENS = int(os.getenv("STAGE2_PROFILE_TOKENS", "0"))
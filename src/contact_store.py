@@ -0,0 +1,130 @@
+"""Column-oriented store of enriched contacts.
+
+Holding each contact as a dict costs a hash table per contact plus a separate
+string object for every repeated categorical value ("C-Suite", "yes",
+"Mentor", ...). ContactStore keeps one list per column instead; categorical
+columns are stored as integer codes into a shared vocabulary, and contact
+IDs in a typed array. ContactRecord is a two-slot view onto one row that
+answers .get() and [] like the dict rows, so compress_profile() and
+format_full_profile() render from it unchanged.
+
+See scripts/bench_contact_store.py for memory and render throughput against
+the dict path.
+"""
+from array import array
+from typing import Iterable, Iterator
+
+from src.db import iter_enriched_profiles
+
+# Low-cardinality columns stored as codes into a per-column vocabulary
+CATEGORICAL_COLUMNS = (
+    "current_company", "seniority", "persona_category", "contact_type",
+    "actively_advising_startups", "open_to_outreach", "country", "state", "city",
+)
+
+
+class ContactRecord:
+    """Read-only view of one contact in a ContactStore, with dict-style access."""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "ContactStore", row: int):
+        self._store = store
+        self._row = row
+
+    # get() and [] are on the render hot path, so the column lookup is inlined
+
+    def get(self, name: str, default=None):
+        store = self._store
+        position = store._positions.get(name)
+        if position is None:
+            return default
+        value = store._data[position][self._row]
+        vocab = store._vocab[position]
+        return value if vocab is None else vocab[value]
+
+    def __getitem__(self, name: str):
+        store = self._store
+        position = store._positions[name]
+        value = store._data[position][self._row]
+        vocab = store._vocab[position]
+        return value if vocab is None else vocab[value]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._store._positions
+
+    def keys(self) -> tuple[str, ...]:
+        return self._store.columns
+
+    def to_dict(self) -> dict:
+        return {name: self[name] for name in self._store.columns}
+
+    def __repr__(self):
+        return f"ContactRecord(contact_id={self['contact_id']})"
+
+
+class ContactStore:
+    """Enriched contacts held column by column (see module docstring)."""
+
+    def __init__(self, columns: Iterable[str], categorical: Iterable[str] = CATEGORICAL_COLUMNS):
+        columns = list(columns)
+        # Keep the first of any duplicated column name (r.* repeats contact_id)
+        self._keep = [i for i, name in enumerate(columns) if name not in columns[:i]]
+        self.columns = tuple(columns[i] for i in self._keep)
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+        categorical = set(categorical)
+        # Per column: vocabulary list for categorical columns, None otherwise
+        self._vocab: list[list | None] = [[] if name in categorical else None for name in self.columns]
+        self._codes: list[dict | None] = [{} if name in categorical else None for name in self.columns]
+        self._data: list = [
+            array("q") if name == "contact_id" else array("I") if name in categorical else []
+            for name in self.columns
+        ]
+        self._rows_by_id: dict[int, int] = {}
+
+    @classmethod
+    def from_rows(cls, columns: Iterable[str], rows: Iterable[tuple], **kwargs) -> "ContactStore":
+        store = cls(columns, **kwargs)
+        for row in rows:
+            store.append(row)
+        return store
+
+    @classmethod
+    def from_dicts(cls, contacts: list[dict], **kwargs) -> "ContactStore":
+        columns = list(contacts[0]) if contacts else ["contact_id"]
+        return cls.from_rows(columns, (tuple(c.get(name) for name in columns) for c in contacts), **kwargs)
+
+    def append(self, row: tuple):
+        """Add one contact given as a tuple in the constructor's column order."""
+        index = len(self)
+        for position, source in enumerate(self._keep):
+            value = row[source]
+            codes = self._codes[position]
+            if codes is not None:
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(self._vocab[position])
+                    self._vocab[position].append(value)
+                value = code
+            self._data[position].append(value)
+        self._rows_by_id[row[self._keep[self._positions["contact_id"]]]] = index
+
+    def __len__(self) -> int:
+        return len(self._data[0])
+
+    def __iter__(self) -> Iterator[ContactRecord]:
+        return (ContactRecord(self, row) for row in range(len(self)))
+
+    def get(self, contact_id: int) -> ContactRecord | None:
+        row = self._rows_by_id.get(contact_id)
+        return None if row is None else ContactRecord(self, row)
+
+    def vocabulary(self, name: str) -> list | None:
+        """Distinct values of a categorical column, in code order."""
+        return self._vocab[self._positions[name]]
+
+
+def load_contact_store(db_path: str) -> ContactStore:
+    """Load every enriched contact's full research profile into a ContactStore."""
+    columns, rows = iter_enriched_profiles(db_path)
+    return ContactStore.from_rows(columns, rows)
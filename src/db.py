@@ -1,6 +1,12 @@
 import sqlite3
+import logging
 from contextlib import closing
-from typing import Optional
+from pathlib import Path
+from typing import Iterator, Optional
+
+from src.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 
 def _dict_row(cursor, row):
@@ -13,20 +19,71 @@ def _connect(db_path: str) -> sqlite3.Connection:
     return conn
 
 
+def _connect_readonly(db_path: str) -> sqlite3.Connection:
+    """A connection that can neither modify the DB nor create a missing file."""
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    conn.row_factory = _dict_row
+    return conn
+
+
+_ENRICHED_CONTACTS_QUERY = """
+    SELECT c.contact_id, c.full_name, c.current_title, c.current_company,
+           c.seniority, c.persona_category, c.contact_type, c.linkedin_url,
+           r.primary_expertise, r.secondary_expertise, r.industry_verticals,
+           r.actively_advising_startups, r.open_to_outreach
+    FROM contacts c
+    JOIN person_research r ON c.contact_id = r.contact_id
+    WHERE r.primary_expertise IS NOT NULL AND r.primary_expertise != ''
+"""
+
+
+@traced()
 def get_enriched_contacts(db_path: str) -> list[dict]:
     """Return contacts that have enrichment data (primary_expertise non-null)."""
     with closing(_connect(db_path)) as conn:
-        return conn.execute("""
-            SELECT c.contact_id, c.full_name, c.current_title, c.current_company,
-                   c.seniority, c.persona_category, c.contact_type, c.linkedin_url,
-                   r.primary_expertise, r.secondary_expertise, r.industry_verticals,
-                   r.actively_advising_startups, r.open_to_outreach
-            FROM contacts c
-            JOIN person_research r ON c.contact_id = r.contact_id
-            WHERE r.primary_expertise IS NOT NULL AND r.primary_expertise != ''
-        """).fetchall()
+        return conn.execute(_ENRICHED_CONTACTS_QUERY).fetchall()
+
+
+@traced()
+def get_enriched_contacts_by_ids(db_path: str, contact_ids: list[int]) -> list[dict]:
+    """Return the enriched contacts among contact_ids (others are absent from the result)."""
+    if not contact_ids:
+        return []
+    with closing(_connect(db_path)) as conn:
+        conn.execute("CREATE TEMP TABLE wanted_ids (contact_id INTEGER PRIMARY KEY)")
+        conn.executemany("INSERT OR IGNORE INTO wanted_ids VALUES (?)", ((cid,) for cid in contact_ids))
+        return conn.execute(
+            _ENRICHED_CONTACTS_QUERY + " AND c.contact_id IN (SELECT contact_id FROM wanted_ids)"
+        ).fetchall()
+
 
+@traced()
+def iter_enriched_profiles(db_path: str) -> tuple[list[str], Iterator[tuple]]:
+    """Stream full research profiles of enriched contacts as (column names, row tuples).
 
+    Rows are plain tuples, not dicts, for bulk loaders; the connection closes
+    when the iterator is exhausted.
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.execute("""
+        SELECT c.contact_id, c.full_name, c.current_title, c.current_company,
+               c.seniority, c.persona_category, c.contact_type, c.linkedin_url,
+               c.city, c.state, c.country,
+               r.*
+        FROM contacts c
+        JOIN person_research r ON c.contact_id = r.contact_id
+        WHERE r.primary_expertise IS NOT NULL AND r.primary_expertise != ''
+        ORDER BY c.contact_id
+    """)
+    columns = [d[0] for d in cursor.description]
+
+    def rows():
+        with closing(conn):
+            yield from cursor
+    return columns, rows()
+
+
+@traced()
 def get_research_profile(db_path: str, contact_id: int) -> Optional[dict]:
     """Return the full research profile for a contact."""
     with closing(_connect(db_path)) as conn:
@@ -41,6 +98,7 @@ def get_research_profile(db_path: str, contact_id: int) -> Optional[dict]:
         """, (contact_id,)).fetchone()
 
 
+@traced()
 def get_career_highlights(db_path: str, contact_id: int) -> list[dict]:
     """Return career history for a contact, most recent first."""
     with closing(_connect(db_path)) as conn:
@@ -52,6 +110,7 @@ def get_career_highlights(db_path: str, contact_id: int) -> list[dict]:
         """, (contact_id,)).fetchall()
 
 
+@traced()
 def get_company_context(db_path: str, company_name: str) -> Optional[dict]:
     """Look up an ERA30 company by name (case-insensitive)."""
     with closing(_connect(db_path)) as conn:
@@ -62,6 +121,7 @@ def get_company_context(db_path: str, company_name: str) -> Optional[dict]:
         """, (company_name,)).fetchone()
 
 
+@traced()
 def get_all_era30_companies(db_path: str) -> list[dict]:
     """Return all ERA30 companies."""
     with closing(_connect(db_path)) as conn:
@@ -69,3 +129,150 @@ def get_all_era30_companies(db_path: str) -> list[dict]:
             SELECT name, website, industry, funding_stage, one_liner, description
             FROM era30_companies
         """).fetchall()
+
+
+# --- Contact change tracking ---
+#
+# contact_versions holds one row per contact that has changed since tracking
+# started, stamped with a database-wide increasing version by triggers on the
+# tables profiles are built from. Readers remember the highest version they
+# have seen and re-read only contacts stamped after it. The table and
+# triggers are added by migrate_network_db (scripts/migrate_network_db.py);
+# request paths only read them and fall back to full rebuilds without them.
+
+_SOURCE_TABLES = ("contacts", "person_research", "career_history")
+
+_STAMP = """
+    INSERT OR REPLACE INTO contact_versions (contact_id, version)
+    VALUES ({row}.contact_id, (SELECT COALESCE(MAX(version), 0) + 1 FROM contact_versions));
+"""
+
+
+def _tracking_schema(tables) -> str:
+    statements = [
+        """CREATE TABLE IF NOT EXISTS contact_versions (
+               contact_id INTEGER PRIMARY KEY,
+               version INTEGER NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_contact_versions_version ON contact_versions (version)",
+    ]
+    for table in tables:
+        for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version "
+                f"AFTER {event} ON {table} BEGIN {_STAMP.format(row=row)} END"
+            )
+    return ";\n".join(statements) + ";"
+
+
+@traced()
+def ensure_contact_versions(db_path: str) -> bool:
+    """Create the contact_versions table and its triggers. False if the DB is read-only."""
+    try:
+        with closing(sqlite3.connect(db_path)) as conn:
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            conn.executescript(_tracking_schema([t for t in _SOURCE_TABLES if t in existing]))
+        return True
+    except sqlite3.OperationalError as exc:
+        logger.warning("Contact change tracking unavailable for %s: %s", db_path, exc)
+        return False
+
+
+@traced()
+def get_contact_version(db_path: str) -> Optional[int]:
+    """Highest contact version stamped so far (0 if none), or None if tracking is not set up."""
+    try:
+        with closing(_connect_readonly(db_path)) as conn:
+            row = conn.execute("SELECT COALESCE(MAX(version), 0) AS version FROM contact_versions").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row["version"]
+
+
+@traced()
+def get_changed_contacts(db_path: str, since_version: int) -> list[dict]:
+    """contact_id and version of contacts stamped after since_version."""
+    with closing(_connect_readonly(db_path)) as conn:
+        return conn.execute(
+            "SELECT contact_id, version FROM contact_versions WHERE version > ?", (since_version,),
+        ).fetchall()
+
+
+# --- Contact facets ---
+#
+# contact_facets holds structured flags derived from each enriched contact
+# (src.facets.derive_facets). contact_facets_state records the contact
+# version the table is current to, so facets are re-derived only for
+# contacts stamped after it. The tables are added by migrate_network_db.
+
+_FACETS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contact_facets (
+    contact_id INTEGER PRIMARY KEY,
+    is_investor INTEGER NOT NULL,
+    is_operator INTEGER NOT NULL,
+    is_technical INTEGER NOT NULL,
+    seniority_band TEXT NOT NULL,
+    industry_tags TEXT NOT NULL,
+    advising INTEGER NOT NULL,
+    open_to_outreach INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contact_facets_state (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+"""
+
+FACET_COLUMNS = ("is_investor", "is_operator", "is_technical", "seniority_band", "industry_tags",
+                 "advising", "open_to_outreach")
+
+
+@traced()
+def ensure_contact_facets(db_path: str) -> bool:
+    """Create the contact_facets tables. False if the DB is read-only."""
+    try:
+        with closing(sqlite3.connect(db_path)) as conn:
+            conn.executescript(_FACETS_SCHEMA)
+        return True
+    except sqlite3.OperationalError as exc:
+        logger.warning("Contact facets unavailable for %s: %s", db_path, exc)
+        return False
+
+
+@traced()
+def get_facets_version(db_path: str) -> Optional[int]:
+    """Contact version the facets are current to (-1 if never derived), or None if there is no table."""
+    try:
+        with closing(_connect_readonly(db_path)) as conn:
+            row = conn.execute("SELECT version FROM contact_facets_state").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return -1 if row is None else row["version"]
+
+
+@traced()
+def write_contact_facets(db_path: str, facets: dict[int, dict], removed: list[int], version: int):
+    """Upsert derived facets, drop removed contacts and mark the table current to version, in one transaction."""
+    columns = ", ".join(FACET_COLUMNS)
+    placeholders = ", ".join("?" for _ in range(len(FACET_COLUMNS) + 1))
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO contact_facets (contact_id, {columns}) VALUES ({placeholders})",
+            ((cid, *(row[name] for name in FACET_COLUMNS)) for cid, row in facets.items()),
+        )
+        conn.executemany("DELETE FROM contact_facets WHERE contact_id = ?", ((cid,) for cid in removed))
+        conn.execute("INSERT OR REPLACE INTO contact_facets_state VALUES (0, ?)", (version,))
+
+
+@traced()
+def get_contact_ids_by_facets(db_path: str, where: str, params: tuple = ()) -> set[int]:
+    """contact_ids whose facets match a SQL condition over contact_facets columns."""
+    with closing(_connect_readonly(db_path)) as conn:
+        return {row["contact_id"] for row in
+                conn.execute(f"SELECT contact_id FROM contact_facets WHERE {where}", params)}
+
+
+@traced()
+def migrate_network_db(db_path: str) -> bool:
+    """Add change tracking and the contact_facets tables to a network DB. False if either failed."""
+    tracked = ensure_contact_versions(db_path)
+    return ensure_contact_facets(db_path) and tracked
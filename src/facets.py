@@ -0,0 +1,172 @@
+"""Structured contact facets and facet pre-filters for Stage 1.
+
+Stage 1 is asked to tell investors from practitioners and technical from
+business profiles on every query. Those properties are fixed per contact,
+so they are derived once per contact (and again only when the contact
+changes) into the contact_facets table:
+
+- is_investor / is_operator / is_technical flags
+- seniority_band: executive, vp, director, manager or other
+- industry_tags: normalized tags parsed from industry_verticals (JSON list)
+- advising / open_to_outreach booleans
+
+An ask with an obvious requirement (fundraising -> investors, "someone
+technical" -> technical profiles) is turned into a SQL condition over these
+columns, and Stage 1 only sees the contacts that pass it. Anything less
+clear-cut, or a filter that leaves too few contacts, keeps the full corpus.
+"""
+import re
+import json
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+
+from src.config import FACET_MIN_CORPUS
+from src.db import (
+    get_enriched_contacts, get_enriched_contacts_by_ids, get_contact_version, get_changed_contacts,
+    get_facets_version, write_contact_facets, get_contact_ids_by_facets,
+)
+
+logger = logging.getLogger(__name__)
+
+_INVESTOR = re.compile(
+    r"\b(investors?|investing|vc|venture|ventures|angel|general partner|managing partner|"
+    r"limited partner|fund|capital|private equity)\b", re.IGNORECASE)
+_OPERATOR = re.compile(
+    r"\b(operator|founder|co-?founder|ceo|coo|cto|cfo|cmo|cro|chief|president|vp|vice president|head of|"
+    r"director|manager|lead|engineer\w*|consultant|advisor|executive|owner)\b", re.IGNORECASE)
+_TECHNICAL = re.compile(
+    r"\b(cto|engineer\w*|technical|software|developer|programmer|architect|data scien\w*|"
+    r"machine learning|ml|artificial intelligence|devops|infrastructure|full[- ]stack|backend|frontend)\b",
+    re.IGNORECASE)
+_SENIORITY_BANDS = (
+    ("executive", re.compile(r"\b(c-suite|chief|ceo|coo|cto|cfo|cmo|cro|founder|co-?founder|president|"
+                             r"owner|partner|executive)\b", re.IGNORECASE)),
+    ("vp", re.compile(r"\b(vp|svp|evp|vice president)\b", re.IGNORECASE)),
+    ("director", re.compile(r"\b(director|head of|head)\b", re.IGNORECASE)),
+    ("manager", re.compile(r"\b(manager|lead|senior|principal)\b", re.IGNORECASE)),
+)
+_TAG_SPLIT = re.compile(r"[,;|/]|\band\b(?=\s+[A-Z])")
+_TAG_ALIASES = {
+    "fin tech": "fintech", "financial technology": "fintech",
+    "health tech": "healthtech", "health technology": "healthtech",
+    "artificial intelligence": "ai", "software as a service": "saas",
+    "e-commerce": "ecommerce", "e commerce": "ecommerce",
+}
+
+
+def _truthy(value) -> bool:
+    return str(value or "").strip().lower().startswith(("yes", "true", "y", "1"))
+
+
+def industry_tags(industry_verticals: str | None) -> list[str]:
+    """Normalized, de-duplicated tags from a free-text industry_verticals value."""
+    tags = []
+    for part in _TAG_SPLIT.split(industry_verticals or ""):
+        tag = " ".join(part.replace("&", "and").lower().split()).strip(" .-")
+        tag = _TAG_ALIASES.get(tag, tag)
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def derive_facets(contact: dict) -> dict:
+    """Facet columns for one enriched contact (see module docstring)."""
+    role = " ".join(str(contact.get(name) or "") for name in
+                    ("current_title", "persona_category", "contact_type", "current_company"))
+    # Not the company: "... Capital" or "... Fund" employers don't make their sales leads investors
+    investor_role = " ".join(str(contact.get(name) or "") for name in ("current_title", "persona_category"))
+    title = " ".join(str(contact.get(name) or "") for name in ("seniority", "current_title"))
+    expertise = " ".join(str(contact.get(name) or "") for name in ("current_title", "primary_expertise"))
+    band = next((name for name, pattern in _SENIORITY_BANDS if pattern.search(title)), "other")
+    return {
+        "is_investor": int(bool(_INVESTOR.search(investor_role))),
+        "is_operator": int(bool(_OPERATOR.search(role))),
+        "is_technical": int(bool(_TECHNICAL.search(expertise))),
+        "seniority_band": band,
+        "industry_tags": json.dumps(industry_tags(contact.get("industry_verticals"))),
+        "advising": int(_truthy(contact.get("actively_advising_startups"))),
+        "open_to_outreach": int(_truthy(contact.get("open_to_outreach"))),
+    }
+
+
+_sync_lock = threading.Lock()
+
+
+def sync_facets(db_path: str) -> bool:
+    """Bring contact_facets up to date with the contacts. False if facets are unavailable.
+
+    The tables come from migrate_network_db; a DB without them (or without
+    change tracking, so facets can't be kept current) has no facets.
+    """
+    with _sync_lock:
+        current = get_contact_version(db_path)
+        applied = get_facets_version(db_path)
+        if current is None or applied is None:
+            return False
+        if applied == current:
+            return True
+        if applied < 0:
+            contacts, removed = get_enriched_contacts(db_path), []
+        else:
+            changed = [row["contact_id"] for row in get_changed_contacts(db_path, applied)]
+            contacts = get_enriched_contacts_by_ids(db_path, changed)
+            removed = sorted(set(changed) - {c["contact_id"] for c in contacts})
+        try:
+            write_contact_facets(db_path, {c["contact_id"]: derive_facets(c) for c in contacts}, removed, current)
+        except sqlite3.OperationalError as exc:
+            logger.warning("Could not write contact facets to %s: %s", db_path, exc)
+            return False
+        logger.info("[FACETS] Derived facets for %d contacts, removed %d (version %d)",
+                    len(contacts), len(removed), current)
+        return True
+
+
+# --- Pre-filters ---
+
+@dataclass(frozen=True)
+class FacetFilter:
+    """A SQL condition over contact_facets that an ask clearly implies."""
+    name: str
+    where: str
+    params: tuple = ()
+
+
+INVESTORS = FacetFilter("investors", "is_investor = 1")
+TECHNICAL = FacetFilter("technical", "is_technical = 1")
+
+_FUNDRAISING_ASK = re.compile(
+    r"\b(raising|raise|fundrais\w*|investors?|vcs?|angels?|seed round|pre-seed|series [a-d]|term sheet)\b",
+    re.IGNORECASE)
+_TECHNICAL_ASK = re.compile(
+    r"\b(someone technical|technical (?:co-?founder|advisor|person|expert|background|people)|cto|"
+    r"engineers?|engineering leaders?|developers?)\b", re.IGNORECASE)
+# Asks that want practitioners even when they mention a round or a technical role
+_PRACTITIONER_ASK = re.compile(
+    r"\b(feedback|customers?|users?|pilots?|operators?|practitioners?|hire|hiring|sell(?:ing)? to)\b",
+    re.IGNORECASE)
+
+
+def filter_for_ask(ask: str) -> FacetFilter | None:
+    """The one filter an ask obviously implies, or None when it implies none (or conflicting ones)."""
+    if _PRACTITIONER_ASK.search(ask):
+        return None
+    fundraising, technical = bool(_FUNDRAISING_ASK.search(ask)), bool(_TECHNICAL_ASK.search(ask))
+    if fundraising == technical:
+        return None
+    return INVESTORS if fundraising else TECHNICAL
+
+
+def facet_prefilter(db_path: str, ask: str, min_size: int = FACET_MIN_CORPUS) -> frozenset[int] | None:
+    """Contact IDs Stage 1 should screen for this ask, or None to screen the full corpus."""
+    facet_filter = filter_for_ask(ask)
+    if facet_filter is None or not sync_facets(db_path):
+        return None
+    ids = get_contact_ids_by_facets(db_path, facet_filter.where, facet_filter.params)
+    if len(ids) < min_size:
+        logger.info("[FACETS] Filter %s keeps only %d contacts; screening the full corpus",
+                    facet_filter.name, len(ids))
+        return None
+    logger.info("[FACETS] Filter %s → %d contacts", facet_filter.name, len(ids))
+    return frozenset(ids)
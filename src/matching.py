@@ -1,13 +1,28 @@
 import time
 import logging
 import threading
+from dataclasses import dataclass, replace
 from pydantic import BaseModel
 
-from src.backends import get_backend
-from src.config import LLM_PROVIDER, DB_PATH, TOP_K_RESULTS
+from src.backends import LLMUsage, get_backend
+from src.config import (
+    LLM_PROVIDER, DB_PATH, TOP_K_RESULTS, CLARITY_FAST_PATH, FACET_PUSHDOWN, LEAN_SCHEMAS, STAGE2_PROFILE_TOKENS,
+)
 from src.prompts import CLARITY_SYSTEM_PROMPT, STAGE1_SYSTEM_PROMPT, STAGE2_SYSTEM_PROMPT
-from src.profiles import get_compressed_profiles, get_full_profiles
-from src.db import get_company_context
+from src.profiles import (
+    Stage1Corpus, corpus_version, estimate_tokens, get_stage1_corpus, get_full_profiles, stage2_field_priority,
+)
+from src.db import get_company_context, get_enriched_contacts_by_ids
+from src.clarity import clarifying_question, get_lexicon
+from src.facets import facet_prefilter
+from src.coalesce import SingleFlight
+from src.metrics import (
+    CLARITY_DECISIONS, PIPELINES_COALESCED, PIPELINES_IN_FLIGHT, SESSION_REFINEMENTS, STAGE_LATENCY,
+    STAGE2_INPUT_TOKENS,
+)
+from src.profiling import attach_query_log, maybe_profile
+from src.sessions import ThreadSession, is_refinement, refined_ask, sessions
+from src.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +35,7 @@ class ClarityResult(BaseModel):
 
 
 class Stage1Result(BaseModel):
-    selected_contact_ids: list[int]
+    selected_contact_ids: list[int | str]  # contact IDs, or "c<n>" aliases
     reasoning_summary: str
 
 
@@ -39,6 +54,25 @@ class Stage2Result(BaseModel):
     notes: str
 
 
+# Lean schemas: the model writes only what it alone can produce. Nothing reads
+# reasoning_summary, and a match's name, title, company and LinkedIn URL are
+# filled in from the DB (fill_match_details), so none of them cost output tokens.
+
+class LeanStage1Result(BaseModel):
+    selected_contact_ids: list[int | str]  # contact IDs, or "c<n>" aliases
+
+
+class LeanMatchExplanation(BaseModel):
+    contact_id: int
+    explanation: str
+    conversation_hooks: str
+
+
+class LeanStage2Result(BaseModel):
+    matches: list[LeanMatchExplanation]
+    notes: str
+
+
 # --- Backend singleton ---
 
 _backend = None
@@ -70,8 +104,21 @@ def _format_company_context(company: dict | None) -> str:
     return "\n".join(parts)
 
 
-def assess_ask_clarity(ask: str, company_context: str) -> dict:
-    """Assess whether an ask is specific enough to produce quality matches."""
+@traced()
+def assess_ask_clarity(ask: str, company_context: str, db_path: str = DB_PATH,
+                       fast_path: bool = CLARITY_FAST_PATH) -> tuple[dict, LLMUsage]:
+    """Assess whether an ask is specific enough to produce quality matches.
+
+    With fast_path, obviously clear or vague asks are settled locally by
+    src.clarity (no LLM call, zero usage); only ambiguous ones reach the LLM.
+    """
+    if fast_path:
+        verdict = get_lexicon(db_path, corpus_version(db_path)).classify(ask)
+        CLARITY_DECISIONS.inc(path=verdict or "llm")
+        if verdict == "clear":
+            return {"is_clear": True, "clarifying_question": None}, LLMUsage()
+        if verdict == "vague":
+            return {"is_clear": False, "clarifying_question": clarifying_question(company_context)}, LLMUsage()
     backend = _get_backend()
     return backend.assess_clarity(
         ask=ask,
@@ -81,7 +128,9 @@ def assess_ask_clarity(ask: str, company_context: str) -> dict:
     )
 
 
-def stage1_screen(ask: str, company_context: str, compressed_profiles: str) -> list[int]:
+@traced()
+def stage1_screen(ask: str, company_context: str, compressed_profiles: "str | Stage1Corpus",
+                  lean: bool = LEAN_SCHEMAS) -> tuple[list[int], LLMUsage]:
     """Screen ~800 compressed profiles, return 15-30 candidate contact_ids."""
     backend = _get_backend()
     return backend.screen_candidates(
@@ -89,85 +138,278 @@ def stage1_screen(ask: str, company_context: str, compressed_profiles: str) -> l
         company_context=company_context,
         compressed_profiles=compressed_profiles,
         system_prompt=STAGE1_SYSTEM_PROMPT,
-        response_schema=Stage1Result,
+        response_schema=LeanStage1Result if lean else Stage1Result,
     )
 
 
-def stage2_rank(ask: str, company_context: str, full_profiles: str) -> dict:
-    """Rank 15-30 candidates down to top 3 with explanations. Returns {matches, notes}."""
+@traced()
+def stage2_rank(ask: str, company_context: str, full_profiles: str,
+                lean: bool = LEAN_SCHEMAS) -> tuple[dict, LLMUsage]:
+    """Rank 15-30 candidates down to top 3 with explanations. Returns ({matches, notes}, usage).
+
+    Lean matches carry only contact_id, explanation and conversation_hooks; see fill_match_details().
+    """
     backend = _get_backend()
-    return backend.rank_matches(
+    result, usage = backend.rank_matches(
         ask=ask,
         company_context=company_context,
         full_profiles=full_profiles,
         system_prompt=STAGE2_SYSTEM_PROMPT,
-        response_schema=Stage2Result,
+        response_schema=LeanStage2Result if lean else Stage2Result,
         top_k=TOP_K_RESULTS,
     )
+    if usage.calls:
+        STAGE2_INPUT_TOKENS.observe(usage.prompt_tokens)
+    return result, usage
+
+
+# Match field -> contacts column
+_MATCH_DETAILS = {"name": "full_name", "title": "current_title", "company": "current_company",
+                  "linkedin_url": "linkedin_url"}
+
+
+def fill_match_details(db_path: str, matches: list[dict], candidate_ids: list[int]) -> list[dict]:
+    """Complete Stage 2 matches with name, title, company and linkedin_url from the network DB.
+
+    Matches outside candidate_ids (IDs Stage 2 was never shown) are dropped:
+    with lean output there is no echoed name to catch a hallucinated ID, and
+    filling it would attach the explanation to the wrong real person. Fields
+    the model did return are kept.
+    """
+    allowed = set(candidate_ids)
+    kept = [m for m in matches if m["contact_id"] in allowed]
+    if len(kept) < len(matches):
+        logger.warning("[STEP 2] Dropped %d matches outside the candidates", len(matches) - len(kept))
+    missing = [m["contact_id"] for m in kept if not all(f in m for f in _MATCH_DETAILS)]
+    if not missing:
+        return kept
+    contacts = {c["contact_id"]: c for c in get_enriched_contacts_by_ids(db_path, missing)}
+    filled = []
+    for match in kept:
+        contact = contacts.get(match["contact_id"])
+        if contact is None and "name" not in match:
+            logger.warning("[STEP 2] Dropped match with unknown contact_id %s", match["contact_id"])
+            continue
+        details = {field: (contact or {}).get(column) or "" for field, column in _MATCH_DETAILS.items()}
+        filled.append({"contact_id": match["contact_id"], **details, **match})
+    return filled
+
+
+@traced()
+@PIPELINES_IN_FLIGHT.track_inprogress()
+def run_matching_pipeline(
+    ask: str, company_name: str, db_path: str = DB_PATH, slack_user_id: str | None = None,
+    channel: str | None = None, message_ts: str | None = None, profile: bool = False,
+    thread: str | None = None, coalesce: bool = True,
+) -> dict:
+    """Full pipeline: clarity check -> stage1 -> stage2 -> formatted results.
+
+    channel/message_ts identify the Slack message the result is posted to, so
+    reactions on it can be attributed to this query's log row. profile=True
+    forces a profile of this run (see src.profiling). thread keys the
+    thread's session (src.sessions): a refinement of that thread's last
+    result only re-ranks its cached candidates. coalesce=False always runs
+    the pipeline rather than joining an identical run in flight, for callers
+    (evaluation trials) that need independent runs of the same ask.
+    """
+    with maybe_profile(force=profile):
+        if thread is not None:
+            session = sessions.get(thread)
+            if session is not None and session.company_name == company_name and is_refinement(ask):
+                return _run_refinement(ask, session, db_path, slack_user_id, channel, message_ts, thread)
+        return _run_coalesced(ask, company_name, db_path, slack_user_id, channel, message_ts, thread, coalesce)
+
+
+@dataclass
+class _PipelineRun:
+    """What one pipeline run produced, shared by every caller coalesced onto it."""
+    result: dict
+    log_fields: dict  # query_log columns describing the run
+    session: ThreadSession | None = None
+
+
+_flights = SingleFlight()
+
+
+def _flight_key(ask: str, company_name: str, db_path: str) -> tuple:
+    """Runs are interchangeable for the same normalized ask and company over the same corpus."""
+    return " ".join(ask.casefold().split()), company_name.casefold(), db_path, corpus_version(db_path)
+
+
+def _run_coalesced(
+    ask: str, company_name: str, db_path: str, slack_user_id: str | None,
+    channel: str | None, message_ts: str | None, thread: str | None, coalesce: bool = True,
+    spent: dict[str, LLMUsage] | None = None,
+) -> dict:
+    """Run the pipeline, or share the result of an identical run already in flight.
+
+    Every caller gets its own query_log row. A coalesced caller's row is
+    marked coalesced, carries its own wait as total_secs and no token
+    usage, so spend is only counted on the run that paid for it. spent is
+    usage this caller already incurred before the pipeline (a refinement
+    that found no fit); it is added to the caller's row and result.
+    """
+    from src.query_log import log_query
+
+    t0 = time.time()
+    if coalesce:
+        run, shared = _flights.run(_flight_key(ask, company_name, db_path),
+                                   lambda: _run_pipeline(ask, company_name, db_path))
+    else:
+        run, shared = _run_pipeline(ask, company_name, db_path), False
+    log_fields = run.log_fields
+    if shared:
+        PIPELINES_COALESCED.inc()
+        logger.info("[COALESCE] Shared an in-flight run for company=%s ask=%r", company_name, ask[:80])
+        log_fields = {
+            name: value for name, value in log_fields.items()
+            if name in ("result_type", "clarifying_question", "match_ids", "match_names")
+        }
+        log_fields.update(total_secs=time.time() - t0, coalesced=True)
+    result = run.result
+    if spent:
+        log_fields = {**log_fields, "usage_by_stage": {**spent, **(log_fields.get("usage_by_stage") or {})}}
+        result = {**result, "usage": {**{stage: u.to_dict() for stage, u in spent.items()}, **result["usage"]}}
+    if thread is not None and run.session is not None:
+        # Each thread refines its own copy
+        sessions.put(thread, replace(run.session))
+
+    attach_query_log(log_query(
+        slack_user_id=slack_user_id, company_name=company_name, ask_text=ask,
+        channel=channel, message_ts=message_ts, backend=LLM_PROVIDER, **log_fields,
+    ))
+    return result
 
 
-def run_matching_pipeline(ask: str, company_name: str, db_path: str = DB_PATH, slack_user_id: str | None = None) -> dict:
-    """Full pipeline: clarity check -> stage1 -> stage2 -> formatted results."""
+def _run_refinement(
+    follow_up: str, session: ThreadSession, db_path: str, slack_user_id: str | None,
+    channel: str | None, message_ts: str | None, thread: str,
+) -> dict:
+    """Stage 2-only re-rank of a thread's cached candidates for a follow-up ask."""
     from src.query_log import log_query
 
+    t0 = time.time()
+    usage: dict[str, LLMUsage] = {}
+    ask = refined_ask(session, follow_up)
+    company_ctx = _format_company_context(get_company_context(db_path, session.company_name))
+    logger.info("[REFINE] Re-ranking %d cached candidates for follow-up %r",
+                len(session.candidate_ids), follow_up[:80])
+
+    # Re-render rather than reuse: the budgeted profiles keep the sections this ask needs (e.g. location)
+    full_profiles = get_full_profiles(db_path, session.candidate_ids, STAGE2_PROFILE_TOKENS,
+                                      stage2_field_priority(ask))
+    stage2_result, usage["stage2"] = stage2_rank(ask, company_ctx, full_profiles)
+    matches = fill_match_details(db_path, stage2_result["matches"], session.candidate_ids)
+    if not matches:
+        # The refinement ruled out every cached candidate; search the whole network instead
+        logger.info("[REFINE] No cached candidate fits, running the full pipeline")
+        return _run_coalesced(ask, session.company_name, db_path, slack_user_id, channel, message_ts, thread,
+                              spent={"refinement": usage["stage2"]})
+    total = time.time() - t0
+    STAGE_LATENCY.observe(total, stage="stage2")
+    STAGE_LATENCY.observe(total, stage="total")
+    SESSION_REFINEMENTS.inc()
+    logger.info("[REFINE] Done → %d matches (%.1fs)", len(matches), total)
+
+    session.ask, session.matches, session.notes = ask, matches, stage2_result.get("notes")
+    session.refinements += 1
+    sessions.put(thread, session)
+
+    attach_query_log(log_query(
+        slack_user_id=slack_user_id, company_name=session.company_name, ask_text=ask,
+        result_type="matches",
+        match_ids=[m["contact_id"] for m in matches],
+        match_names=[m["name"] for m in matches],
+        stage2_secs=total, total_secs=total,
+        channel=channel, message_ts=message_ts, backend=LLM_PROVIDER,
+        usage_by_stage=usage,
+    ))
+    return {
+        "type": "matches",
+        "clarifying_question": None,
+        "matches": matches,
+        "notes": session.notes,
+        "usage": {stage: u.to_dict() for stage, u in usage.items()},
+    }
+
+
+def _run_pipeline(ask: str, company_name: str, db_path: str) -> _PipelineRun:
     t0 = time.time()
     timings = {}
+    usage: dict[str, LLMUsage] = {}
 
     company = get_company_context(db_path, company_name)
     company_ctx = _format_company_context(company)
     logger.info("[STEP 0] Clarity check starting — company=%s ask=%r", company_name, ask[:80])
 
     # Step 0: Clarity check
-    clarity = assess_ask_clarity(ask, company_ctx)
+    clarity, usage["clarity"] = assess_ask_clarity(ask, company_ctx, db_path)
     timings["clarity"] = time.time() - t0
+    STAGE_LATENCY.observe(timings["clarity"], stage="clarity")
     logger.info("[STEP 0] Clarity result: is_clear=%s (%.1fs elapsed)", clarity["is_clear"], timings["clarity"])
     if not clarity["is_clear"]:
         logger.info("[STEP 0] Returning clarifying question")
-        log_query(
-            slack_user_id=slack_user_id, company_name=company_name, ask_text=ask,
-            result_type="clarification", clarifying_question=clarity["clarifying_question"],
-            clarity_secs=timings["clarity"], total_secs=time.time() - t0,
+        STAGE_LATENCY.observe(time.time() - t0, stage="total")
+        return _PipelineRun(
+            result={
+                "type": "clarification",
+                "clarifying_question": clarity["clarifying_question"],
+                "matches": None,
+                "notes": None,
+                "usage": {stage: u.to_dict() for stage, u in usage.items()},
+            },
+            log_fields=dict(
+                result_type="clarification", clarifying_question=clarity["clarifying_question"],
+                clarity_secs=timings["clarity"], total_secs=time.time() - t0, usage_by_stage=usage,
+            ),
         )
-        return {
-            "type": "clarification",
-            "clarifying_question": clarity["clarifying_question"],
-            "matches": None,
-            "notes": None,
-        }
 
     # Step 1: Screen
     logger.info("[STEP 1] Building compressed profiles...")
-    compressed = get_compressed_profiles(db_path, shuffle=True)
-    logger.info("[STEP 1] Screening %d chars of profiles...", len(compressed))
+    only_ids = facet_prefilter(db_path, ask) if FACET_PUSHDOWN else None
+    corpus = get_stage1_corpus(db_path, shuffle=True, only_ids=only_ids)
+    if only_ids is not None:
+        logger.info("[STEP 1] Facet pre-filter kept %d profiles", len(corpus.contact_ids))
+    logger.info("[STEP 1] Screening %d compressed profiles...", len(corpus.contact_ids))
     t1 = time.time()
-    candidate_ids = stage1_screen(ask, company_ctx, compressed)
+    selected_ids, usage["stage1"] = stage1_screen(ask, company_ctx, corpus)
+    candidate_ids = corpus.resolve(selected_ids)
+    if len(candidate_ids) < len(selected_ids):
+        logger.warning("[STEP 1] Dropped %d unknown or repeated IDs", len(selected_ids) - len(candidate_ids))
     timings["stage1"] = time.time() - t1
+    STAGE_LATENCY.observe(timings["stage1"], stage="stage1")
     logger.info("[STEP 1] Screened → %d candidates (%.1fs stage1, %.1fs elapsed)", len(candidate_ids), timings["stage1"], time.time() - t0)
 
     # Step 2: Rank
     logger.info("[STEP 2] Building full profiles for %d candidates...", len(candidate_ids))
-    full_profiles = get_full_profiles(db_path, candidate_ids)
-    logger.info("[STEP 2] Ranking...")
+    full_profiles = get_full_profiles(db_path, candidate_ids, STAGE2_PROFILE_TOKENS, stage2_field_priority(ask))
+    logger.info("[STEP 2] Ranking ~%d profile tokens (budget %s per candidate)...",
+                estimate_tokens(full_profiles), STAGE2_PROFILE_TOKENS or "none")
     t2 = time.time()
-    stage2_result = stage2_rank(ask, company_ctx, full_profiles)
-    matches = stage2_result["matches"]
+    stage2_result, usage["stage2"] = stage2_rank(ask, company_ctx, full_profiles)
+    matches = fill_match_details(db_path, stage2_result["matches"], candidate_ids)
     notes = stage2_result.get("notes")
     timings["stage2"] = time.time() - t2
     total = time.time() - t0
-    logger.info("[STEP 2] Done → %d matches (%.1fs stage2, %.1fs total)", len(matches), timings["stage2"], total)
-
-    log_query(
-        slack_user_id=slack_user_id, company_name=company_name, ask_text=ask,
-        result_type="matches",
-        match_ids=[m["contact_id"] for m in matches],
-        match_names=[m["name"] for m in matches],
-        clarity_secs=timings["clarity"], stage1_secs=timings["stage1"],
-        stage2_secs=timings["stage2"], total_secs=total,
+    STAGE_LATENCY.observe(timings["stage2"], stage="stage2")
+    STAGE_LATENCY.observe(total, stage="total")
+    logger.info("[STEP 2] Done → %d matches, %d input tokens (%.1fs stage2, %.1fs total)",
+                len(matches), usage["stage2"].prompt_tokens, timings["stage2"], total)
+
+    return _PipelineRun(
+        result={
+            "type": "matches",
+            "clarifying_question": None,
+            "matches": matches,
+            "notes": notes,
+            "usage": {stage: u.to_dict() for stage, u in usage.items()},
+        },
+        log_fields=dict(
+            result_type="matches",
+            match_ids=[m["contact_id"] for m in matches],
+            match_names=[m["name"] for m in matches],
+            clarity_secs=timings["clarity"], stage1_secs=timings["stage1"],
+            stage2_secs=timings["stage2"], total_secs=total, usage_by_stage=usage,
+        ),
+        session=ThreadSession(company_name, ask, candidate_ids, matches, notes),
     )
-
-    return {
-        "type": "matches",
-        "clarifying_question": None,
-        "matches": matches,
-        "notes": notes,
-    }
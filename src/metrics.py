@@ -0,0 +1,248 @@
+"""Process metrics in the Prometheus text exposition format.
+
+A small stdlib-only registry (counters, gauges, histograms with labels) so
+the bot needs no extra dependency. start_metrics_server() serves /metrics
+from a daemon thread; when METRICS_PORT is 0 nothing listens and the hooks
+only update in-memory values.
+"""
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Stage latencies run from sub-second clarity checks to minute-long Stage 1 calls
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120)
+TOKEN_BUCKETS = (1000, 2000, 4000, 6000, 8000, 12000, 16000, 24000, 32000, 48000, 64000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._function = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """Increment while a block (or decorated function) runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def set_function(self, fn):
+        """Sample the (unlabelled) value from fn at scrape time."""
+        self._function = fn
+
+    def value(self, **labels) -> float:
+        if self._function is not None:
+            return self._function()
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = super().render()
+        if self._function is not None:
+            try:
+                lines.append(f"{self.name} {self._function()}")
+            except Exception:
+                logger.exception("Gauge callback for %s failed", self.name)
+            return lines
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (non-cumulative, +Inf last), sum, count]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def render(self):
+        lines = super().render()
+        with self._lock:
+            for key, (counts, total, n) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    le = _format_labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {n}")
+        return lines
+
+
+_registry: list[_Metric] = []
+
+
+def _register(metric: _Metric) -> _Metric:
+    _registry.append(metric)
+    return metric
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Bot metrics ---
+
+STAGE_LATENCY = _register(Histogram(
+    "era_stage_latency_seconds", "Pipeline stage latency in seconds", ("stage",)))
+LLM_CALLS = _register(Counter(
+    "era_llm_calls_total", "LLM provider calls that returned a response", ("backend", "stage")))
+LLM_RETRIES = _register(Counter(
+    "era_llm_retries_total", "LLM provider calls retried after a transient error", ("backend", "stage")))
+LLM_RATE_LIMITS = _register(Counter(
+    "era_llm_rate_limit_errors_total", "LLM provider rate-limit errors", ("backend", "stage")))
+LLM_CACHE_HITS = _register(Counter(
+    "era_llm_cache_hits_total", "LLM calls that read from the provider prompt cache", ("backend", "stage")))
+LLM_CACHE_READ_TOKENS = _register(Counter(
+    "era_llm_cache_read_tokens_total", "Prompt tokens served from the provider cache", ("backend", "stage")))
+DEDUP_HITS = _register(Counter(
+    "era_slack_dedup_hits_total", "Slack events dropped as redeliveries"))
+PIPELINES_IN_FLIGHT = _register(Gauge(
+    "era_pipelines_in_flight", "Matching pipelines currently running"))
+QUERY_LOG_QUEUE_DEPTH = _register(Gauge(
+    "era_query_log_queue_depth", "Query-log writes waiting for the background writer"))
+FULL_PROFILE_CACHE_HIT_RATE = _register(Gauge(
+    "era_full_profile_cache_hit_rate", "Share of Stage 2 profile lookups served from the in-memory cache"))
+BOT_READY = _register(Gauge(
+    "era_bot_ready", "1 once start-up warm-up has finished and the bot accepts events"))
+CLARITY_DECISIONS = _register(Counter(
+    "era_clarity_decisions_total", "Clarity checks by who decided: clear / vague (local fast path) or llm",
+    ("path",)))
+PIPELINES_COALESCED = _register(Counter(
+    "era_pipelines_coalesced_total", "Pipeline runs served by waiting on an identical run already in flight"))
+SESSION_REFINEMENTS = _register(Counter(
+    "era_session_refinements_total", "Thread follow-ups answered by a Stage 2-only re-rank of the cached candidates"))
+STAGE2_INPUT_TOKENS = _register(Histogram(
+    "era_stage2_input_tokens", "Prompt tokens (cached or not) of each Stage 2 call", buckets=TOKEN_BUCKETS))
+
+
+def record_llm_call(backend: str, stage: str, cache_read_tokens: int):
+    LLM_CALLS.inc(backend=backend, stage=stage)
+    if cache_read_tokens:
+        LLM_CACHE_HITS.inc(backend=backend, stage=stage)
+        LLM_CACHE_READ_TOKENS.inc(cache_read_tokens, backend=backend, stage=stage)
+
+
+# --- HTTP endpoint ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would drown the bot's own logs
+        pass
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics on host:port from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    logger.info("Metrics endpoint listening on http://%s:%d/metrics", host, server.server_port)
+    return server
@@ -1,7 +1,24 @@
+import os
+import re
+import json
 import random
-from functools import lru_cache
+import hashlib
+import itertools
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
 
-from src.db import get_enriched_contacts, get_research_profile, get_career_highlights
+from src.db import (
+    get_enriched_contacts, get_enriched_contacts_by_ids, get_research_profile, get_career_highlights,
+    get_contact_version, get_changed_contacts,
+)
+from src.config import FULL_PROFILE_CACHE_SIZE
+from src.metrics import FULL_PROFILE_CACHE_HIT_RATE
+from src.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 
 def _truncate(text: str, max_chars: int = 120) -> str:
@@ -39,85 +56,519 @@ def compress_profile(contact: dict) -> str:
     return "\n".join(lines)
 
 
-def get_compressed_profiles(db_path: str, shuffle: bool = True) -> str:
-    """Build the full compressed profiles block for Stage 1.
+# Fields compress_profile reads; a contact's content hash covers exactly these
+_COMPRESS_FIELDS = (
+    "contact_id", "full_name", "current_title", "current_company", "persona_category",
+    "primary_expertise", "secondary_expertise", "industry_verticals",
+    "actively_advising_startups", "open_to_outreach",
+)
 
-    Shuffles order each call to mitigate positional bias in LLM attention.
+
+def _content_hash(contact: dict) -> str:
+    values = json.dumps([contact.get(field) for field in _COMPRESS_FIELDS], default=str)
+    return hashlib.sha1(values.encode()).hexdigest()
+
+
+class _Corpus:
+    """Compressed Stage 1 entries for one DB, patched in place as contacts change."""
+
+    def __init__(self):
+        self.version: int | None = None  # highest contact_versions.version applied; None if untracked
+        self.mtime: float | None = None  # change signal for DBs without change tracking
+        self.entries: dict[int, str] = {}
+        self.hashes: dict[int, str] = {}
+        self.versions: dict[int, int] = {}  # per-contact stamp; absent = 0
+        self.ordered: list[str] = []
+        self.ids: tuple[int, ...] = ()  # contact_id order; alias n is ids[n - 1]
+        self.id_set: frozenset[int] = frozenset()
+        self._aliased: list[str] | None = None
+        self.unshuffled: dict[bool, "Stage1Corpus"] = {}  # aliases -> corpus in contact_id order
+        self.generation = next(_generations)  # distinguishes full rebuilds in cache keys
+
+    def reorder(self):
+        self.ids = tuple(sorted(self.entries))
+        self.id_set = frozenset(self.ids)
+        self.ordered = [self.entries[cid] for cid in self.ids]
+        self._aliased = None
+        self.unshuffled = {}
+
+    @property
+    def aliased(self) -> list[str]:
+        """Entries with [ID:<contact_id>] replaced by dense aliases [ID:c1]..[ID:cn]."""
+        if self._aliased is None:
+            self._aliased = _alias_entries(self.ids, self.ordered)
+        return self._aliased
+
+
+def _alias_entries(ids, entries: list[str]) -> list[str]:
+    return [f"[ID:c{alias}]{entry[len(f'[ID:{cid}]'):]}" for alias, (cid, entry) in enumerate(zip(ids, entries), 1)]
+
+
+def _alias_number(alias) -> int | None:
+    """n for an alias "c<n>"; None for anything else, including bare contact IDs."""
+    if isinstance(alias, str) and alias.startswith("c") and alias[1:].isdigit():
+        return int(alias[1:])
+    return None
+
+
+_generations = itertools.count()
+_corpus_lock = threading.Lock()
+_corpus_cache: dict[str, _Corpus] = {}
+
+
+def _db_mtime(db_path: str) -> float | None:
+    try:
+        return os.stat(db_path).st_mtime
+    except OSError:
+        return None
+
+
+def _rebuild_corpus(db_path: str, version: int | None) -> _Corpus:
+    corpus = _Corpus()
+    corpus.version = version
+    corpus.mtime = _db_mtime(db_path)
+    for contact in get_enriched_contacts(db_path):
+        cid = contact["contact_id"]
+        corpus.entries[cid] = compress_profile(contact)
+        corpus.hashes[cid] = _content_hash(contact)
+    corpus.reorder()
+    if version is not None:
+        corpus.versions = {r["contact_id"]: r["version"] for r in get_changed_contacts(db_path, 0)}
+    return corpus
+
+
+def _patch_corpus(db_path: str, corpus: _Corpus, version: int) -> tuple[int, int]:
+    """Re-read contacts stamped since the corpus version. Returns (changed, removed)."""
+    stamped = get_changed_contacts(db_path, corpus.version)
+    rows = {c["contact_id"]: c for c in get_enriched_contacts_by_ids(db_path, [r["contact_id"] for r in stamped])}
+    changed = removed = 0
+    for row in stamped:
+        cid = row["contact_id"]
+        corpus.versions[cid] = row["version"]
+        contact = rows.get(cid)
+        if contact is None:
+            if corpus.entries.pop(cid, None) is not None:
+                corpus.hashes.pop(cid, None)
+                removed += 1
+            continue
+        # Stamps also cover fields Stage 1 doesn't show; those leave the entry as is
+        content_hash = _content_hash(contact)
+        if content_hash != corpus.hashes.get(cid):
+            corpus.entries[cid] = compress_profile(contact)
+            corpus.hashes[cid] = content_hash
+            changed += 1
+    if changed or removed:
+        corpus.reorder()
+    corpus.version = max([version] + [r["version"] for r in stamped])
+    return changed, removed
+
+
+def refresh_corpus(db_path: str) -> dict:
+    """Bring the cached Stage 1 corpus for db_path up to date.
+
+    Only contacts stamped in contact_versions since the last refresh are
+    re-read and re-compressed; the first build reads everything, as does
+    every change to a DB without change tracking (see migrate_network_db).
+    The DB is only read. Returns counts of changed and removed entries.
+    """
+    with _corpus_lock:
+        corpus = _corpus_cache.get(db_path)
+        version = get_contact_version(db_path)
+
+        if version is None:
+            # No change tracking: fall back to the file's mtime
+            mtime = _db_mtime(db_path)
+            if corpus is not None and corpus.version is None and mtime is not None and corpus.mtime == mtime:
+                return {"changed": 0, "removed": 0, "total": len(corpus.entries), "full": False}
+            full = True
+        else:
+            full = corpus is None or corpus.version is None or version < corpus.version
+
+        if full:
+            corpus = _corpus_cache[db_path] = _rebuild_corpus(db_path, version)
+            report = {"changed": len(corpus.entries), "removed": 0, "total": len(corpus.entries), "full": True}
+            logger.info("[CORPUS] Built %d compressed profiles", report["total"])
+            return report
+        if version == corpus.version:
+            return {"changed": 0, "removed": 0, "total": len(corpus.entries), "full": False}
+
+        changed, removed = _patch_corpus(db_path, corpus, version)
+        logger.info("[CORPUS] Patched %d changed, %d removed of %d profiles", changed, removed, len(corpus.entries))
+        return {"changed": changed, "removed": removed, "total": len(corpus.entries), "full": False}
+
+
+def corpus_version(db_path: str) -> tuple:
+    """An identifier of the current Stage 1 corpus content; it changes whenever the corpus does."""
+    refresh_corpus(db_path)
+    with _corpus_lock:
+        corpus = _corpus_cache[db_path]
+        return (corpus.generation, corpus.version, corpus.mtime)
+
+
+_PROFILES_SLOT = "\x00profiles\x00"
+
+
+@dataclass(frozen=True)
+class Stage1Corpus:
+    """One ordering of the Stage 1 block and the ID mapping of the corpus version it came from.
+
+    Backends take the corpus itself rather than its text and call prompt()
+    with their template, so the ~200KB block is laid out once, directly in
+    its final form, instead of being joined and then copied into each
+    prompt string.
     """
-    contacts = get_enriched_contacts(db_path)
-    if shuffle:
-        contacts = list(contacts)
-        random.shuffle(contacts)
+    segments: tuple[str, ...]  # entries and "--- PROFILES" markers, in prompt order
+    contact_ids: tuple[int, ...]  # alias "c<n>" -> contact_ids[n - 1]
+    known_ids: frozenset[int]
+    aliased: bool
+    _prompts: dict = field(default_factory=dict, repr=False, compare=False)
 
+    @cached_property
+    def text(self) -> str:
+        """The bare profiles block."""
+        return "\n\n".join(self.segments)
+
+    def prompt(self, template: str) -> str:
+        """template (str.format style) with its {profiles} slot filled, rendered once per template."""
+        rendered = self._prompts.get(template)
+        if rendered is None:
+            head, tail = template.format(profiles=_PROFILES_SLOT).split(_PROFILES_SLOT)
+            # Fold head and tail into the edge segments so the block is copied exactly once
+            parts = list(self.segments) or [""]
+            parts[0] = head + parts[0]
+            parts[-1] = parts[-1] + tail
+            rendered = self._prompts[template] = "\n\n".join(parts)
+        return rendered
+
+    def resolve(self, ids: list[int | str]) -> list[int]:
+        """Map the IDs Stage 1 returned to contact IDs, dropping unknown (hallucinated) ones and repeats.
+
+        Aliases carry a "c" prefix so a real contact ID echoed back for an
+        aliased corpus is dropped rather than read as someone else's alias.
+        """
+        resolved = []
+        seen = set()
+        n = len(self.contact_ids)
+        for i in ids:
+            if self.aliased:
+                alias = _alias_number(i)
+                cid = self.contact_ids[alias - 1] if alias is not None and 1 <= alias <= n else None
+            else:
+                cid = i if i in self.known_ids else None
+            if cid is not None and cid not in seen:
+                seen.add(cid)
+                resolved.append(cid)
+        return resolved
+
+
+def _with_markers(entries: list[str]) -> tuple[str, ...]:
     segments = []
-    for i, contact in enumerate(contacts):
+    for i, entry in enumerate(entries):
         if i > 0 and i % 100 == 0:
-            segments.append(f"--- PROFILES {i+1}-{min(i+100, len(contacts))} ---")
-        segments.append(compress_profile(contact))
+            segments.append(f"--- PROFILES {i+1}-{min(i+100, len(entries))} ---")
+        segments.append(entry)
+    return tuple(segments)
 
-    return "\n\n".join(segments)
 
+@traced()
+def get_stage1_corpus(db_path: str, shuffle: bool = True, seed: int | None = None,
+                      aliases: bool = True, only_ids=None) -> Stage1Corpus:
+    """Build the Stage 1 block, by default with short per-version aliases in place of contact IDs.
 
-def format_full_profile(profile: dict, career: list[dict]) -> str:
-    """Format a full profile for Stage 2 ranking."""
-    lines = [
+    Shuffles order each call to mitigate positional bias in LLM attention.
+    A seed makes the shuffle reproducible (benchmarks, bias measurements).
+    Use the returned corpus's resolve() to map Stage 1's IDs back. The
+    unshuffled ordering is built once per corpus version and shared.
+
+    only_ids restricts the block to those contacts (a facet pre-filter);
+    aliases are then numbered densely over the subset.
+    """
+    refresh_corpus(db_path)
+    with _corpus_lock:
+        corpus = _corpus_cache[db_path]
+        if only_ids is None:
+            if not shuffle and aliases in corpus.unshuffled:
+                return corpus.unshuffled[aliases]
+            entries = corpus.aliased if aliases else corpus.ordered
+            contact_ids, known_ids = corpus.ids, corpus.id_set
+        else:
+            contact_ids = tuple(cid for cid in corpus.ids if cid in only_ids)
+            entries = [corpus.entries[cid] for cid in contact_ids]
+            if aliases:
+                entries = _alias_entries(contact_ids, entries)
+            known_ids = frozenset(contact_ids)
+        if not shuffle:
+            stage1 = Stage1Corpus(_with_markers(entries), contact_ids, known_ids, aliases)
+            if only_ids is None:
+                corpus.unshuffled[aliases] = stage1
+            return stage1
+    rng = random if seed is None else random.Random(seed)
+    return Stage1Corpus(_with_markers(rng.sample(entries, len(entries))), contact_ids, known_ids, aliases)
+
+
+def get_compressed_profiles(db_path: str, shuffle: bool = True, seed: int | None = None) -> str:
+    """Build the full compressed profiles block for Stage 1, with real contact IDs."""
+    return get_stage1_corpus(db_path, shuffle, seed, aliases=False).text
+
+
+def alias_token_savings(db_path: str) -> dict:
+    """Stage 1 corpus token counts with real contact IDs vs short aliases (cl100k_base)."""
+    import tiktoken
+    enc = tiktoken.get_encoding("cl100k_base")
+    real = len(enc.encode(get_compressed_profiles(db_path, shuffle=False)))
+    aliased = len(enc.encode(get_stage1_corpus(db_path, shuffle=False).text))
+    return {"real_id_tokens": real, "alias_tokens": aliased, "saved_tokens": real - aliased,
+            "saved_pct": (real - aliased) / real if real else 0.0}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for budgeting; no tokenizer needed."""
+    return (len(text) + 3) // 4
+
+
+# Stage 2 profile sections, in the order they are laid out
+STAGE2_FIELDS = (
+    "linkedin_url", "location", "primary_expertise", "secondary_expertise", "industry_verticals",
+    "functional_depth", "topics_discussed", "conversation_hooks", "companies_founded", "advisory_roles",
+    "availability", "engagement_style", "warm_intro_potential", "shared_affiliations", "career",
+)
+# Which sections survive a tight budget first, when the ask doesn't say otherwise
+_DEFAULT_PRIORITY = (
+    "primary_expertise", "industry_verticals", "career", "secondary_expertise", "functional_depth",
+    "availability", "companies_founded", "advisory_roles", "warm_intro_potential", "topics_discussed",
+    "conversation_hooks", "shared_affiliations", "engagement_style", "location", "linkedin_url",
+)
+# Ask cue -> sections that answer it
+_ASK_PRIORITIES = (
+    (re.compile(r"\b(intros?|introductions?|connect\w*|network\w*|reach)\b", re.IGNORECASE),
+     ("warm_intro_potential", "shared_affiliations")),
+    (re.compile(r"\b(rais\w*|fundrais\w*|investors?|vcs?|angels?|round)\b", re.IGNORECASE),
+     ("career", "advisory_roles", "companies_founded")),
+    (re.compile(r"\b(founders?|founded|built|started|scal\w*)\b", re.IGNORECASE),
+     ("companies_founded", "career")),
+    (re.compile(r"\b(advice|advis\w*|mentor\w*|feedback|guidance)\b", re.IGNORECASE),
+     ("availability", "advisory_roles", "functional_depth")),
+    (re.compile(r"\b(technical|engineer\w*|cto|architecture|infrastructure|data|ml|ai)\b", re.IGNORECASE),
+     ("functional_depth", "career")),
+    (re.compile(r"\b(based|located|local|city|region|nyc|london|sf|bay area|europe|asia)\b", re.IGNORECASE),
+     ("location",)),
+    (re.compile(r"\b(talk|chat|discuss\w*|speak\w*|topics?)\b", re.IGNORECASE),
+     ("topics_discussed", "conversation_hooks")),
+)
+# A section is cut down to fit the remaining budget only if at least this much is left
+_MIN_SECTION_TOKENS = 16
+
+
+def stage2_field_priority(ask: str) -> tuple[str, ...]:
+    """Profile sections in the order a tight Stage 2 budget should keep them for this ask."""
+    cued = [name for pattern, names in _ASK_PRIORITIES if pattern.search(ask) for name in names]
+    return tuple(dict.fromkeys(cued + list(_DEFAULT_PRIORITY)))
+
+
+def _fit(text: str, max_chars: int) -> str:
+    """Shorten a section to max_chars: whole lines for multi-line sections, else a truncated line."""
+    if "\n" not in text:
+        return _truncate(text, max_chars - 3)
+    lines = text.split("\n")
+    kept = lines[:1]
+    for line in lines[1:]:
+        if len("\n".join(kept + [line])) > max_chars:
+            break
+        kept.append(line)
+    return "\n".join(kept) if len(kept) > 1 else ""
+
+
+@dataclass(frozen=True)
+class FullProfile:
+    """A Stage 2 profile as its always-kept header and optional named sections."""
+    header: str  # ID, name, title, type / persona / seniority
+    sections: tuple[tuple[str, str], ...]  # (STAGE2_FIELDS name, text), in layout order
+
+    @cached_property
+    def text(self) -> str:
+        """The complete profile."""
+        return "\n".join([self.header] + [text for _, text in self.sections])
+
+    def render(self, budget_tokens: int, priority: tuple[str, ...] = _DEFAULT_PRIORITY) -> str:
+        """The profile within about budget_tokens, keeping sections in priority order.
+
+        The header is always kept. A section that doesn't fit is cut down to
+        half of what is left (so one verbose field can't crowd out the rest),
+        or dropped once less than _MIN_SECTION_TOKENS remain. Kept sections
+        stay in layout order.
+        """
+        if estimate_tokens(self.text) <= budget_tokens:
+            return self.text
+        rank = {name: i for i, name in enumerate(priority)}
+        remaining = budget_tokens - estimate_tokens(self.header)
+        kept = {}
+        for i in sorted(range(len(self.sections)), key=lambda i: rank.get(self.sections[i][0], len(rank))):
+            text = self.sections[i][1]
+            if estimate_tokens(text) + 1 > remaining:  # + newline
+                if remaining < _MIN_SECTION_TOKENS:
+                    continue
+                text = _fit(text, (max(remaining // 2, _MIN_SECTION_TOKENS) - 1) * 4)
+                if not text:
+                    continue
+            kept[i] = text
+            remaining -= estimate_tokens(text) + 1
+        return "\n".join([self.header] + [kept[i] for i in sorted(kept)])
+
+
+def build_full_profile(profile: dict, career: list[dict]) -> FullProfile:
+    """Split a contact's research profile and career into Stage 2 sections."""
+    header = "\n".join([
         f"[ID:{profile['contact_id']}] {profile.get('full_name', 'Unknown')}",
         f"Title: {profile.get('current_title', 'N/A')} @ {profile.get('current_company', 'N/A')}",
         f"Type: {profile.get('contact_type', 'N/A')} | Persona: {profile.get('persona_category', 'N/A')} | Seniority: {profile.get('seniority', 'N/A')}",
-    ]
+    ])
+    sections = []
 
-    if profile.get("linkedin_url"):
-        lines.append(f"LinkedIn: {profile['linkedin_url']}")
+    def add(name: str, label: str):
+        if profile.get(name):
+            sections.append((name, f"{label}: {profile[name]}"))
 
+    add("linkedin_url", "LinkedIn")
     location_parts = [p for p in [profile.get("city"), profile.get("state"), profile.get("country")] if p]
     if location_parts:
-        lines.append(f"Location: {', '.join(location_parts)}")
-
-    if profile.get("primary_expertise"):
-        lines.append(f"Primary Expertise: {profile['primary_expertise']}")
-    if profile.get("secondary_expertise"):
-        lines.append(f"Secondary Expertise: {profile['secondary_expertise']}")
-    if profile.get("industry_verticals"):
-        lines.append(f"Industry Verticals: {profile['industry_verticals']}")
-    if profile.get("functional_depth"):
-        lines.append(f"Functional Depth: {profile['functional_depth']}")
-    if profile.get("topics_discussed"):
-        lines.append(f"Topics Discussed: {profile['topics_discussed']}")
-    if profile.get("conversation_hooks"):
-        lines.append(f"Conversation Hooks: {profile['conversation_hooks']}")
-    if profile.get("companies_founded"):
-        lines.append(f"Companies Founded: {profile['companies_founded']}")
-    if profile.get("advisory_roles"):
-        lines.append(f"Advisory Roles: {profile['advisory_roles']}")
+        sections.append(("location", f"Location: {', '.join(location_parts)}"))
+
+    add("primary_expertise", "Primary Expertise")
+    add("secondary_expertise", "Secondary Expertise")
+    add("industry_verticals", "Industry Verticals")
+    add("functional_depth", "Functional Depth")
+    add("topics_discussed", "Topics Discussed")
+    add("conversation_hooks", "Conversation Hooks")
+    add("companies_founded", "Companies Founded")
+    add("advisory_roles", "Advisory Roles")
 
     advising = profile.get("actively_advising_startups", "unknown")
     outreach = profile.get("open_to_outreach", "unknown")
-    lines.append(f"Advising Startups: {advising} | Open to Outreach: {outreach}")
+    sections.append(("availability", f"Advising Startups: {advising} | Open to Outreach: {outreach}"))
 
-    if profile.get("engagement_style"):
-        lines.append(f"Engagement Style: {profile['engagement_style']}")
-    if profile.get("warm_intro_potential"):
-        lines.append(f"Warm Intro Potential: {profile['warm_intro_potential']}")
-    if profile.get("shared_affiliations"):
-        lines.append(f"Shared Affiliations: {profile['shared_affiliations']}")
+    add("engagement_style", "Engagement Style")
+    add("warm_intro_potential", "Warm Intro Potential")
+    add("shared_affiliations", "Shared Affiliations")
 
     if career:
-        lines.append("Career History:")
+        lines = ["Career History:"]
         for job in career[:5]:  # Top 5 most recent
             current = " (current)" if job.get("is_current") else ""
             dates = f" ({job.get('start_date', '?')} - {job.get('end_date', 'present')})" if job.get("start_date") else ""
             lines.append(f"  - {job.get('title', 'N/A')} @ {job.get('organization_name', 'N/A')}{dates}{current}")
+        sections.append(("career", "\n".join(lines)))
 
-    return "\n".join(lines)
+    return FullProfile(header, tuple(sections))
+
+
+def format_full_profile(profile: dict, career: list[dict]) -> str:
+    """Format a full profile for Stage 2 ranking."""
+    return build_full_profile(profile, career).text
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# (db_path, corpus generation, contact_id, contact version) -> Stage 2 FullProfile
+_full_profile_cache = LRUCache(FULL_PROFILE_CACHE_SIZE)
+FULL_PROFILE_CACHE_HIT_RATE.set_function(lambda: _full_profile_cache.stats()["hit_rate"])
+
+
+def _current_corpus(db_path: str) -> _Corpus:
+    refresh_corpus(db_path)
+    return _corpus_cache[db_path]
 
 
-def get_full_profiles(db_path: str, contact_ids: list[int]) -> str:
-    """Build full profiles for a list of contact IDs (Stage 2)."""
+def _full_profile_key(db_path: str, corpus: _Corpus, contact_id: int) -> tuple:
+    return (db_path, corpus.generation, contact_id, corpus.versions.get(contact_id, 0))
+
+
+def _render_full_profile(db_path: str, contact_id: int) -> FullProfile | None:
+    profile = get_research_profile(db_path, contact_id)
+    if profile is None:
+        return None
+    return build_full_profile(profile, get_career_highlights(db_path, contact_id))
+
+
+@traced()
+def get_full_profiles(db_path: str, contact_ids: list[int], budget_tokens: int = 0,
+                      priority: tuple[str, ...] | None = None) -> str:
+    """Build full profiles for a list of contact IDs (Stage 2).
+
+    Profiles are cached per contact version, so a contact whose research or
+    career rows change is re-rendered on its next use. With budget_tokens,
+    each profile is cut to about that many tokens, keeping sections in
+    priority order (see stage2_field_priority()).
+    """
+    corpus = _current_corpus(db_path)
+    priority = priority or _DEFAULT_PRIORITY
     profiles = []
     for cid in contact_ids:
-        profile = get_research_profile(db_path, cid)
+        key = _full_profile_key(db_path, corpus, cid)
+        profile = _full_profile_cache.get(key)
         if profile is None:
-            continue
-        career = get_career_highlights(db_path, cid)
-        profiles.append(format_full_profile(profile, career))
+            profile = _render_full_profile(db_path, cid)
+            if profile is None:
+                continue
+            _full_profile_cache.put(key, profile)
+        profiles.append(profile.render(budget_tokens, priority) if budget_tokens else profile.text)
     return "\n\n---\n\n".join(profiles)
+
+
+def get_full_profile_cache_stats() -> dict:
+    """Size, hits, misses, evictions and hit rate of the Stage 2 profile cache."""
+    return _full_profile_cache.stats()
+
+
+def prewarm_full_profiles(db_path: str, limit: int = 100) -> int:
+    """Render the contacts most often matched (per query_log) into the cache. Returns how many."""
+    from src.query_log import get_top_match_ids
+    corpus = _current_corpus(db_path)
+    warmed = 0
+    for cid in get_top_match_ids(min(limit, _full_profile_cache.maxsize)):
+        key = _full_profile_key(db_path, corpus, cid)
+        profile = _render_full_profile(db_path, cid)
+        if profile is not None:
+            _full_profile_cache.put(key, profile)
+            warmed += 1
+    logger.info("[CORPUS] Prewarmed %d full profiles", warmed)
+    return warmed
@@ -0,0 +1,182 @@
+"""Opt-in profiling of matching pipeline runs.
+
+A run is profiled when the caller asks for it (the Slack "--profile" debug
+flag) or when it is picked by PROFILE_SAMPLE_RATE. Two modes:
+
+- "cprofile": deterministic cProfile, written as a .prof file (snakeviz,
+  pstats).
+- "sampling": a thread samples the pipeline thread's stack every
+  PROFILE_SAMPLE_INTERVAL seconds and writes collapsed stacks (.folded),
+  which speedscope and flamegraph.pl render directly. Lower overhead on
+  long LLM waits.
+
+Profiles are named after the run's query_log row ID once it is committed,
+and the oldest files are deleted when the directory exceeds
+PROFILE_MAX_BYTES. With sampling at 0 and no request flag, nothing beyond
+one comparison runs.
+"""
+import os
+import sys
+import uuid
+import random
+import logging
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from src.config import PROFILE_DIR, PROFILE_MODE, PROFILE_SAMPLE_RATE, PROFILE_SAMPLE_INTERVAL, PROFILE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+_current_session: ContextVar["ProfileSession | None"] = ContextVar("profile_session", default=None)
+
+
+class _SamplingProfiler:
+    """Samples one thread's Python stack on a timer and counts collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pipeline-sampler", daemon=True)
+        self.stacks: Counter = Counter()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileSession:
+    """One profiled pipeline run; renamed to its query_log ID when that is known."""
+
+    def __init__(self, mode: str, profile_dir: str):
+        self.mode = mode
+        self.profile_dir = Path(profile_dir)
+        self.suffix = ".prof" if mode == "cprofile" else ".folded"
+        self.path: Path | None = None
+        self._profiler = None
+        self._log_future = None
+
+    def start(self):
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = _SamplingProfiler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+            self._profiler.start()
+
+    def stop(self):
+        if self.mode == "cprofile":
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.profile_dir / f"pending-{uuid.uuid4().hex}{self.suffix}"
+        if self.mode == "cprofile":
+            self._profiler.dump_stats(str(self.path))
+        else:
+            self._profiler.dump(str(self.path))
+        _rotate(self.profile_dir, PROFILE_MAX_BYTES)
+        if self._log_future is not None:
+            self._log_future.add_done_callback(self._rename)
+        else:
+            logger.info("[PROFILE] Wrote %s", self.path)
+
+    def name_after(self, log_future):
+        """Rename the profile to query-<id> once the query_log row is committed."""
+        self._log_future = log_future
+
+    def _rename(self, future):
+        row_id = None if future.exception() else future.result()
+        if row_id is None or not self.path.exists():
+            logger.info("[PROFILE] Wrote %s (no query_log id)", self.path)
+            return
+        target = self.path.with_name(f"query-{row_id}{self.suffix}")
+        try:
+            self.path.rename(target)
+        except FileNotFoundError:  # rotated away in the meantime
+            return
+        self.path = target
+        logger.info("[PROFILE] Wrote %s", target)
+
+
+def _rotate(profile_dir: Path, max_bytes: int):
+    """Delete the oldest profiles until the directory fits in max_bytes."""
+    files = []
+    for path in profile_dir.iterdir():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:  # deleted by a concurrent session's rotation
+            continue
+        if path.is_file():
+            files.append((stat.st_mtime, stat.st_size, path))
+    files.sort(key=lambda entry: entry[0])
+    total = sum(size for _, size, _ in files)
+    while files and total > max_bytes:
+        _, size, oldest = files.pop(0)
+        total -= size
+        try:
+            oldest.unlink()
+        except FileNotFoundError:
+            pass
+
+
+@contextmanager
+def maybe_profile(force: bool = False, mode: str | None = None, profile_dir: str | None = None):
+    """Profile the enclosed block if forced or sampled; yields the session or None.
+
+    Profiling never fails the run: a profiler that can't start (e.g. another
+    cProfile already active on Python 3.12+) or a profile that can't be
+    written is logged and skipped.
+    """
+    if not force and not (PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE):
+        yield None
+        return
+    session = ProfileSession(mode or PROFILE_MODE, profile_dir or PROFILE_DIR)
+    try:
+        session.start()
+    except Exception as exc:
+        logger.warning("[PROFILE] Could not start %s profiler, running unprofiled: %s", session.mode, exc)
+        session = None
+    if session is None:
+        yield None
+        return
+    token = _current_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_session.reset(token)
+        try:
+            session.stop()
+        except Exception as exc:
+            logger.warning("[PROFILE] Could not write profile: %s", exc)
+
+
+def attach_query_log(log_future):
+    """Name the active profile (if any) after the query_log row being written. Returns the future."""
+    session = _current_session.get()
+    if session is not None:
+        session.name_after(log_future)
+    return log_future
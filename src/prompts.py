@@ -34,7 +34,7 @@ IMPORTANT INSTRUCTIONS:
 - When the ask mentions a specific industry the founder sells into (e.g., "procurement teams", "hotels", "legal"), include candidates with experience in that TARGET INDUSTRY, not just people who do the function (e.g., sales) generically.
 - Prefer candidates who are actively advising startups or open to outreach when the signal is available.
 
-Select between 15 and 30 candidates. Return their contact IDs.
+Select between 15 and 30 candidates. Return their IDs exactly as written after "ID:".
 
 <profiles>
 {profiles}
@@ -62,11 +62,5 @@ IMPORTANT:
 - If fewer than 3 strong matches exist, return fewer and note the gap explicitly.
 - Each explanation should help the founder understand exactly WHY this person is worth reaching out to.
 
-<company_context>
-{company_context}
-</company_context>
-
-<candidates>
-{full_profiles}
-</candidates>
+The founder's company context is provided in <company_context> tags and the candidate profiles in <candidates> tags.
 """
@@ -1,16 +1,27 @@
 import sqlite3
 import json
 import time
+import queue
+import atexit
 import logging
+import threading
+from concurrent.futures import Future
 from contextlib import closing
 from pathlib import Path
 
+from src.backends.base import LLMUsage
 from src.config import PROJECT_ROOT
+from src.metrics import QUERY_LOG_QUEUE_DEPTH
 
 logger = logging.getLogger(__name__)
 
 LOG_DB_PATH = str(PROJECT_ROOT / "era_query_log.db")
 
+# Writer tuning: commit every BATCH_SIZE rows or FLUSH_INTERVAL seconds, whichever comes first
+WRITER_QUEUE_SIZE = 1000
+WRITER_BATCH_SIZE = 50
+WRITER_FLUSH_INTERVAL = 0.2
+
 _CREATE_TABLE = """
 CREATE TABLE IF NOT EXISTS query_log (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -27,17 +38,269 @@ CREATE TABLE IF NOT EXISTS query_log (
     stage2_secs REAL,
     total_secs REAL,
     feedback TEXT,
-    created_at TEXT DEFAULT (datetime('now'))
+    created_at TEXT DEFAULT (datetime('now')),
+    channel TEXT,
+    message_ts TEXT,
+    backend TEXT,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    cache_read_tokens INTEGER,
+    cache_creation_tokens INTEGER,
+    cache_hit_ratio REAL,
+    cost_usd REAL,
+    usage_by_stage TEXT,
+    coalesced INTEGER
 )
 """
 
+# Columns added after the initial schema; existing log DBs are upgraded in place
+_ADDED_COLUMNS = [
+    ("channel", "TEXT"),
+    ("message_ts", "TEXT"),
+    ("backend", "TEXT"),
+    ("input_tokens", "INTEGER"),
+    ("output_tokens", "INTEGER"),
+    ("cache_read_tokens", "INTEGER"),
+    ("cache_creation_tokens", "INTEGER"),
+    ("cache_hit_ratio", "REAL"),
+    ("cost_usd", "REAL"),
+    ("usage_by_stage", "TEXT"),
+    ("coalesced", "INTEGER"),
+]
+
+_CREATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_query_log_user_time ON query_log (slack_user_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_query_log_message ON query_log (channel, message_ts)",
+    "CREATE INDEX IF NOT EXISTS idx_query_log_time ON query_log (timestamp)",
+]
+
+_INSERT_QUERY = """INSERT INTO query_log
+   (timestamp, slack_user_id, company_name, ask_text, result_type,
+    clarifying_question, match_ids, match_names,
+    clarity_secs, stage1_secs, stage2_secs, total_secs, channel, message_ts, backend,
+    input_tokens, output_tokens, cache_read_tokens, cache_creation_tokens,
+    cache_hit_ratio, cost_usd, usage_by_stage, coalesced)
+   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+# Point lookup on the reacted-to message. A reaction on any other message
+# (handle_reaction sees every thumbs up/down) matches no row and updates nothing.
+_UPDATE_FEEDBACK = """UPDATE query_log SET feedback = ?
+   WHERE id = (SELECT id FROM query_log WHERE channel = ? AND message_ts = ? LIMIT 1)"""
+
+
+def _migrate(conn: sqlite3.Connection):
+    """Add columns and indexes missing from log DBs created by older versions."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(query_log)")}
+    for name, decl in _ADDED_COLUMNS:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE query_log ADD COLUMN {name} {decl}")
+            logger.info("[LOG] Migrated query_log: added column %s", name)
+    for statement in _CREATE_INDEXES:
+        conn.execute(statement)
+    conn.commit()
+
 
 def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(LOG_DB_PATH)
+    conn = sqlite3.connect(LOG_DB_PATH, check_same_thread=False)
+    # WAL lets readers (reports, tests) proceed while the writer commits,
+    # and NORMAL sync skips the per-commit fsync of the default mode
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
     conn.execute(_CREATE_TABLE)
+    _migrate(conn)
     return conn
 
 
+class QueryLogWriter:
+    """Background thread that batches query-log writes into single transactions.
+
+    Statements are queued with a Future that resolves to the statement's
+    lastrowid once committed. When the queue is full, writes are dropped
+    (and counted) rather than blocking the request path.
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_queue: int = WRITER_QUEUE_SIZE, batch_size: int = WRITER_BATCH_SIZE,
+                 flush_interval: float = WRITER_FLUSH_INTERVAL):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._stats_lock = threading.Lock()
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "dropped": 0, "errors": 0}
+        self._conn: sqlite3.Connection | None = None
+        self._conn_path: str | None = None
+        self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._thread.start()
+
+    def _bump(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def submit(self, sql: str, params: tuple) -> Future:
+        """Queue a statement for the next batch. Never blocks."""
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((sql, params, future))
+        except queue.Full:
+            self._bump("dropped")
+            logger.warning("[LOG] Query log queue full, dropping write")
+            future.set_result(None)
+            return future
+        self._bump("enqueued")
+        return future
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until everything queued so far is committed. Returns False on timeout."""
+        if not self._thread.is_alive():
+            return True
+        barrier: Future = Future()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._queue.put((None, None, barrier), timeout=timeout)
+            barrier.result(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+        except (queue.Full, TimeoutError):
+            return False
+        return True
+
+    def close(self, timeout: float | None = 5.0):
+        """Flush pending writes and stop the writer thread, waiting at most about timeout seconds."""
+        if not self._thread.is_alive():
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("[LOG] Query log queue still full at shutdown; %d writes not flushed", self._queue.qsize())
+            return
+        self._thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        return stats
+
+    def _connection(self) -> sqlite3.Connection:
+        # LOG_DB_PATH is read per batch so tests (and tools) can repoint it
+        if self._conn is None or self._conn_path != LOG_DB_PATH:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = _connect()
+            self._conn_path = LOG_DB_PATH
+        return self._conn
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self._flush_interval
+            while True:
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                # A flush barrier commits immediately instead of waiting out the interval
+                if item[0] is None or len(batch) >= self._batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(batch)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _write_batch(self, batch: list[tuple]):
+        statements = [entry for entry in batch if entry[0] is not None]
+        if statements:
+            # Any failure fails these rows only; the writer keeps running
+            try:
+                conn = self._connection()
+            except Exception as exc:
+                self._fail(statements, exc)
+            else:
+                self._write_statements(conn, statements)
+        for sql, _, future in batch:
+            if sql is None:
+                future.set_result(None)
+
+    def _write_statements(self, conn: sqlite3.Connection, statements: list[tuple]):
+        try:
+            with conn:
+                results = [conn.execute(sql, params).lastrowid for sql, params, _ in statements]
+        except Exception as exc:
+            # The transaction was rolled back: retry row by row so one bad row loses only itself
+            logger.warning("[LOG] Query log batch of %d failed, retrying rows one at a time: %s",
+                           len(statements), exc)
+            self._write_rows(conn, statements)
+            return
+        self._bump("written", len(statements))
+        self._bump("batches")
+        for (_, _, future), row_id in zip(statements, results):
+            future.set_result(row_id)
+
+    def _write_rows(self, conn: sqlite3.Connection, statements: list[tuple]):
+        for sql, params, future in statements:
+            try:
+                with conn:
+                    row_id = conn.execute(sql, params).lastrowid
+            except Exception as exc:
+                self._fail([(sql, params, future)], exc)
+                continue
+            self._bump("written")
+            self._bump("batches")
+            future.set_result(row_id)
+
+    def _fail(self, statements: list[tuple], exc: Exception):
+        self._bump("errors", len(statements))
+        logger.error("[LOG] Query log write of %d rows failed: %s", len(statements), exc, exc_info=exc)
+        for _, _, future in statements:
+            future.set_exception(exc)
+
+
+_writer: QueryLogWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer() -> QueryLogWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = QueryLogWriter()
+                atexit.register(shutdown)
+    return _writer
+
+
+QUERY_LOG_QUEUE_DEPTH.set_function(lambda: _writer.stats()["queue_depth"] if _writer else 0)
+
+
+def flush(timeout: float | None = None) -> bool:
+    """Wait for all queued log writes to be committed."""
+    return _get_writer().flush(timeout)
+
+
+def shutdown():
+    """Flush pending writes and stop the background writer."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+
+def get_write_stats() -> dict:
+    """Return writer counters: enqueued, written, batches, dropped, errors, queue_depth."""
+    return _get_writer().stats()
+
+
 def log_query(
     slack_user_id: str | None,
     company_name: str | None,
@@ -50,47 +313,66 @@ def log_query(
     stage1_secs: float | None = None,
     stage2_secs: float | None = None,
     total_secs: float | None = None,
-) -> int:
-    """Log a query and return the row ID."""
-    with closing(_connect()) as conn:
-        cur = conn.execute(
-            """INSERT INTO query_log
-               (timestamp, slack_user_id, company_name, ask_text, result_type,
-                clarifying_question, match_ids, match_names,
-                clarity_secs, stage1_secs, stage2_secs, total_secs)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (
-                time.time(),
-                slack_user_id,
-                company_name,
-                ask_text,
-                result_type,
-                clarifying_question,
-                json.dumps(match_ids) if match_ids else None,
-                json.dumps(match_names) if match_names else None,
-                clarity_secs,
-                stage1_secs,
-                stage2_secs,
-                total_secs,
-            ),
-        )
-        row_id = cur.lastrowid
-        conn.commit()
-        logger.info("[LOG] Query logged: id=%d type=%s company=%s", row_id, result_type, company_name)
-        return row_id
+    channel: str | None = None,
+    message_ts: str | None = None,
+    backend: str | None = None,
+    usage_by_stage: dict[str, LLMUsage] | None = None,
+    coalesced: bool = False,
+) -> Future:
+    """Queue a query for logging. Returns a Future resolving to the row ID (None if dropped).
+
+    usage_by_stage is stored as JSON alongside token, cache-hit and cost totals.
+    coalesced marks a query answered by sharing another in-flight run (no spend of its own).
+    """
+    total = sum(usage_by_stage.values(), LLMUsage()) if usage_by_stage else None
+    future = _get_writer().submit(
+        _INSERT_QUERY,
+        (
+            time.time(),
+            slack_user_id,
+            company_name,
+            ask_text,
+            result_type,
+            clarifying_question,
+            json.dumps(match_ids) if match_ids else None,
+            json.dumps(match_names) if match_names else None,
+            clarity_secs,
+            stage1_secs,
+            stage2_secs,
+            total_secs,
+            channel,
+            message_ts,
+            backend,
+            total.input_tokens if total else None,
+            total.output_tokens if total else None,
+            total.cache_read_tokens if total else None,
+            total.cache_creation_tokens if total else None,
+            total.cache_hit_ratio if total else None,
+            total.cost_usd if total else None,
+            json.dumps({stage: u.to_dict() for stage, u in usage_by_stage.items()}) if usage_by_stage else None,
+            int(coalesced),
+        ),
+    )
+    logger.info("[LOG] Query queued: type=%s company=%s", result_type, company_name)
+    return future
 
 
 def log_feedback(slack_user_id: str, channel: str, message_ts: str, reaction: str):
-    """Log a feedback reaction. Tries to match it to the most recent query from this user."""
+    """Log a feedback reaction against the query whose result message was reacted to."""
+    # Goes through the same queue so it lands after any pending insert for this message
+    _get_writer().submit(_UPDATE_FEEDBACK, (reaction, channel, message_ts))
+    logger.info("[LOG] Feedback queued: user=%s reaction=%s", slack_user_id, reaction)
+
+
+def get_top_match_ids(limit: int = 100) -> list[int]:
+    """Contact IDs most often returned as matches, most frequent first."""
     with closing(_connect()) as conn:
-        conn.execute(
-            """UPDATE query_log SET feedback = ?
-               WHERE id = (
-                   SELECT id FROM query_log
-                   WHERE slack_user_id = ?
-                   ORDER BY timestamp DESC LIMIT 1
-               )""",
-            (reaction, slack_user_id),
-        )
-        conn.commit()
-        logger.info("[LOG] Feedback logged: user=%s reaction=%s", slack_user_id, reaction)
+        rows = conn.execute("""
+            SELECT CAST(j.value AS INTEGER), COUNT(*) AS n
+            FROM query_log, json_each(query_log.match_ids) AS j
+            WHERE query_log.match_ids IS NOT NULL
+            GROUP BY 1
+            ORDER BY n DESC, 1
+            LIMIT ?
+        """, (limit,)).fetchall()
+    return [row[0] for row in rows]
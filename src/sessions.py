@@ -0,0 +1,120 @@
+"""Per-thread matching sessions, so follow-up asks can refine the last result.
+
+A session records what the pipeline did for the latest ask in a Slack
+thread: the Stage 1 candidate IDs and the matches returned. A follow-up
+in the same thread that only narrows or re-weights that result ("any of
+them in NYC?", "which of those has raised a Series A?") is answered by
+re-ranking the same candidates in Stage 2, with no clarity check and no
+Stage 1 pass over the whole network.
+Anything that reads as a new ask runs the full pipeline and replaces the
+session.
+
+Sessions live in memory for THREAD_SESSION_TTL seconds after their last
+use, and at most THREAD_SESSION_MAX are kept (least recently used first
+out).
+"""
+import re
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from src.config import THREAD_SESSION_TTL, THREAD_SESSION_MAX
+
+
+@dataclass
+class ThreadSession:
+    """The last matching run in one thread."""
+    company_name: str
+    ask: str  # the ask Stage 2 ranked against, including earlier refinements
+    candidate_ids: list[int]  # profiles are re-rendered per refinement (budget priority follows the ask)
+    matches: list[dict]
+    notes: str | None = None
+    refinements: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class SessionStore:
+    """Thread-safe LRU of ThreadSessions with an idle TTL."""
+
+    def __init__(self, ttl: float = THREAD_SESSION_TTL, maxsize: int = THREAD_SESSION_MAX):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._sessions: OrderedDict[str, ThreadSession] = OrderedDict()
+
+    def get(self, key: str) -> ThreadSession | None:
+        """The live session for a thread (refreshing its TTL), or None."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                return None
+            if now - session.last_used > self.ttl:
+                del self._sessions[key]
+                return None
+            session.last_used = now
+            self._sessions.move_to_end(key)
+            return session
+
+    def put(self, key: str, session: ThreadSession):
+        session.last_used = time.monotonic()
+        with self._lock:
+            self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.maxsize:
+                self._sessions.popitem(last=False)
+
+    def discard(self, key: str):
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+sessions = SessionStore()
+
+
+def thread_key(channel: str, thread_ts: str) -> str:
+    return f"{channel}:{thread_ts}"
+
+
+# Phrases that point back at the previous result set. Bare pronouns don't count: "they" and "them"
+# refer to people described in the same message just as often ("founders who sold to banks, they ...")
+_BACK_REFERENCE = re.compile(
+    r"\b((?:of|among|from) (?:them|those|these)|(?:those|these) (?:ones|people|folks|contacts|matches|names)|"
+    r"the (?:list|(?:previous|last|same) (?:ones|people|matches|results|list)))\b",
+    re.IGNORECASE,
+)
+# Openers that can only re-weight an existing result; generic openers (who, which, any, someone,
+# and, but, more) start new asks just as often and need a back-reference
+_NARROWING = re.compile(
+    r"^\s*(only|just|prefer|preferably|ideally|rather|instead|what about|how about|less)\b",
+    re.IGNORECASE,
+)
+_MAX_REFINEMENT_WORDS = 20
+
+
+def is_refinement(text: str) -> bool:
+    """Whether a follow-up narrows the previous result rather than asking for something new.
+
+    Short messages that refer back to the last result ("any of them in NYC?",
+    "which of those has raised a Series A?") qualify, as do ones opening with
+    a word that only makes sense against it ("only operators", "prefer
+    someone based in London"). Anything else, including short questions like
+    "which VCs invest in biotech?", is a new ask.
+    """
+    if len(text.split()) > _MAX_REFINEMENT_WORDS:
+        return False
+    return bool(_BACK_REFERENCE.search(text) or _NARROWING.search(text))
+
+
+def refined_ask(session: ThreadSession, follow_up: str) -> str:
+    """The ask Stage 2 should rank against: the original ask plus every refinement so far."""
+    return f"{session.ask}\nFollow-up: {follow_up}"
@@ -2,18 +2,34 @@ import os
 import logging
 import threading
 import time as _time
-from slack_bolt import App
-from slack_bolt.adapter.socket_mode import SocketModeHandler
+from typing import TYPE_CHECKING
 
-from src.config import SLACK_BOT_TOKEN, SLACK_APP_TOKEN, DB_PATH, MAX_ASK_LENGTH
-from src.matching import run_matching_pipeline
+from src.config import (
+    SLACK_BOT_TOKEN, SLACK_APP_TOKEN, DB_PATH, MAX_ASK_LENGTH, METRICS_PORT,
+    WARM_PROMPT_CACHE, READY_FILE, PREWARM_FULL_PROFILES, CLARITY_FAST_PATH,
+)
 from src.db import get_all_era30_companies
+from src.metrics import BOT_READY, DEDUP_HITS, start_metrics_server
+from src.sessions import thread_key
+from src.tracing import span, traced
+
+if TYPE_CHECKING:
+    from slack_bolt import App
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Defer App initialization to start() so module can be imported without auth
-_app: App | None = None
+# Defer App initialization to start() so module can be imported without auth.
+# slack_bolt and src.matching (LLM SDKs, pydantic schemas) are imported in
+# warm_up() so importing this module stays cheap.
+_app: "App | None" = None
+
+# Set once warm_up() has finished; Socket Mode is not connected before then
+ready = threading.Event()
+
+# ERA30 company options for the selection dropdown: (db mtime, options)
+_company_options_lock = threading.Lock()
+_company_options_cache: tuple[float, list[dict]] | None = None
 
 # In-memory store for founder -> company mapping (per Slack user ID)
 _user_company_lock = threading.Lock()
@@ -39,6 +55,25 @@ def _is_duplicate_event(event_ts: str) -> bool:
     return False
 
 
+def _extract_debug_flags(text: str) -> tuple[str, bool]:
+    """Strip a "--profile" debug flag from an ask. Returns (text, profile)."""
+    import re
+    stripped, count = re.subn(r'\s*--profile\b', '', text)
+    return stripped.strip(), count > 0
+
+
+def _post_message(client, **kwargs):
+    """chat_postMessage wrapped in a tracing span."""
+    with span("slack.chat_postMessage", channel=kwargs.get("channel")):
+        return client.chat_postMessage(**kwargs)
+
+
+def _update_message(client, **kwargs):
+    """chat_update wrapped in a tracing span."""
+    with span("slack.chat_update", channel=kwargs.get("channel")):
+        return client.chat_update(**kwargs)
+
+
 def _sanitize_ask(text: str) -> str:
     """Escape XML-like closing tags that could break prompt structure."""
     import re
@@ -58,16 +93,31 @@ def _set_founder_company(user_id: str, company_name: str):
         _user_company_map[user_id] = company_name
 
 
+def _company_options() -> list[dict]:
+    """Dropdown options for every ERA30 company, cached until the DB file changes."""
+    global _company_options_cache
+    try:
+        mtime = os.stat(DB_PATH).st_mtime
+    except OSError:
+        mtime = None
+    with _company_options_lock:
+        if _company_options_cache is not None and mtime is not None and _company_options_cache[0] == mtime:
+            return _company_options_cache[1]
+        options = [
+            {
+                "text": {"type": "plain_text", "text": c["name"]},
+                "value": c["name"],
+            }
+            for c in get_all_era30_companies(DB_PATH)
+        ]
+        if mtime is not None:
+            _company_options_cache = (mtime, options)
+        return options
+
+
 def _build_company_selection_blocks() -> list[dict]:
     """Build Block Kit blocks for company selection."""
-    companies = get_all_era30_companies(DB_PATH)
-    options = [
-        {
-            "text": {"type": "plain_text", "text": c["name"]},
-            "value": c["name"],
-        }
-        for c in companies
-    ]
+    options = _company_options()
     return [
         {
             "type": "section",
@@ -131,6 +181,7 @@ def format_results_as_blocks(results: dict) -> list[dict]:
     return blocks
 
 
+@traced()
 def _process_ask(event, client):
     """Process a founder's ask through the matching pipeline."""
     user_id = event["user"]
@@ -144,12 +195,15 @@ def _process_ask(event, client):
     # Deduplicate retried events from Slack
     if event_ts and _is_duplicate_event(event_ts):
         logger.info("[SKIP] Duplicate event ts=%s", event_ts)
+        DEDUP_HITS.inc()
         return
 
     # Remove bot mention if present
     if text.startswith("<@"):
         text = text.split(">", 1)[-1].strip()
 
+    text, profile = _extract_debug_flags(text)
+
     if not text:
         logger.info("[SKIP] Empty text after cleanup")
         return
@@ -157,7 +211,8 @@ def _process_ask(event, client):
     # Reject excessively long input
     if len(text) > MAX_ASK_LENGTH:
         logger.info("[SKIP] Input too long: %d chars", len(text))
-        client.chat_postMessage(
+        _post_message(
+            client,
             channel=channel,
             thread_ts=thread_ts,
             text=f":warning: Your ask is too long ({len(text)} chars). Please keep it under {MAX_ASK_LENGTH} characters.",
@@ -171,7 +226,8 @@ def _process_ask(event, client):
     company_name = _identify_founder(user_id, client)
     if not company_name:
         logger.info("[ID] Founder not identified, sending company selection")
-        client.chat_postMessage(
+        _post_message(
+            client,
             channel=channel,
             thread_ts=thread_ts,
             blocks=_build_company_selection_blocks(),
@@ -182,20 +238,27 @@ def _process_ask(event, client):
     logger.info("[PIPELINE] Starting pipeline for company=%s ask=%r", company_name, text[:80])
 
     # Post thinking indicator
-    thinking = client.chat_postMessage(
+    thinking = _post_message(
+        client,
         channel=channel,
         thread_ts=thread_ts,
         text=":mag: Searching the ERA network...",
     )
     logger.info("[PIPELINE] Posted thinking indicator")
 
+    from src.matching import run_matching_pipeline
     try:
-        results = run_matching_pipeline(text, company_name, DB_PATH, slack_user_id=user_id)
+        results = run_matching_pipeline(
+            text, company_name, DB_PATH, slack_user_id=user_id,
+            channel=channel, message_ts=thinking["ts"], profile=profile,
+            thread=thread_key(channel, thread_ts),
+        )
         logger.info("[PIPELINE] Complete — type=%s matches=%d",
                      results["type"],
                      len(results.get("matches") or []))
         blocks = format_results_as_blocks(results)
-        client.chat_update(
+        _update_message(
+            client,
             channel=channel,
             ts=thinking["ts"],
             blocks=blocks,
@@ -204,14 +267,15 @@ def _process_ask(event, client):
         logger.info("[PIPELINE] Results posted to Slack")
     except Exception as e:
         logger.exception("[PIPELINE] Error: %s", e)
-        client.chat_update(
+        _update_message(
+            client,
             channel=channel,
             ts=thinking["ts"],
             text=":warning: Sorry, I ran into an issue searching the network. Please try again.",
         )
 
 
-def _register_handlers(app: App):
+def _register_handlers(app: "App"):
     """Register event and action handlers on the app."""
 
     @app.event("message")
@@ -246,7 +310,8 @@ def _register_handlers(app: App):
         channel = body["channel"]["id"]
         # Thread the reply under the message containing the dropdown
         message_ts = body.get("message", {}).get("ts") or body.get("container", {}).get("message_ts")
-        client.chat_postMessage(
+        _post_message(
+            client,
             channel=channel,
             thread_ts=message_ts,
             text=f":white_check_mark: Got it, you're with *{selected}*. Now @mention me with your ask, e.g. `@ERA Network Bot I need someone who understands enterprise sales`",
@@ -270,9 +335,72 @@ def _register_handlers(app: App):
             )
 
 
+def _timed(timings: dict, name: str, fn, *args):
+    t0 = _time.perf_counter()
+    result = fn(*args)
+    timings[name] = _time.perf_counter() - t0
+    return result
+
+
+def _import_slack_bolt():
+    import slack_bolt
+    import slack_bolt.adapter.socket_mode
+    return slack_bolt
+
+
+def _import_matching():
+    import src.matching
+    return src.matching
+
+
+def warm_up(warm_prompt_cache: bool = WARM_PROMPT_CACHE) -> dict[str, float]:
+    """Do the first-ask work up front: heavy imports, LLM client, corpus, company list.
+
+    PREWARM_FULL_PROFILES renders that many of the most-matched contacts'
+    Stage 2 profiles. With warm_prompt_cache, also sends one clarity call so
+    the provider connection is open and the clarity prefix is cached.
+    Returns seconds spent per step.
+    """
+    from src.clarity import get_lexicon
+    from src.profiles import corpus_version, get_stage1_corpus, prewarm_full_profiles
+
+    timings: dict[str, float] = {}
+    t0 = _time.perf_counter()
+    _timed(timings, "import_slack_bolt", _import_slack_bolt)
+    matching = _timed(timings, "import_matching", _import_matching)
+    _timed(timings, "backend", matching._get_backend)
+    _timed(timings, "corpus", get_stage1_corpus, DB_PATH, False)
+    if CLARITY_FAST_PATH:
+        _timed(timings, "clarity_lexicon", get_lexicon, DB_PATH, corpus_version(DB_PATH))
+    _timed(timings, "companies", _company_options)
+    if PREWARM_FULL_PROFILES:
+        _timed(timings, "full_profiles", prewarm_full_profiles, DB_PATH, PREWARM_FULL_PROFILES)
+    if warm_prompt_cache:
+        _timed(timings, "prompt_cache", matching.assess_ask_clarity,
+               "Warm-up request, not a real ask.", "Company context not available.", DB_PATH, False)
+    timings["total"] = _time.perf_counter() - t0
+    logger.info("[WARM] %s", " ".join(f"{k}={v:.2f}s" for k, v in timings.items()))
+    return timings
+
+
+def _mark_ready():
+    ready.set()
+    BOT_READY.set(1)
+    if READY_FILE:
+        with open(READY_FILE, "w") as f:
+            f.write(str(os.getpid()))
+    logger.info("[READY] Warm-up complete and connected to Slack, accepting events")
+
+
 def start():
     """Start the Slack bot via Socket Mode."""
     global _app
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    warm_up()
+
+    from slack_bolt import App
+    from slack_bolt.adapter.socket_mode import SocketModeHandler
     _app = App(token=SLACK_BOT_TOKEN)
 
     # Catch-all middleware: logs EVERY incoming request before handlers run
@@ -295,4 +423,7 @@ def start():
     _register_handlers(_app)
     handler = SocketModeHandler(_app, SLACK_APP_TOKEN)
     logger.info("ERA Network Bot starting...")
-    handler.start()
+    # handler.start() without its connect(): ready only once the Socket Mode connection is up
+    handler.connect()
+    _mark_ready()
+    threading.Event().wait()
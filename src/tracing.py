@@ -0,0 +1,192 @@
+"""Lightweight tracing spans for the bot, pipeline, DB and LLM calls.
+
+Spans follow the OpenTelemetry data model (128-bit trace IDs, 64-bit span
+IDs, parent links, nanosecond timestamps, attributes, status). Exporters:
+
+- "none" (default): span() returns a shared no-op span, no allocation.
+- "memory": finished spans are kept in a bounded in-process buffer and can
+  be written with dump_trace() as Chrome Trace Event JSON, which Perfetto,
+  chrome://tracing and speedscope render as a flame graph.
+- "otel": spans are also forwarded to the opentelemetry SDK, if installed.
+
+Setting TRACE_FILE implies "memory" and dumps the buffer there at exit.
+"""
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from src.config import TRACE_EXPORTER, TRACE_FILE, TRACE_MAX_SPANS
+
+logger = logging.getLogger(__name__)
+
+EXPORTERS = ("none", "memory", "otel")
+
+
+class Span:
+    """A finished-or-running unit of work."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+                 "thread_id", "attributes", "status", "_otel")
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.thread_id = threading.get_ident()
+        self.attributes = attributes
+        self.status = "OK"
+        self._otel = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+        if self._otel is not None:
+            self._otel.set_attribute(key, value)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "attributes": dict(self.attributes),
+            "status": self.status,
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+_spans_lock = threading.Lock()
+_spans: deque = deque(maxlen=TRACE_MAX_SPANS)
+_exporter = "none"
+_otel_tracer = None
+
+
+def configure(exporter: str, trace_file: str | None = None):
+    """Select the exporter. A trace_file switches "none" to "memory" and dumps on exit."""
+    global _exporter, _otel_tracer
+    if exporter not in EXPORTERS:
+        raise ValueError(f"Unknown trace exporter: {exporter}. Available: {list(EXPORTERS)}")
+    if trace_file and exporter == "none":
+        exporter = "memory"
+    _otel_tracer = None
+    if exporter == "otel":
+        try:
+            from opentelemetry import trace as otel_trace
+        except ImportError:
+            logger.warning("opentelemetry not installed; falling back to in-memory tracing")
+            exporter = "memory"
+        else:
+            _otel_tracer = otel_trace.get_tracer("era-network-bot")
+    _exporter = exporter
+    if trace_file:
+        atexit.register(dump_trace, trace_file)
+
+
+def is_enabled() -> bool:
+    return _exporter != "none"
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a child of the current span. Yields the span for extra attributes."""
+    if _exporter == "none":
+        yield _NOOP_SPAN
+        return
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    otel_cm = None
+    if _otel_tracer is not None:
+        otel_cm = _otel_tracer.start_as_current_span(name, attributes=attributes)
+        current._otel = otel_cm.__enter__()
+    try:
+        yield current
+    except BaseException as exc:
+        current.status = "ERROR"
+        current.attributes["exception.type"] = type(exc).__name__
+        if current._otel is not None:
+            from opentelemetry.trace import Status, StatusCode
+            current._otel.record_exception(exc)
+            current._otel.set_status(Status(StatusCode.ERROR, f"{type(exc).__name__}: {exc}"))
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        if otel_cm is not None:
+            otel_cm.__exit__(None, None, None)
+        with _spans_lock:
+            _spans.append(current)
+
+
+def traced(name: str | None = None):
+    """Decorator form of span(); the name defaults to module.function."""
+    def decorator(fn):
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _exporter == "none":
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_spans() -> list[Span]:
+    """Finished spans, oldest first."""
+    with _spans_lock:
+        return list(_spans)
+
+
+def clear():
+    with _spans_lock:
+        _spans.clear()
+
+
+def dump_trace(path: str) -> int:
+    """Write finished spans as Chrome Trace Event JSON. Returns the number of spans written."""
+    spans = get_spans()
+    events = [
+        {
+            "name": s.name,
+            "ph": "X",
+            "ts": s.start_ns / 1000,
+            "dur": (s.end_ns - s.start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": s.thread_id,
+            "args": {**s.attributes, "trace_id": s.trace_id, "span_id": s.span_id,
+                     "parent_id": s.parent_id, "status": s.status},
+        }
+        for s in spans
+    ]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+    logger.info("Wrote %d spans to %s", len(events), path)
+    return len(events)
+
+
+configure(TRACE_EXPORTER, TRACE_FILE or None)
@@ -0,0 +1,36 @@
+"""Shared fixtures — no LLM calls."""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+from src.backends import LLMUsage
+from src.sessions import SessionStore
+
+
+@pytest.fixture
+def fake_pipeline(tmp_path, monkeypatch):
+    """run_matching_pipeline with canned clarity / Stage 1 / Stage 2 and a temp network and log."""
+    import src.matching as matching
+    import src.query_log as ql
+    from tests.test_fixtures import build_network_db
+
+    db_path = build_network_db(str(tmp_path / "network.db"),
+                               [{"contact_id": i, "full_name": f"Contact {i}"} for i in range(1, 11)])
+    monkeypatch.setattr(ql, "LOG_DB_PATH", str(tmp_path / "log.db"))
+    monkeypatch.setattr(matching, "sessions", SessionStore())
+    calls = []
+
+    def stage2(ask, company_ctx, full_profiles):
+        calls.append(("stage2", ask))
+        ids = [1] if "NYC" in ask else [] if "Mars" in ask else [1, 2, 3]
+        matches = [{"contact_id": i, "name": f"Contact {i}"} for i in ids]
+        return {"matches": matches, "notes": None}, LLMUsage(1, 10, 1)
+
+    monkeypatch.setattr(matching, "assess_ask_clarity",
+                        lambda ask, ctx, db_path: calls.append(("clarity", ask)) or ({"is_clear": True}, LLMUsage(1, 1, 1)))
+    monkeypatch.setattr(matching, "stage1_screen",
+                        lambda ask, ctx, corpus: calls.append(("stage1", ask)) or ([f"c{n}" for n in range(1, 6)], LLMUsage(1, 100, 1)))
+    monkeypatch.setattr(matching, "stage2_rank", stage2)
+    yield matching, db_path, calls
+    ql.flush(timeout=5)  # land this test's rows in its own log DB
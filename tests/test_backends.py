@@ -1,7 +1,9 @@
 import os
+from types import SimpleNamespace
+
 import pytest
 from src.backends import get_backend
-from src.backends.base import LLMBackend
+from src.backends.base import LLMBackend, LLMUsage
 
 
 def test_backend_registry_claude():
@@ -39,13 +41,14 @@ def test_claude_backend_clarity():
     from src.matching import ClarityResult
 
     backend = get_backend("claude")
-    result = backend.assess_clarity(
+    result, usage = backend.assess_clarity(
         ask="I need help with enterprise sales",
         company_context="Company: TestCo\nIndustry: SaaS",
         system_prompt=CLARITY_SYSTEM_PROMPT,
         response_schema=ClarityResult,
     )
     assert "is_clear" in result
+    assert usage.calls == 1 and usage.output_tokens > 0
 
 
 @pytest.mark.skipif(not os.getenv("GEMINI_API_KEY"), reason="No Gemini API key")
@@ -55,10 +58,302 @@ def test_gemini_backend_clarity():
     from src.matching import ClarityResult
 
     backend = get_backend("gemini")
-    result = backend.assess_clarity(
+    result, usage = backend.assess_clarity(
         ask="I need help with enterprise sales",
         company_context="Company: TestCo\nIndustry: SaaS",
         system_prompt=CLARITY_SYSTEM_PROMPT,
         response_schema=ClarityResult,
     )
     assert "is_clear" in result
+    assert usage.calls == 1 and usage.output_tokens > 0
+
+
+class _FakeUsage:
+    input_tokens = 100
+    output_tokens = 20
+    cache_read_input_tokens = 900
+    cache_creation_input_tokens = 0
+
+
+class _FakeToolUse:
+    type = "tool_use"
+
+    def __init__(self, payload):
+        self.input = payload
+
+
+class _FakeMessage:
+    stop_reason = "tool_use"
+    usage = _FakeUsage()
+
+    def __init__(self, payload):
+        self.content = [_FakeToolUse(payload)]
+
+
+class _FakeMessages:
+    """Records create() kwargs and returns a canned tool_use response."""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return _FakeMessage(self.payload)
+
+
+class _FakeClient:
+    def __init__(self, payload):
+        self.messages = _FakeMessages(payload)
+
+
+def test_claude_stage2_static_prefix_is_cacheable():
+    """Stage 2 keeps instructions and company context in system blocks; candidates go after."""
+    from src.prompts import STAGE2_SYSTEM_PROMPT
+    from src.matching import Stage2Result
+
+    company_context = "Company: TestCo\n" + "We sell workflow software to enterprise ops teams. " * 60
+    backend = get_backend("claude")
+    backend.client = _FakeClient({"matches": [], "notes": ""})
+    backend.rank_matches(
+        ask="enterprise sales", company_context=company_context,
+        full_profiles="[ID:1] Alice", system_prompt=STAGE2_SYSTEM_PROMPT,
+        response_schema=Stage2Result, top_k=3,
+    )
+    call = backend.client.messages.calls[0]
+    assert call["system"][0]["text"] == STAGE2_SYSTEM_PROMPT
+    # The instructions alone are under the minimum cacheable prefix; with the context they clear it
+    assert "cache_control" not in call["system"][0]
+    assert call["system"][1]["cache_control"] == {"type": "ephemeral"}
+    assert "Company: TestCo" in call["system"][1]["text"]
+    user = call["messages"][0]["content"]
+    assert "[ID:1] Alice" in user and "enterprise sales" in user
+    assert "[ID:1] Alice" not in str(call["system"])
+
+
+def test_claude_clarity_skips_breakpoints_below_minimum():
+    """The short clarity prompt is below the minimum cacheable length, so it sets no breakpoint."""
+    from src.prompts import CLARITY_SYSTEM_PROMPT
+    from src.matching import ClarityResult
+
+    backend = get_backend("claude")
+    backend.client = _FakeClient({"is_clear": True})
+    backend.assess_clarity(
+        ask="enterprise sales", company_context="Company: TestCo",
+        system_prompt=CLARITY_SYSTEM_PROMPT, response_schema=ClarityResult,
+    )
+    call = backend.client.messages.calls[0]
+    assert not any("cache_control" in block for block in call["system"])
+
+
+def test_lean_stage2_matches_filled_from_db(tmp_path):
+    """Lean Stage 2 asks only for IDs, explanations and hooks; the rest comes from the network DB."""
+    from src.prompts import STAGE2_SYSTEM_PROMPT
+    from src.matching import LeanStage2Result, fill_match_details
+    from tests.test_fixtures import build_network_db
+
+    schema = LeanStage2Result.model_json_schema()
+    assert set(schema["$defs"]["LeanMatchExplanation"]["properties"]) == {
+        "contact_id", "explanation", "conversation_hooks"}
+
+    backend = get_backend("claude")
+    backend.client = _FakeClient({"matches": [
+        {"contact_id": 1, "explanation": "Sold to procurement", "conversation_hooks": "Ask about RFPs"},
+        {"contact_id": 99, "explanation": "Hallucinated", "conversation_hooks": ""},
+    ], "notes": ""})
+    result, _ = backend.rank_matches(
+        ask="enterprise sales", company_context="Company: TestCo", full_profiles="[ID:1] Alice",
+        system_prompt=STAGE2_SYSTEM_PROMPT, response_schema=LeanStage2Result, top_k=3,
+    )
+    db_path = build_network_db(str(tmp_path / "network.db"), [
+        {"contact_id": 1, "full_name": "Alice", "current_title": "VP Sales", "current_company": "Acme",
+         "linkedin_url": "https://linkedin.com/in/alice"}])
+    assert fill_match_details(db_path, result["matches"], [1, 2]) == [{
+        "contact_id": 1, "name": "Alice", "title": "VP Sales", "company": "Acme",
+        "linkedin_url": "https://linkedin.com/in/alice",
+        "explanation": "Sold to procurement", "conversation_hooks": "Ask about RFPs",
+    }]
+
+
+def test_lean_matches_outside_candidates_are_dropped(tmp_path):
+    """A real contact Stage 2 was never shown must not receive another candidate's explanation."""
+    from src.matching import fill_match_details
+    from tests.test_fixtures import build_network_db
+
+    db_path = build_network_db(str(tmp_path / "network.db"),
+                               [{"contact_id": i, "full_name": f"Contact {i}"} for i in (1, 2, 3)])
+    matches = [{"contact_id": cid, "explanation": "x", "conversation_hooks": "y"} for cid in (3, 1, 2)]
+    assert [m["contact_id"] for m in fill_match_details(db_path, matches, [1, 2])] == [1, 2]
+    assert fill_match_details(db_path, matches, []) == []
+
+
+def test_claude_cache_stats_tracked_per_stage():
+    """Cache read/create tokens are accumulated under the stage that made the call."""
+    from src.prompts import CLARITY_SYSTEM_PROMPT
+    from src.matching import ClarityResult
+
+    backend = get_backend("claude")
+    backend.client = _FakeClient({"is_clear": True})
+    backend.assess_clarity(
+        ask="enterprise sales", company_context="Company: TestCo",
+        system_prompt=CLARITY_SYSTEM_PROMPT, response_schema=ClarityResult,
+    )
+    stats = backend.get_cache_stats()
+    assert stats["clarity"] == {"calls": 1, "cache_read_tokens": 900, "cache_creation_tokens": 0}
+    assert stats["stage1"]["calls"] == 0
+    assert stats["stage2"]["calls"] == 0
+
+
+def _profiled_ncalls(fn, func_name):
+    """Run fn under cProfile and return how many times func_name was called."""
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.runcall(fn)
+    stats = pstats.Stats(profiler).stats
+    return sum(entry[1] for (_, _, name), entry in stats.items() if name == func_name)
+
+
+def test_claude_tool_schema_built_once():
+    """Profiling: repeated calls reuse the tool definition instead of regenerating the JSON schema."""
+    from src.prompts import STAGE2_SYSTEM_PROMPT
+    from src.matching import Stage2Result
+
+    backend = get_backend("claude")
+    backend.client = _FakeClient({"matches": [], "notes": ""})
+
+    def rank():
+        backend.rank_matches(
+            ask="enterprise sales", company_context="Company: TestCo",
+            full_profiles="[ID:1] Alice", system_prompt=STAGE2_SYSTEM_PROMPT,
+            response_schema=Stage2Result, top_k=3,
+        )
+
+    assert _profiled_ncalls(rank, "model_json_schema") > 0
+    assert _profiled_ncalls(lambda: [rank() for _ in range(50)], "model_json_schema") == 0
+    calls = backend.client.messages.calls
+    assert calls[0]["tools"] is calls[-1]["tools"]
+    assert calls[0]["system"][0] is calls[-1]["system"][0]
+
+
+class _FakeGeminiResponse:
+    text = '{"is_clear": true, "clarifying_question": null}'
+    usage_metadata = None
+
+
+class _FakeGeminiModels:
+    def __init__(self):
+        self.calls = []
+
+    def generate_content(self, **kwargs):
+        self.calls.append(kwargs)
+        return _FakeGeminiResponse()
+
+
+def test_gemini_config_built_once(monkeypatch):
+    """Gemini reuses one GenerateContentConfig per stage instead of rebuilding it."""
+    import src.backends.gemini_backend as gb
+    from src.prompts import CLARITY_SYSTEM_PROMPT
+    from src.matching import ClarityResult
+
+    monkeypatch.setattr(gb, "GEMINI_API_KEY", "test-key")
+    backend = get_backend("gemini")
+    backend.client = SimpleNamespace(models=_FakeGeminiModels())
+
+    def clarity():
+        backend.assess_clarity(
+            ask="enterprise sales", company_context="Company: TestCo",
+            system_prompt=CLARITY_SYSTEM_PROMPT, response_schema=ClarityResult,
+        )
+
+    for _ in range(50):
+        clarity()
+    calls = backend.client.models.calls
+    assert len(calls) == 50
+    assert all(c["config"] is calls[0]["config"] for c in calls)
+    assert calls[0]["config"].thinking_config.thinking_budget == 1024
+    assert len(backend._configs) == 1
+
+
+def test_claude_returns_priced_usage_record():
+    """Each call returns an LLMUsage with tokens split by cache status and priced from MODEL_PRICING."""
+    from src.prompts import CLARITY_SYSTEM_PROMPT
+    from src.matching import ClarityResult
+
+    backend = get_backend("claude")
+    backend.client = _FakeClient({"is_clear": True})
+    result, usage = backend.assess_clarity(
+        ask="enterprise sales", company_context="Company: TestCo",
+        system_prompt=CLARITY_SYSTEM_PROMPT, response_schema=ClarityResult,
+    )
+    assert result["is_clear"] is True
+    assert (usage.calls, usage.input_tokens, usage.output_tokens, usage.cache_read_tokens) == (1, 100, 20, 900)
+    # 100 * $3 + 20 * $15 + 900 * $0.30 per million tokens
+    assert usage.cost_usd == pytest.approx(0.00087)
+    assert usage.cache_hit_ratio == pytest.approx(0.9)
+    assert (usage + usage).cost_usd == pytest.approx(0.00174)
+
+
+class _CountingBackend(LLMBackend):
+    """Provider stand-in that returns canned results and counts live calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def assess_clarity(self, ask, company_context, system_prompt, response_schema):
+        self.calls.append("clarity")
+        return {"is_clear": True, "clarifying_question": None}, LLMUsage(1, 100, 20, 0, 0, 0.0006)
+
+    def screen_candidates(self, ask, company_context, compressed_profiles, system_prompt, response_schema):
+        self.calls.append("stage1")
+        return [1, 2], LLMUsage(1, 5000, 50, 0, 0, 0.01575)
+
+    def rank_matches(self, ask, company_context, full_profiles, system_prompt, response_schema, top_k):
+        self.calls.append("stage2")
+        return {"matches": [], "notes": ""}, LLMUsage(1, 2000, 500, 0, 0, 0.0135)
+
+
+def test_replay_record_missing_then_replay_offline(tmp_path):
+    from src.backends.replay import ReplayBackend, ReplayCache, ReplayMiss
+    from src.matching import ClarityResult, Stage1Result
+    from src.profiles import Stage1Corpus
+
+    inner = _CountingBackend()
+    recorder = ReplayBackend("claude", ReplayCache(str(tmp_path), "record-missing"), lambda: inner)
+    result, usage = recorder.assess_clarity("sales", "ctx", "system", ClarityResult)
+    replayed, replayed_usage = recorder.assess_clarity("sales", "ctx", "system", ClarityResult)
+    assert inner.calls == ["clarity"]
+    assert (usage.input_tokens, usage.cost_usd) == (100, 0.0006)
+    # A served response keeps its token counts but costs nothing
+    assert replayed == result
+    assert replayed_usage == LLMUsage(1, 100, 20, 0, 0, 0.0)
+
+    # Stage 1 keys ignore the per-ask shuffle of the corpus
+    recorder.screen_candidates("sales", "ctx", "[ID:1] A\n\n[ID:2] B", "system", Stage1Result)
+    assert recorder.screen_candidates("sales", "ctx", "[ID:2] B\n\n[ID:1] A", "system", Stage1Result)[0] == [1, 2]
+    corpus = Stage1Corpus(("[ID:2] B", "[ID:1] A"), (1, 2), frozenset((1, 2)), True)
+    assert recorder.screen_candidates("sales", "ctx", corpus, "system", Stage1Result)[0] == [1, 2]
+    assert inner.calls == ["clarity", "stage1"]
+
+    def no_provider():
+        raise AssertionError("replay mode must not build the provider backend")
+
+    replayer = ReplayBackend("claude", ReplayCache(str(tmp_path), "replay"), no_provider)
+    assert replayer.assess_clarity("sales", "ctx", "system", ClarityResult)[0] == result
+    with pytest.raises(ReplayMiss):
+        replayer.assess_clarity("a different ask", "ctx", "system", ClarityResult)
+    assert replayer.cache.stats == {"hits": 1, "misses": 1, "recorded": 0}
+
+
+def test_replay_record_mode_always_calls_provider(tmp_path):
+    from src.backends.replay import ReplayBackend, ReplayCache
+    from src.matching import ClarityResult
+
+    inner = _CountingBackend()
+    recorder = ReplayBackend("gemini", ReplayCache(str(tmp_path), "record"), lambda: inner)
+    recorder.assess_clarity("sales", "ctx", "system", ClarityResult)
+    recorder.assess_clarity("sales", "ctx", "system", ClarityResult)
+    assert inner.calls == ["clarity", "clarity"]
+    assert recorder.cache.stats["recorded"] == 2
@@ -0,0 +1,85 @@
+"""Local clarity fast path — no LLM calls."""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+from src.clarity import ClarityLexicon, clarifying_question
+from tests.test_fixtures import TEST_CASES
+
+
+def _lexicon():
+    contacts = [{"primary_expertise": "3D visualization and geospatial rendering", "current_title": "Founder"}]
+    contacts += [{"primary_expertise": f"Operations leader {i}", "current_title": "Founder"} for i in range(20)]
+    return ClarityLexicon.from_contacts(contacts)
+
+
+def test_lexicon_keeps_distinctive_network_terms():
+    lexicon = _lexicon()
+    assert "3d visualization" in lexicon.vocabulary and "geospatial" in lexicon.vocabulary
+    # In every profile, so it says nothing about who would match
+    assert "operations leader" not in lexicon.vocabulary and "founder" not in lexicon.vocabulary
+
+
+@pytest.mark.parametrize("ask,expected", [
+    ("We're about to start raising our seed round. Who should I talk to?", "clear"),
+    ("Looking for a warm intro to procurement teams", "clear"),
+    ("someone who knows 3D visualization", "clear"),
+    ("know anyone useful?", "vague"),
+    ("help me with my startup", "vague"),
+    ("who can help?", "vague"),
+    ("any thoughts on our deck", None),
+])
+def test_classify(ask, expected):
+    assert _lexicon().classify(ask) == expected
+
+
+def test_classify_evaluation_cases():
+    lexicon = _lexicon()
+    verdicts = {tc["id"]: lexicon.classify(tc["ask"]) for tc in TEST_CASES}
+    assert verdicts.pop("vague_ask") == "vague"
+    assert "vague" not in verdicts.values()
+
+
+def test_fast_path_skips_the_llm(tmp_path, monkeypatch):
+    import src.matching as matching
+    from tests.test_fixtures import build_network_db
+
+    db_path = build_network_db(str(tmp_path / "network.db"), [{"contact_id": 1, "full_name": "A"}])
+
+    def no_llm():
+        raise AssertionError("settled asks must not reach the LLM")
+
+    monkeypatch.setattr(matching, "_get_backend", no_llm)
+    result, usage = matching.assess_ask_clarity("intro to fintech investors", "Company: Passu", db_path, True)
+    assert result["is_clear"] and usage.calls == 0
+    result, usage = matching.assess_ask_clarity("who can help?", "Company: Passu", db_path, True)
+    assert not result["is_clear"] and "Passu" in result["clarifying_question"]
+    assert "your company" in clarifying_question("")
+
+
+def test_agreement_report_on_query_log(tmp_path, monkeypatch):
+    import src.query_log as ql
+    from scripts.clarity_agreement import agreement, llm_labelled_asks
+    from src.backends import LLMUsage
+
+    monkeypatch.setattr(ql, "LOG_DB_PATH", str(tmp_path / "log.db"))
+    llm_clarity = {"clarity": LLMUsage(1, 100, 10)}
+    rows = [
+        ("raising our seed round", "matches", llm_clarity, False),
+        ("who can help?", "clarification", llm_clarity, False),
+        ("help me with my startup", "matches", llm_clarity, False),  # the LLM was lenient
+        ("any thoughts on our deck", "matches", llm_clarity, False),
+        ("raising our seed round", "matches", None, True),  # coalesced duplicate
+        ("who can help?", "clarification", {"clarity": LLMUsage()}, False),  # settled locally
+    ]
+    for ask, result_type, usage, coalesced in rows:
+        ql.log_query(slack_user_id="U1", company_name="Passu", ask_text=ask, result_type=result_type,
+                     usage_by_stage=usage, coalesced=coalesced)
+    ql.flush(timeout=5)
+
+    labelled = llm_labelled_asks(ql.LOG_DB_PATH)
+    assert len(labelled) == 4
+    report = agreement(_lexicon(), labelled)
+    assert (report["settled_locally"], report["local_vague_llm_clear"]) == (3, 1)
+    assert report["agreement"] == pytest.approx(2 / 3)
@@ -0,0 +1,109 @@
+"""Single-flight coalescing of identical concurrent pipeline runs — no LLM calls."""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import src.query_log as ql
+from src.coalesce import SingleFlight
+from src.metrics import PIPELINES_COALESCED
+
+
+class _JoinSignal(dict):
+    """SingleFlight's in-flight map; releases a semaphore each time a follower finds a run to join."""
+
+    def __init__(self, joined: threading.Semaphore):
+        super().__init__()
+        self.joined = joined
+
+    def get(self, key, default=None):
+        future = super().get(key, default)
+        if future is not None:
+            self.joined.release()
+        return future
+
+
+def test_single_flight_shares_result_and_exception():
+    flight = SingleFlight()
+    joined, started, release = threading.Semaphore(0), threading.Event(), threading.Event()
+    flight._flights = _JoinSignal(joined)
+
+    def slow(value):
+        started.set()
+        release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    for value in ("result", ValueError("boom")):
+        started.clear()
+        release.clear()
+        with ThreadPoolExecutor(3) as pool:
+            leader = pool.submit(flight.run, "key", lambda: slow(value))
+            assert started.wait(5)
+            followers = [pool.submit(flight.run, "key", lambda: pytest.fail("followers must not run"))
+                         for _ in range(2)]
+            for _ in followers:
+                assert joined.acquire(timeout=5)
+            release.set()
+            if isinstance(value, Exception):
+                for future in [leader, *followers]:
+                    assert future.exception(timeout=5) is value
+            else:
+                assert leader.result(timeout=5) == ("result", False)
+                assert [f.result(timeout=5) for f in followers] == [("result", True)] * 2
+        assert flight.in_flight() == 0
+
+
+def test_concurrent_identical_asks_share_one_run(fake_pipeline, monkeypatch):
+    matching, db_path, calls = fake_pipeline
+    joined, release = threading.Semaphore(0), threading.Event()
+    flights = SingleFlight()
+    flights._flights = _JoinSignal(joined)
+    monkeypatch.setattr(matching, "_flights", flights)
+    real_stage1 = matching.stage1_screen
+    monkeypatch.setattr(matching, "stage1_screen",
+                        lambda ask, ctx, corpus: release.wait(5) and real_stage1(ask, ctx, corpus))
+
+    before = PIPELINES_COALESCED.value()
+    asks = [("Enterprise sales advice", "U1", "C1:1.0"), ("enterprise  sales advice ", "U2", "C2:1.0"),
+            ("enterprise sales advice", "U3", "C3:1.0")]
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(matching.run_matching_pipeline, ask, "Aerium", db_path, slack_user_id=user,
+                               thread=thread) for ask, user, thread in asks]
+        for _ in asks[1:]:  # both followers have joined the leader's run
+            assert joined.acquire(timeout=5)
+        release.set()
+        results = [f.result(timeout=5) for f in futures]
+
+    assert [c[0] for c in calls] == ["clarity", "stage1", "stage2"]
+    assert all(r["matches"] == results[0]["matches"] for r in results)
+    assert PIPELINES_COALESCED.value() - before == 2
+    assert all(matching.sessions.get(thread) is not None for _, _, thread in asks)
+
+    ql.flush(timeout=5)
+    with sqlite3.connect(ql.LOG_DB_PATH) as conn:
+        rows = conn.execute("SELECT slack_user_id, coalesced, cost_usd IS NOT NULL FROM query_log").fetchall()
+    assert sorted(r[0] for r in rows) == ["U1", "U2", "U3"]
+    assert sorted((r[1], r[2]) for r in rows) == [(0, 1), (1, 0), (1, 0)]
+
+
+def test_uncoalesced_runs_stay_independent(fake_pipeline, monkeypatch):
+    matching, db_path, calls = fake_pipeline
+    # Both runs must be in Stage 1 at once; a coalesced follower would leave the barrier broken
+    both_in_stage1 = threading.Barrier(2, timeout=5)
+    real_stage1 = matching.stage1_screen
+    monkeypatch.setattr(matching, "stage1_screen",
+                        lambda ask, ctx, corpus: (both_in_stage1.wait(), real_stage1(ask, ctx, corpus))[1])
+
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(matching.run_matching_pipeline, "enterprise sales advice", "Aerium", db_path,
+                               coalesce=False) for _ in range(2)]
+        results = [f.result(timeout=10) for f in futures]
+
+    assert [c[0] for c in calls].count("stage1") == 2
+    assert results[0]["matches"] == results[1]["matches"]
@@ -0,0 +1,54 @@
+"""Tests for the columnar contact store (no LLM calls)."""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from src.contact_store import ContactRecord, ContactStore, load_contact_store
+from src.db import get_research_profile
+from src.profiles import compress_profile, format_full_profile
+from tests.test_fixtures import build_network_db
+
+
+@pytest.fixture
+def network_db(tmp_path):
+    contacts = [
+        {"contact_id": i, "full_name": f"Contact {i}", "seniority": ["C-Suite", "VP"][i % 2],
+         "primary_expertise": f"Expertise {i}", "actively_advising_startups": "yes"}
+        for i in range(1, 21)
+    ]
+    contacts.append({"contact_id": 99, "full_name": "Unenriched", "primary_expertise": ""})
+    return build_network_db(str(tmp_path / "network.db"), contacts)
+
+
+def test_records_render_like_dict_rows(network_db):
+    store = load_contact_store(network_db)
+    assert len(store) == 20
+    assert store.get(99) is None
+    for cid in (1, 2, 20):
+        record, row = store.get(cid), get_research_profile(network_db, cid)
+        assert compress_profile(record) == compress_profile(row)
+        assert format_full_profile(record, []) == format_full_profile(row, [])
+        assert record.to_dict() == {k: row[k] for k in record.keys()}
+
+
+def test_categorical_values_are_shared(network_db):
+    store = load_contact_store(network_db)
+    assert store.vocabulary("seniority") == ["VP", "C-Suite"]
+    assert store.get(1)["seniority"] is store.get(3)["seniority"]
+    assert store.vocabulary("full_name") is None
+
+
+def test_records_are_slotted_views():
+    store = ContactStore.from_dicts([{"contact_id": 7, "full_name": "Ada", "seniority": "VP"}])
+    record = store.get(7)
+    assert isinstance(record, ContactRecord) and not hasattr(record, "__dict__")
+    assert record.get("missing", "n/a") == "n/a"
+    with pytest.raises(KeyError):
+        record["missing"]
+    assert [r["full_name"] for r in store] == ["Ada"]
+
+
+def test_store_uses_less_memory_than_dicts(tmp_path):
+    from scripts.bench_contact_store import run, synthetic_network
+    results = {r["path"]: r for r in run(synthetic_network(str(tmp_path / "network.db"), 2000))}
+    assert results["store"]["bytes_per_contact"] < results["dicts"]["bytes_per_contact"]
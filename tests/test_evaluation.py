@@ -1,10 +1,15 @@
 """Level 3 LLM-as-judge evaluation harness."""
-import sys, os, json
+import sys, os, json, time, hashlib, statistics, threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 import anthropic
 from pydantic import BaseModel
+from src.backends import replay
+from src import config
 from src.config import ANTHROPIC_API_KEY, DB_PATH
+from src.db import get_contact_version
 from src.matching import run_matching_pipeline
 from tests.test_fixtures import TEST_CASES
 
@@ -21,6 +26,8 @@ class JudgeResult(BaseModel):
     suggestions: str
 
 
+JUDGE_MODEL = "claude-sonnet-4-5-20250929"
+
 JUDGE_PROMPT = """\
 You are an impartial judge evaluating the quality of a network matching system. You will receive:
 1. A founder's ask and their company context
@@ -44,10 +51,22 @@ Evaluate each criterion strictly. A criterion passes only if the evidence clearl
 """
 
 
+_judge_client = None
+_judge_client_lock = threading.Lock()
+
+
+def _get_judge_client():
+    """One Anthropic client shared by all judge calls (and worker threads)."""
+    global _judge_client
+    if _judge_client is None:
+        with _judge_client_lock:
+            if _judge_client is None:
+                _judge_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    return _judge_client
+
+
 def evaluate_results(test_case: dict, pipeline_results: dict) -> dict:
     """Use Claude to judge whether pipeline results meet test criteria."""
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-
     if pipeline_results["type"] == "clarification":
         response_text = f"CLARIFICATION REQUESTED: {pipeline_results['clarifying_question']}"
     else:
@@ -75,19 +94,27 @@ def evaluate_results(test_case: dict, pipeline_results: dict) -> dict:
         "description": "Report the evaluation results",
         "input_schema": JudgeResult.model_json_schema(),
     }]
-    message = client.messages.create(
-        model="claude-sonnet-4-5-20250929",
-        max_tokens=4096,
-        messages=[{"role": "user", "content": prompt}],
-        tools=tools,
-        tool_choice={"type": "tool", "name": "report_evaluation"},
-    )
-    for block in message.content:
-        if block.type == "tool_use":
-            result = JudgeResult.model_validate(block.input)
-            break
-    else:
+    messages = [{"role": "user", "content": prompt}]
+
+    def judge_call() -> dict:
+        message = _get_judge_client().messages.create(
+            model=JUDGE_MODEL,
+            max_tokens=4096,
+            messages=messages,
+            tools=tools,
+            tool_choice={"type": "tool", "name": "report_evaluation"},
+        )
+        for block in message.content:
+            if block.type == "tool_use":
+                return block.input
         raise ValueError("No tool_use block in judge response")
+
+    cache = replay.active_cache()
+    if cache is not None:
+        tool_input = cache.call(JUDGE_MODEL, "", messages, tools[0]["input_schema"], judge_call)
+    else:
+        tool_input = judge_call()
+    result = JudgeResult.model_validate(tool_input)
     return {
         "test_id": test_case["id"],
         "criteria_scores": [s.model_dump() for s in result.criteria_scores],
@@ -96,49 +123,222 @@ def evaluate_results(test_case: dict, pipeline_results: dict) -> dict:
     }
 
 
-def run_full_evaluation(test_cases: list[dict] | None = None) -> dict:
-    """Run all test cases through pipeline + judge. Returns aggregate results."""
-    cases = test_cases or TEST_CASES
-    results = []
-    total_criteria = 0
-    passed_criteria = 0
+# Every pipeline source (backends, DB access and all pipeline-path modules included);
+# a change to any of them invalidates checkpointed pipeline/judge outputs
+_FINGERPRINT_GLOB = "src/**/*.py"
+# Config switches and model names that change pipeline output without a source change
+_FINGERPRINT_SETTINGS = (
+    "LLM_PROVIDER", "STAGE1_MODEL", "STAGE2_MODEL", "CLARITY_MODEL",
+    "GEMINI_STAGE1_MODEL", "GEMINI_STAGE2_MODEL", "GEMINI_CLARITY_MODEL",
+    "LEAN_SCHEMAS", "CLARITY_FAST_PATH", "FACET_PUSHDOWN", "FACET_MIN_CORPUS", "STAGE2_PROFILE_TOKENS",
+)
+CHECKPOINT_DIR = os.path.join(os.path.dirname(__file__), "..", ".eval_checkpoints")
 
-    for tc in cases:
-        print(f"\n--- Running: {tc['id']} ---")
-        print(f"Ask: {tc['ask']}")
-        print(f"Company: {tc['company']}")
+_print_lock = threading.Lock()
+
+
+def _pipeline_fingerprint() -> str:
+    """Hash of the pipeline sources, pipeline settings, network DB version and judge prompt."""
+    root = Path(__file__).resolve().parent.parent
+    h = hashlib.sha256()
+    for path in sorted(root.glob(_FINGERPRINT_GLOB)):
+        h.update(path.relative_to(root).as_posix().encode())
+        h.update(path.read_bytes())
+    settings = {name: getattr(config, name) for name in _FINGERPRINT_SETTINGS}
+    settings["contact_version"] = get_contact_version(DB_PATH)
+    h.update(json.dumps(settings, sort_keys=True).encode())
+    h.update(JUDGE_PROMPT.encode())
+    return h.hexdigest()
+
+
+def _checkpoint_path(checkpoint_dir: str, test_case: dict, trial: int, fingerprint: str) -> str:
+    key = hashlib.sha256((fingerprint + json.dumps(test_case, sort_keys=True)).encode()).hexdigest()[:16]
+    return os.path.join(checkpoint_dir, f"{test_case['id']}-{key}-t{trial}.json")
+
+
+def _load_checkpoint(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-        pipeline_result = run_matching_pipeline(tc["ask"], tc["company"], DB_PATH)
 
+def _save_checkpoint(path: str, data: dict):
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, default=str)
+    os.replace(tmp, path)
+
+
+def _run_case(test_case: dict, trial: int, checkpoint_path: str | None) -> dict:
+    """Pipeline + judge for one trial, reusing whichever half is already checkpointed."""
+    checkpoint = _load_checkpoint(checkpoint_path) if checkpoint_path else {}
+    cached = "judge" in checkpoint
+
+    if "pipeline" not in checkpoint:
+        # Trials of one case run concurrently; coalescing would make them one run
+        checkpoint["pipeline"] = run_matching_pipeline(test_case["ask"], test_case["company"], DB_PATH,
+                                                       coalesce=False)
+        if checkpoint_path:
+            _save_checkpoint(checkpoint_path, checkpoint)
+    if "judge" not in checkpoint:
+        checkpoint["judge"] = evaluate_results(test_case, checkpoint["pipeline"])
+        if checkpoint_path:
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+    _print_case(test_case, trial, checkpoint["pipeline"], checkpoint["judge"], cached)
+    return checkpoint
+
+
+def _print_case(tc: dict, trial: int, pipeline_result: dict, judge: dict, cached: bool):
+    with _print_lock:
+        suffix = " (checkpoint)" if cached else ""
+        print(f"\n--- Running: {tc['id']} [trial {trial + 1}]{suffix} ---")
+        print(f"Ask: {tc['ask']}")
+        print(f"Company: {tc['company']}")
         if pipeline_result["type"] == "matches":
             for i, m in enumerate(pipeline_result.get("matches") or [], 1):
                 print(f"  Match {i}: {m['name']} — {m['title']} @ {m['company']}")
         else:
             print(f"  Clarification: {pipeline_result['clarifying_question']}")
-
-        judge = evaluate_results(tc, pipeline_result)
-        results.append(judge)
-
         for cs in judge["criteria_scores"]:
-            total_criteria += 1
-            if cs["passed"]:
-                passed_criteria += 1
             status = "PASS" if cs["passed"] else "FAIL"
             print(f"  [{status}] {cs['criterion']}: {cs['reasoning']}")
-
         print(f"  Overall: {judge['overall_score']:.2f}")
         print(f"  Suggestions: {judge['suggestions']}")
 
+
+def run_full_evaluation(
+    test_cases: list[dict] | None = None,
+    workers: int = 4,
+    trials: int = 1,
+    checkpoint_dir: str | None = CHECKPOINT_DIR,
+) -> dict:
+    """Run all test cases through pipeline + judge. Returns aggregate results.
+
+    Cases and trials run on a pool of `workers` threads. Each trial's pipeline
+    output and judge result are checkpointed under checkpoint_dir, keyed on
+    the case and a fingerprint of the pipeline sources, so a rerun only
+    recomputes cases (or code) that changed. Pass checkpoint_dir=None to
+    always run live.
+    """
+    cases = test_cases or TEST_CASES
+    fingerprint = _pipeline_fingerprint()
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            (tc["id"], trial): pool.submit(
+                _run_case, tc, trial,
+                _checkpoint_path(checkpoint_dir, tc, trial, fingerprint) if checkpoint_dir else None,
+            )
+            for tc in cases
+            for trial in range(trials)
+        }
+        runs = {key: fut.result() for key, fut in futures.items()}
+    wall_time = time.time() - t0
+
+    results = []
+    score_stats = {}
+    total_criteria = 0
+    passed_criteria = 0
+    for tc in cases:
+        judges = [runs[(tc["id"], trial)]["judge"] for trial in range(trials)]
+        results.extend(judges)
+        for judge in judges:
+            total_criteria += len(judge["criteria_scores"])
+            passed_criteria += sum(1 for cs in judge["criteria_scores"] if cs["passed"])
+        scores = [j["overall_score"] for j in judges]
+        score_stats[tc["id"]] = {
+            "mean": statistics.fmean(scores),
+            "stdev": statistics.stdev(scores) if len(scores) > 1 else 0.0,
+            "min": min(scores),
+            "max": max(scores),
+        }
+
     pass_rate = passed_criteria / total_criteria if total_criteria else 0
     print(f"\n=== AGGREGATE: {passed_criteria}/{total_criteria} criteria passed ({pass_rate:.0%}) ===")
+    if trials > 1:
+        for case_id, stats in score_stats.items():
+            print(f"  {case_id}: mean={stats['mean']:.2f} stdev={stats['stdev']:.2f} "
+                  f"range={stats['min']:.2f}-{stats['max']:.2f}")
+    print(f"Wall time: {wall_time:.1f}s ({len(cases)} cases x {trials} trials, {workers} workers)")
 
     return {
         "results": results,
         "total_criteria": total_criteria,
         "passed_criteria": passed_criteria,
         "pass_rate": pass_rate,
+        "trials": trials,
+        "score_stats": score_stats,
+        "wall_time": wall_time,
     }
 
 
+# --- Runner tests (fake pipeline and judge, no LLM calls) ---
+
+def _fake_pipeline(calls):
+    def pipeline(ask, company, db_path, coalesce=True):
+        assert not coalesce, "trials must not share a pipeline run"
+        calls.append(ask)
+        return {"type": "matches", "matches": [], "clarifying_question": None}
+    return pipeline
+
+
+def _fake_judge(calls, scores):
+    lock = threading.Lock()
+
+    def judge(test_case, pipeline_results):
+        with lock:  # trials judge concurrently; each call takes the next score exactly once
+            calls.append(test_case["id"])
+            score = scores[len(calls) - 1]
+        return {"test_id": test_case["id"], "overall_score": score, "suggestions": "",
+                "criteria_scores": [{"criterion": "c", "passed": score >= 0.5, "reasoning": ""}]}
+    return judge
+
+
+def test_runner_reports_trial_variance(monkeypatch):
+    pipeline_calls, judge_calls = [], []
+    monkeypatch.setattr(sys.modules[__name__], "run_matching_pipeline", _fake_pipeline(pipeline_calls))
+    monkeypatch.setattr(sys.modules[__name__], "evaluate_results", _fake_judge(judge_calls, [0.2, 0.6, 1.0]))
+
+    summary = run_full_evaluation(TEST_CASES[:1], workers=3, trials=3, checkpoint_dir=None)
+    stats = summary["score_stats"][TEST_CASES[0]["id"]]
+    assert len(pipeline_calls) == 3
+    assert abs(stats["mean"] - 0.6) < 1e-9
+    assert abs(stats["stdev"] - 0.4) < 1e-9
+    assert summary["total_criteria"] == 3 and summary["passed_criteria"] == 2
+
+
+def test_runner_resumes_from_checkpoints(monkeypatch, tmp_path):
+    pipeline_calls, judge_calls = [], []
+    monkeypatch.setattr(sys.modules[__name__], "run_matching_pipeline", _fake_pipeline(pipeline_calls))
+    monkeypatch.setattr(sys.modules[__name__], "evaluate_results", _fake_judge(judge_calls, [0.9] * 10))
+
+    run_full_evaluation(TEST_CASES[:2], workers=2, checkpoint_dir=str(tmp_path))
+    assert len(pipeline_calls) == 2
+
+    edited = dict(TEST_CASES[1], ask=TEST_CASES[1]["ask"] + " in Europe")
+    summary = run_full_evaluation([TEST_CASES[0], edited], workers=2, checkpoint_dir=str(tmp_path))
+    assert pipeline_calls[2:] == [edited["ask"]]
+    assert len(judge_calls) == 3
+    assert summary["pass_rate"] == 1.0
+
+
+def test_fingerprint_tracks_settings_and_network_version(monkeypatch):
+    import src.config as config_mod
+
+    base = _pipeline_fingerprint()
+    assert _pipeline_fingerprint() == base
+    monkeypatch.setattr(config_mod, "LEAN_SCHEMAS", not config_mod.LEAN_SCHEMAS)
+    assert _pipeline_fingerprint() != base
+    monkeypatch.undo()
+    monkeypatch.setattr(sys.modules[__name__], "get_contact_version", lambda db_path: 12345)
+    assert _pipeline_fingerprint() != base
+
+
 if __name__ == "__main__":
     run_full_evaluation()
@@ -0,0 +1,109 @@
+"""Contact facets and the Stage 1 facet pre-filter — no LLM calls."""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import json
+
+import pytest
+
+from src.facets import INVESTORS, TECHNICAL, derive_facets, filter_for_ask, industry_tags
+
+
+def test_derive_facets():
+    investor = derive_facets({"current_title": "General Partner", "current_company": "Northwind Ventures",
+                              "persona_category": "Investor", "seniority": "Partner",
+                              "primary_expertise": "Seed investing", "industry_verticals": "FinTech; Health Tech",
+                              "actively_advising_startups": "Yes", "open_to_outreach": "no"})
+    assert investor["is_investor"] == 1 and investor["is_technical"] == 0
+    assert investor["seniority_band"] == "executive"
+    assert json.loads(investor["industry_tags"]) == ["fintech", "healthtech"]
+    assert (investor["advising"], investor["open_to_outreach"]) == (1, 0)
+
+    engineer = derive_facets({"current_title": "VP Engineering", "current_company": "Acme",
+                              "persona_category": "Operator", "seniority": "VP",
+                              "primary_expertise": "Distributed systems"})
+    assert (engineer["is_investor"], engineer["is_operator"], engineer["is_technical"]) == (0, 1, 1)
+    assert engineer["seniority_band"] == "vp"
+    assert engineer["industry_tags"] == "[]"
+
+    seller = derive_facets({"current_title": "Head of Sales", "current_company": "Summit Capital",
+                            "persona_category": "Operator"})
+    assert (seller["is_investor"], seller["is_operator"]) == (0, 1)
+
+
+def test_industry_tags_normalization():
+    assert industry_tags("Enterprise SaaS, Supply Chain & Logistics / FinTech, fintech") == [
+        "enterprise saas", "supply chain and logistics", "fintech"]
+    assert industry_tags("Healthcare and Real Estate") == ["healthcare", "real estate"]
+    assert industry_tags(None) == []
+
+
+@pytest.mark.parametrize("ask,expected", [
+    ("We're raising our seed round and want intros to investors", INVESTORS),
+    ("Any angels who back climate hardware?", INVESTORS),
+    ("Looking for someone technical to review our ML architecture", TECHNICAL),
+    ("Need a CTO-level advisor on infrastructure scaling", TECHNICAL),
+    ("I need advice on our enterprise sales motion", None),
+    ("We're raising and want feedback on our pricing from customers", None),  # practitioners wanted
+    ("Investors or engineers who know robotics", None),  # conflicting requirements
+])
+def test_filter_for_ask(ask, expected):
+    assert filter_for_ask(ask) == expected
+
+
+def _network(tmp_path, n_investors=70, n_operators=40):
+    from src.db import migrate_network_db
+    from tests.test_fixtures import build_network_db
+
+    contacts = [{"contact_id": i, "full_name": f"Investor {i}", "current_title": "Partner",
+                 "persona_category": "Investor", "current_company": "Fund"} for i in range(1, n_investors + 1)]
+    contacts += [{"contact_id": n_investors + i, "full_name": f"Operator {i}"} for i in range(1, n_operators + 1)]
+    db_path = build_network_db(str(tmp_path / "network.db"), contacts)
+    migrate_network_db(db_path)
+    return db_path
+
+
+def test_facets_sync_incrementally(tmp_path, monkeypatch):
+    import sqlite3
+    import src.facets as facets
+    from src.db import get_contact_ids_by_facets
+
+    db_path = _network(tmp_path)
+    assert facets.sync_facets(db_path)
+    assert len(get_contact_ids_by_facets(db_path, "is_investor = 1")) == 70
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE contacts SET current_title = 'Head of Sales', persona_category = 'Operator', "
+                 "current_company = 'Acme' WHERE contact_id = 3")
+    conn.execute("DELETE FROM person_research WHERE contact_id = 4")
+    conn.commit()
+    conn.close()
+
+    def full_read(path):
+        raise AssertionError("incremental sync must not re-read the whole network")
+
+    reread = []
+    real_by_ids = facets.get_enriched_contacts_by_ids
+    monkeypatch.setattr(facets, "get_enriched_contacts", full_read)
+    monkeypatch.setattr(facets, "get_enriched_contacts_by_ids", lambda p, ids: reread.extend(ids) or real_by_ids(p, ids))
+    assert facets.sync_facets(db_path)
+    assert sorted(reread) == [3, 4]
+    investors = get_contact_ids_by_facets(db_path, "is_investor = 1")
+    assert len(investors) == 68 and not {3, 4} & investors
+    assert facets.sync_facets(db_path) and len(reread) == 2  # already current
+
+
+def test_prefilter_narrows_stage1_corpus(tmp_path):
+    from src.facets import facet_prefilter
+    from src.profiles import get_stage1_corpus
+
+    db_path = _network(tmp_path)
+    ids = facet_prefilter(db_path, "We're raising a seed round, who are the right investors?")
+    assert ids == frozenset(range(1, 71))
+    corpus = get_stage1_corpus(db_path, shuffle=False, only_ids=ids)
+    assert len(corpus.contact_ids) == 70 and "Operator" not in corpus.text
+    assert corpus.resolve(["c1", "c70", "c71"]) == [1, 70]  # aliases are dense over the subset
+
+    # Too few contacts left, or nothing obvious in the ask: screen everything
+    assert facet_prefilter(db_path, "Looking for someone technical on our data stack") is None
+    assert facet_prefilter(db_path, "I need advice on our enterprise sales motion") is None
@@ -87,3 +87,43 @@ TEST_CASES = [
         ],
     },
 ]
+
+
+def build_network_db(path: str, contacts: list[dict], companies: tuple[str, ...] = ("Aerium",)) -> str:
+    """Create a minimal network DB with the tables the pipeline reads. Returns path.
+
+    Each contact dict needs contact_id and full_name; other contact and
+    person_research columns are optional.
+    """
+    import sqlite3
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE contacts (contact_id INTEGER PRIMARY KEY, full_name, current_title, current_company,
+                               seniority, persona_category, contact_type, linkedin_url, city, state, country);
+        CREATE TABLE person_research (contact_id INTEGER PRIMARY KEY, primary_expertise, secondary_expertise,
+                                      industry_verticals, functional_depth, topics_discussed, conversation_hooks,
+                                      companies_founded, advisory_roles, actively_advising_startups,
+                                      open_to_outreach, engagement_style, warm_intro_potential,
+                                      shared_affiliations);
+        CREATE TABLE career_history (contact_id INTEGER, title, organization_name, start_date, end_date, is_current);
+        CREATE TABLE era30_companies (name, website, industry, funding_stage, one_liner, description);
+    """)
+    for c in contacts:
+        conn.execute(
+            "INSERT INTO contacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, '', '', '')",
+            (c["contact_id"], c["full_name"], c.get("current_title", "CEO"), c.get("current_company", "Acme"),
+             c.get("seniority", "C-Suite"), c.get("persona_category", "Operator"), c.get("contact_type", "Mentor"),
+             c.get("linkedin_url", "")),
+        )
+        conn.execute(
+            "INSERT INTO person_research (contact_id, primary_expertise, secondary_expertise, industry_verticals, "
+            "actively_advising_startups, open_to_outreach) VALUES (?, ?, ?, ?, ?, ?)",
+            (c["contact_id"], c.get("primary_expertise", "Sales"), c.get("secondary_expertise", ""),
+             c.get("industry_verticals", ""), c.get("actively_advising_startups", "yes"),
+             c.get("open_to_outreach", "yes")),
+        )
+    for name in companies:
+        conn.execute("INSERT INTO era30_companies VALUES (?, '', 'SaaS', 'Seed', '', '')", (name,))
+    conn.commit()
+    conn.close()
+    return path
@@ -0,0 +1,55 @@
+"""Tests for the metrics registry and endpoint (no LLM or Slack calls)."""
+import sys, os, urllib.request
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import src.metrics as metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = metrics.Histogram("test_latency_seconds", "Test latency", ("stage",), buckets=(1, 5))
+    for value in (0.5, 2.0, 3.0, 9.0):
+        hist.observe(value, stage="stage1")
+    lines = hist.render()
+    assert 'test_latency_seconds_bucket{stage="stage1",le="1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="stage1",le="5"} 3' in lines
+    assert 'test_latency_seconds_bucket{stage="stage1",le="+Inf"} 4' in lines
+    assert 'test_latency_seconds_count{stage="stage1"} 4' in lines
+    assert 'test_latency_seconds_sum{stage="stage1"} 14.5' in lines
+
+
+def test_in_flight_gauge_tracks_decorated_calls():
+    gauge = metrics.Gauge("test_in_flight", "Test gauge")
+    seen = []
+
+    @gauge.track_inprogress()
+    def work():
+        seen.append(gauge.value())
+
+    work()
+    assert seen == [1]
+    assert gauge.value() == 0
+
+
+def test_llm_call_hooks_count_calls_and_cache_hits():
+    before_calls = metrics.LLM_CALLS.value(backend="claude", stage="stage1")
+    before_hits = metrics.LLM_CACHE_HITS.value(backend="claude", stage="stage1")
+    metrics.record_llm_call("claude", "stage1", cache_read_tokens=50000)
+    metrics.record_llm_call("claude", "stage1", cache_read_tokens=0)
+    assert metrics.LLM_CALLS.value(backend="claude", stage="stage1") == before_calls + 2
+    assert metrics.LLM_CACHE_HITS.value(backend="claude", stage="stage1") == before_hits + 1
+
+
+def test_metrics_endpoint_serves_registry():
+    metrics.DEDUP_HITS.inc()
+    server = metrics.start_metrics_server(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            body = resp.read().decode()
+            assert resp.headers["Content-Type"].startswith("text/plain")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert "# TYPE era_stage_latency_seconds histogram" in body
+    assert "era_slack_dedup_hits_total" in body
+    assert "era_query_log_queue_depth" in body
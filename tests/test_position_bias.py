@@ -0,0 +1,39 @@
+"""Tests for the positional-bias harness (fake backend, no LLM calls)."""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.backends.replay import ReplayBackend, ReplayCache
+from scripts import position_bias
+from scripts.stage1_benchmark import CONFIGS
+from tests.test_fixtures import build_network_db
+from tests.test_stage1_benchmark import _IdOrderBackend
+
+
+def test_curve_exposes_head_of_list_bias_and_replay_caches(tmp_path):
+    db_path = build_network_db(str(tmp_path / "network.db"),
+                               [{"contact_id": i, "full_name": f"Contact {i}"} for i in range(1, 61)])
+    inner = _IdOrderBackend()
+    backend = ReplayBackend("claude", ReplayCache(str(tmp_path / "replay"), "record-missing"),
+                            lambda: inner, canonical_order=False)
+    strategies = [CONFIGS["db_order"], CONFIGS["shuffled"]]
+
+    summaries = position_bias.measure(backend, strategies, "enterprise sales", "Aerium", seeds=5,
+                                      db_path=db_path, bins=10, workers=4)
+    fixed, shuffled = summaries
+    # The fake screener keeps the first 20 of 60 profiles whatever the order
+    for summary in summaries:
+        assert summary["curve"][:3] == [1.0, 1.0, 1.0]
+        assert summary["curve"][4:] == [0.0] * 6
+    assert fixed["mean_jaccard"] == 1.0 and fixed["distinct_contacts"] == 3
+    assert shuffled["mean_jaccard"] < 1.0
+
+    # A rerun is served entirely from the response cache
+    recorded = backend.cache.stats["recorded"]
+    position_bias.measure(backend, strategies, "enterprise sales", "Aerium", seeds=5, db_path=db_path)
+    assert backend.cache.stats["recorded"] == recorded
+
+
+def test_corpus_positions():
+    positions = position_bias.corpus_positions("[ID:7] A\n\n[ID:3] B\n\n--- PROFILES ---\n\n[ID:9] C\n\n[ID:1] D")
+    assert positions == {7: 0.0, 3: 0.25, 9: 0.5, 1: 0.75}
+    assert position_bias.corpus_positions("[ID:c2] A\n\n[ID:c1] B") == {"c2": 0.0, "c1": 0.5}
@@ -127,3 +127,205 @@ def test_full_profiles_multiple():
 def test_full_profiles_invalid_id_skipped():
     full = get_full_profiles(DB_PATH, [-999])
     assert full == ""
+
+
+# --- Corpus cache tests (temporary DB) ---
+
+def test_compressed_corpus_cached_until_db_changes(tmp_path, monkeypatch):
+    import src.profiles as profiles
+    from tests.test_fixtures import build_network_db
+
+    db_path = str(tmp_path / "network.db")
+    build_network_db(db_path, [{"contact_id": 1, "full_name": "Ada"}, {"contact_id": 2, "full_name": "Grace"}])
+
+    calls = []
+    real = profiles.get_enriched_contacts
+    monkeypatch.setattr(profiles, "get_enriched_contacts", lambda p: calls.append(p) or real(p))
+
+    first = profiles.get_compressed_profiles(db_path, shuffle=False)
+    assert profiles.get_compressed_profiles(db_path, shuffle=False) == first
+    assert sorted(profiles.get_compressed_profiles(db_path).split("\n\n")) == sorted(first.split("\n\n"))
+    assert len(calls) == 1
+
+    os.remove(db_path)
+    build_network_db(db_path, [{"contact_id": i, "full_name": name}
+                               for i, name in enumerate(["Ada", "Grace", "Linus"], 1)])
+    os.utime(db_path, (0, 12345))
+    assert "Linus" in profiles.get_compressed_profiles(db_path, shuffle=False)
+    assert len(calls) == 2
+
+
+def test_corpus_rebuild_only_rereads_changed_contacts(tmp_path, monkeypatch):
+    import sqlite3
+    import src.profiles as profiles
+    from tests.test_fixtures import build_network_db
+
+    from src.db import migrate_network_db
+
+    db_path = build_network_db(str(tmp_path / "network.db"),
+                               [{"contact_id": i, "full_name": f"Contact {i}"} for i in range(1, 51)])
+    assert migrate_network_db(db_path)
+    assert profiles.refresh_corpus(db_path) == {"changed": 50, "removed": 0, "total": 50, "full": True}
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE person_research SET primary_expertise = 'Enterprise SaaS sales' WHERE contact_id = 3")
+    conn.execute("UPDATE person_research SET functional_depth = 'Deep' WHERE contact_id = 4")  # not in Stage 1
+    conn.execute("DELETE FROM person_research WHERE contact_id = 5")
+    conn.execute("INSERT INTO contacts (contact_id, full_name) VALUES (51, 'Newcomer')")
+    conn.execute("INSERT INTO person_research (contact_id, primary_expertise) VALUES (51, 'Fundraising')")
+    conn.commit()
+
+    def full_read(path):
+        raise AssertionError("incremental rebuild must not re-read the whole corpus")
+
+    reread = []
+    real_by_ids = profiles.get_enriched_contacts_by_ids
+    monkeypatch.setattr(profiles, "get_enriched_contacts", full_read)
+    monkeypatch.setattr(profiles, "get_enriched_contacts_by_ids", lambda p, ids: reread.extend(ids) or real_by_ids(p, ids))
+
+    assert profiles.refresh_corpus(db_path) == {"changed": 2, "removed": 1, "total": 50, "full": False}
+    assert sorted(reread) == [3, 4, 5, 51]
+    compressed = profiles.get_compressed_profiles(db_path, shuffle=False)
+    assert "Enterprise SaaS sales" in compressed and "[ID:51] Newcomer" in compressed
+    assert "[ID:5] " not in compressed
+
+    assert profiles.refresh_corpus(db_path)["changed"] == 0
+    conn.close()
+
+
+def test_corpus_reads_untracked_db_without_writing(tmp_path):
+    import sqlite3
+    import src.profiles as profiles
+    from tests.test_fixtures import build_network_db
+
+    db_path = build_network_db(str(tmp_path / "network.db"), [{"contact_id": 1, "full_name": "Ada"}])
+    conn = sqlite3.connect(db_path)
+    schema = conn.execute("SELECT name FROM sqlite_master ORDER BY name").fetchall()
+    assert profiles.refresh_corpus(db_path)["full"]
+    assert conn.execute("SELECT name FROM sqlite_master ORDER BY name").fetchall() == schema
+    conn.close()
+
+    missing = str(tmp_path / "missing.db")
+    assert profiles.get_contact_version(missing) is None
+    assert not os.path.exists(missing)
+
+
+def test_full_profile_cache_hits_and_invalidation(tmp_path, monkeypatch):
+    import sqlite3
+    import src.profiles as profiles
+    import src.query_log as ql
+    from tests.test_fixtures import build_network_db
+
+    from src.db import migrate_network_db
+
+    db_path = build_network_db(str(tmp_path / "network.db"),
+                               [{"contact_id": i, "full_name": f"Contact {i}"} for i in range(1, 11)])
+    migrate_network_db(db_path)
+    monkeypatch.setattr(profiles, "_full_profile_cache", profiles.LRUCache(4))
+    renders = []
+    real_render = profiles._render_full_profile
+    monkeypatch.setattr(profiles, "_render_full_profile", lambda p, cid: renders.append(cid) or real_render(p, cid))
+
+    first = profiles.get_full_profiles(db_path, [1, 2, 3])
+    assert profiles.get_full_profiles(db_path, [1, 2, 3]) == first
+    assert renders == [1, 2, 3]
+    stats = profiles.get_full_profile_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (3, 3, 0.5)
+
+    # A career change bumps the contact's version, so only that profile is re-rendered
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO career_history VALUES (2, 'VP Sales', 'Globex', '2019', NULL, 1)")
+    conn.commit()
+    conn.close()
+    assert "VP Sales @ Globex" in profiles.get_full_profiles(db_path, [1, 2, 3])
+    assert renders == [1, 2, 3, 2]
+
+    profiles.get_full_profiles(db_path, [4, 5, 6])
+    assert profiles.get_full_profile_cache_stats()["evictions"] == 3
+
+    # Prewarm from the query log's most frequent matches
+    monkeypatch.setattr(ql, "LOG_DB_PATH", str(tmp_path / "log.db"))
+    for ids in ([7, 8], [8, 9], [8, 7]):
+        ql.log_query(slack_user_id="U1", company_name="Aerium", ask_text="sales", result_type="matches",
+                     match_ids=ids).result(timeout=5)
+    assert ql.get_top_match_ids(2) == [8, 7]
+    assert profiles.prewarm_full_profiles(db_path, limit=2) == 2
+    renders.clear()
+    profiles.get_full_profiles(db_path, [8, 7])
+    assert renders == []
+
+
+def test_stage2_profile_budget_keeps_ask_relevant_sections():
+    from src.profiles import build_full_profile, estimate_tokens, format_full_profile, stage2_field_priority
+
+    profile = {"contact_id": 7, "full_name": "Dana", "current_title": "CTO", "current_company": "Acme",
+               "primary_expertise": "Distributed systems", "warm_intro_potential": "Knows every GC in fintech",
+               "topics_discussed": "war stories " * 200, "functional_depth": "Built payments infra at scale"}
+    career = [{"title": f"Role {i}", "organization_name": "Org"} for i in range(5)]
+    full = build_full_profile(profile, career)
+    assert full.text == format_full_profile(profile, career)
+    assert full.render(10_000) == full.text
+
+    intro = full.render(60, stage2_field_priority("warm intro to general counsel"))
+    assert estimate_tokens(intro) <= 60
+    assert intro.startswith("[ID:7] Dana\nTitle: CTO @ Acme")
+    assert "Warm Intro Potential" in intro and "Primary Expertise" in intro
+    assert "Topics Discussed" not in intro
+
+    # A chatty ask keeps the topics, cut down to the budget
+    chat = full.render(60, stage2_field_priority("someone to chat about war stories"))
+    assert estimate_tokens(chat) <= 60
+    assert "Topics Discussed: war stories" in chat and chat.count("war stories") < 200
+    # Kept sections stay in layout order
+    assert chat.index("Primary Expertise") < chat.index("Topics Discussed")
+
+
+def test_stage1_corpus_aliases_resolve_to_contact_ids(tmp_path):
+    import sqlite3
+    import src.profiles as profiles
+    from tests.test_fixtures import build_network_db
+
+    db_path = build_network_db(str(tmp_path / "network.db"),
+                               [{"contact_id": 1000 + i, "full_name": f"Contact {i}"} for i in range(1, 6)])
+    corpus = profiles.get_stage1_corpus(db_path, shuffle=False)
+    assert corpus.text.startswith("[ID:c1] Contact 1") and "[ID:1001]" not in corpus.text
+    # Unknown aliases (hallucinated) and repeats are dropped, order is kept
+    assert corpus.resolve(["c3", "c99", "c0", "c1", "c3"]) == [1003, 1001]
+    assert sorted(profiles.get_stage1_corpus(db_path, seed=7).resolve([f"c{n}" for n in range(1, 6)])) == \
+        list(range(1001, 1006))
+    # Bare numbers are never aliases, so a real contact ID can't land on whoever holds that alias
+    assert corpus.resolve([1, 2, "2", 1001]) == []
+
+    real = profiles.get_stage1_corpus(db_path, shuffle=False, aliases=False)
+    assert real.text == profiles.get_compressed_profiles(db_path, shuffle=False)
+    assert real.resolve([1002, 2, 1002]) == [1002]
+
+    # A patched corpus re-numbers its aliases; a snapshot keeps resolving against its own version
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM person_research WHERE contact_id = 1001")
+    conn.commit()
+    conn.close()
+    patched = profiles.get_stage1_corpus(db_path, shuffle=False)
+    assert patched.text.startswith("[ID:c1] Contact 2")
+    assert patched.resolve(["c1", "c5"]) == [1002]
+    assert corpus.resolve(["c1"]) == [1001]
+
+
+def test_stage1_corpus_renders_prompt_once(tmp_path):
+    import src.profiles as profiles
+    from src.backends.base import fill_profiles
+    from src.prompts import STAGE1_SYSTEM_PROMPT
+    from tests.test_fixtures import build_network_db
+
+    db_path = build_network_db(str(tmp_path / "network.db"),
+                               [{"contact_id": i, "full_name": f"Contact {i}"} for i in range(1, 206)])
+    corpus = profiles.get_stage1_corpus(db_path, seed=3)
+    assert "--- PROFILES 101-200 ---" in corpus.text
+    prompt = fill_profiles(STAGE1_SYSTEM_PROMPT, corpus)
+    assert prompt == STAGE1_SYSTEM_PROMPT.format(profiles=corpus.text)
+    assert fill_profiles(STAGE1_SYSTEM_PROMPT, corpus) is prompt
+    assert fill_profiles("<p>\n{profiles}\n</p>", corpus) == f"<p>\n{corpus.text}\n</p>"
+    assert fill_profiles("{profiles}!", profiles.Stage1Corpus((), (), frozenset(), True)) == "!"
+
+    # The unshuffled ordering is shared until the corpus changes
+    assert profiles.get_stage1_corpus(db_path, shuffle=False) is profiles.get_stage1_corpus(db_path, shuffle=False)
@@ -0,0 +1,89 @@
+"""Tests for opt-in pipeline profiling (no LLM calls)."""
+import sys, os, time, pstats
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from concurrent.futures import Future
+
+import src.profiling as profiling
+
+
+def _busy(secs):
+    end = time.time() + secs
+    while time.time() < end:
+        sum(range(1000))
+
+
+def test_disabled_by_default(tmp_path):
+    with profiling.maybe_profile(profile_dir=str(tmp_path)) as session:
+        _busy(0.01)
+    assert session is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cprofile_named_after_query_log_id(tmp_path):
+    log_future = Future()
+    with profiling.maybe_profile(force=True, mode="cprofile", profile_dir=str(tmp_path)):
+        _busy(0.01)
+        profiling.attach_query_log(log_future)
+    assert [p.name.startswith("pending-") for p in tmp_path.iterdir()] == [True]
+
+    log_future.set_result(42)
+    path = tmp_path / "query-42.prof"
+    assert path.exists()
+    assert any(func[2] == "_busy" for func in pstats.Stats(str(path)).stats)
+
+
+def test_sampling_writes_collapsed_stacks(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_INTERVAL", 0.001)
+    with profiling.maybe_profile(force=True, mode="sampling", profile_dir=str(tmp_path)) as session:
+        _busy(0.1)
+    lines = session.path.read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert "test_profiling.py:_busy" in stack
+    assert int(count) > 0
+
+
+def test_rotation_drops_oldest_profiles(tmp_path):
+    for i in range(5):
+        path = tmp_path / f"query-{i}.prof"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (i, i))
+    profiling._rotate(tmp_path, max_bytes=250)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["query-3.prof", "query-4.prof"]
+
+
+def test_profiling_failures_never_fail_the_run(tmp_path, monkeypatch):
+    def refuse(self):
+        raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(profiling.cProfile.Profile, "enable", refuse)
+    with profiling.maybe_profile(force=True, mode="cprofile", profile_dir=str(tmp_path)) as session:
+        assert profiling._current_session.get() is None
+    assert session is None
+    monkeypatch.undo()
+
+    def fail_rotate(profile_dir, max_bytes):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(profiling, "_rotate", fail_rotate)
+    with profiling.maybe_profile(force=True, mode="cprofile", profile_dir=str(tmp_path)) as session:
+        _busy(0.01)
+    assert session is not None
+    assert profiling._current_session.get() is None
+
+
+def test_rotation_ignores_files_deleted_concurrently(tmp_path, monkeypatch):
+    for i in range(3):
+        path = tmp_path / f"query-{i}.prof"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (i, i))
+    real_unlink = profiling.Path.unlink
+
+    def racing_unlink(self, *args, **kwargs):
+        real_unlink(self, *args, **kwargs)
+        raise FileNotFoundError(self)  # as if another session removed it first
+
+    monkeypatch.setattr(profiling.Path, "unlink", racing_unlink)
+    profiling._rotate(tmp_path, max_bytes=150)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["query-2.prof"]
@@ -1,5 +1,5 @@
 """Tests for query logging (no LLM or Slack calls)."""
-import sys, os, sqlite3, tempfile
+import sys, os, sqlite3, tempfile, threading, time
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 import src.query_log as ql
@@ -19,7 +19,7 @@ def test_log_query_matches(tmp_path):
         ask_text="find me sales people", result_type="matches",
         match_ids=[10, 20, 30], match_names=["A", "B", "C"],
         clarity_secs=1.5, stage1_secs=10.0, stage2_secs=5.0, total_secs=16.5,
-    )
+    ).result(timeout=5)
     assert rid >= 1
 
     conn = sqlite3.connect(db_path)
@@ -42,7 +42,7 @@ def test_log_query_clarification(tmp_path):
         ask_text="help?", result_type="clarification",
         clarifying_question="What kind of help?",
         clarity_secs=2.0, total_secs=2.0,
-    )
+    ).result(timeout=5)
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
     row = dict(conn.execute("SELECT * FROM query_log WHERE id=?", (rid,)).fetchone())
@@ -57,11 +57,12 @@ def test_log_feedback(tmp_path):
     db_path = _use_temp_db(tmp_path)
     ql.log_query(
         slack_user_id="U789", company_name="Passu",
-        ask_text="credit experts", result_type="matches",
+        ask_text="credit experts", result_type="matches", channel="C123", message_ts="123.456",
     )
     ql.log_feedback(
         slack_user_id="U789", channel="C123", message_ts="123.456", reaction="+1",
     )
+    ql.flush(timeout=5)
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
     row = dict(conn.execute("SELECT * FROM query_log WHERE slack_user_id='U789'").fetchone())
@@ -70,12 +71,16 @@ def test_log_feedback(tmp_path):
     assert row["feedback"] == "+1"
 
 
-def test_multiple_queries_feedback_updates_latest(tmp_path):
+def test_multiple_queries_feedback_updates_reacted_message(tmp_path):
     db_path = _use_temp_db(tmp_path)
-    rid1 = ql.log_query(slack_user_id="U999", company_name="Aerium", ask_text="first", result_type="matches")
-    rid2 = ql.log_query(slack_user_id="U999", company_name="Aerium", ask_text="second", result_type="matches")
+    rid1 = ql.log_query(slack_user_id="U999", company_name="Aerium", ask_text="first", result_type="matches",
+                        channel="C1", message_ts="1.0")
+    rid2 = ql.log_query(slack_user_id="U999", company_name="Aerium", ask_text="second", result_type="matches",
+                        channel="C1", message_ts="2.0")
 
-    ql.log_feedback(slack_user_id="U999", channel="C1", message_ts="1.0", reaction="-1")
+    ql.log_feedback(slack_user_id="U999", channel="C1", message_ts="2.0", reaction="-1")
+    ql.flush(timeout=5)
+    rid1, rid2 = rid1.result(), rid2.result()
 
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
@@ -85,3 +90,244 @@ def test_multiple_queries_feedback_updates_latest(tmp_path):
 
     assert row1["feedback"] is None
     assert row2["feedback"] == "-1"
+
+
+def _insert_params(ask_text):
+    """Parameters for _INSERT_QUERY with only the required columns set."""
+    return (time.time(), "U1", None, ask_text, "matches") + (None,) * (ql._INSERT_QUERY.count("?") - 5)
+
+
+def test_writer_batches_rows_into_transactions(tmp_path):
+    db_path = _use_temp_db(tmp_path)
+    writer = ql.QueryLogWriter(batch_size=10, flush_interval=5.0)
+    futures = [
+        writer.submit(ql._INSERT_QUERY, _insert_params(f"ask {i}"))
+        for i in range(25)
+    ]
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert [f.result() for f in futures] == list(range(1, 26))
+    stats = writer.stats()
+    assert stats["written"] == 25
+    assert stats["batches"] <= 3
+    assert stats["dropped"] == 0
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("SELECT COUNT(*) FROM query_log").fetchone()[0] == 25
+    conn.close()
+
+
+def test_writer_drops_when_queue_full(tmp_path, monkeypatch):
+    _use_temp_db(tmp_path)
+    writer = ql.QueryLogWriter(max_queue=1, batch_size=1, flush_interval=0.0)
+    # Stall the writer so the queue stays full
+    release = threading.Event()
+    write_batch = writer._write_batch
+    monkeypatch.setattr(writer, "_write_batch", lambda batch: (release.wait(5), write_batch(batch)))
+    futures = [
+        writer.submit(ql._INSERT_QUERY, _insert_params("ask"))
+        for _ in range(5)
+    ]
+    release.set()
+    writer.flush(timeout=5)
+    writer.close()
+
+    stats = writer.stats()
+    assert stats["dropped"] >= 3
+    assert stats["written"] + stats["dropped"] == 5
+    assert any(f.result() is None for f in futures)
+
+
+def test_writer_survives_failed_batch_and_bounds_flush(tmp_path, monkeypatch):
+    _use_temp_db(tmp_path)
+    writer = ql.QueryLogWriter(max_queue=1, batch_size=1, flush_interval=0.0)
+    connection = writer._connection
+    failures = [RuntimeError("disk on fire")]
+
+    def flaky_connection():
+        if failures:
+            raise failures.pop()
+        return connection()
+
+    monkeypatch.setattr(writer, "_connection", flaky_connection)
+    bad = writer.submit(ql._INSERT_QUERY, _insert_params("fails"))
+    assert isinstance(bad.exception(timeout=5), RuntimeError)
+    good = writer.submit(ql._INSERT_QUERY, _insert_params("after the failure"))
+    assert good.result(timeout=5) == 1
+    assert writer.stats()["errors"] == 1
+
+    # With the writer stalled and the queue full, flush and close give up instead of blocking
+    entered, release = threading.Event(), threading.Event()
+    write_batch = writer._write_batch
+    monkeypatch.setattr(writer, "_write_batch",
+                        lambda batch: (entered.set(), release.wait(5), write_batch(batch)))
+    writer.submit(ql._INSERT_QUERY, _insert_params("stalled"))
+    assert entered.wait(5)
+    writer.submit(ql._INSERT_QUERY, _insert_params("queued"))
+    t0 = time.monotonic()
+    assert writer.flush(timeout=0.2) is False
+    writer.close(timeout=0.2)
+    assert time.monotonic() - t0 < 2
+    release.set()
+    assert writer.flush(timeout=5)
+    writer.close()
+
+
+def test_writer_retries_failed_batch_row_by_row(tmp_path):
+    db_path = _use_temp_db(tmp_path)
+    writer = ql.QueryLogWriter(batch_size=3, flush_interval=5.0)
+    first = writer.submit(ql._INSERT_QUERY, _insert_params("first"))
+    bad = writer.submit(ql._INSERT_QUERY, _insert_params("bad")[:-1])  # one binding short
+    last = writer.submit(ql._INSERT_QUERY, _insert_params("last"))
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert isinstance(bad.exception(timeout=5), sqlite3.ProgrammingError)
+    assert first.result() and last.result()
+    stats = writer.stats()
+    assert (stats["written"], stats["errors"]) == (2, 1)
+    conn = sqlite3.connect(db_path)
+    assert [r[0] for r in conn.execute("SELECT ask_text FROM query_log ORDER BY id")] == ["first", "last"]
+    conn.close()
+
+
+def test_feedback_attributed_by_message_ts(tmp_path):
+    db_path = _use_temp_db(tmp_path)
+    rid1 = ql.log_query(slack_user_id="U1", company_name="Aerium", ask_text="first",
+                        result_type="matches", channel="C1", message_ts="100.1")
+    rid2 = ql.log_query(slack_user_id="U1", company_name="Aerium", ask_text="second",
+                        result_type="matches", channel="C1", message_ts="100.2")
+
+    # Reaction to the older result while a newer ask exists
+    ql.log_feedback(slack_user_id="U1", channel="C1", message_ts="100.1", reaction="+1")
+    ql.flush(timeout=5)
+
+    conn = sqlite3.connect(db_path)
+    feedback = dict(conn.execute("SELECT id, feedback FROM query_log").fetchall())
+    plan = " ".join(str(row) for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM query_log WHERE channel = ? AND message_ts = ?", ("C1", "100.1")))
+    conn.close()
+
+    assert feedback[rid1.result()] == "+1"
+    assert feedback[rid2.result()] is None
+    assert "idx_query_log_message" in plan
+
+
+def test_existing_log_db_is_migrated(tmp_path):
+    db_path = _use_temp_db(tmp_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("""CREATE TABLE query_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp REAL NOT NULL,
+        slack_user_id TEXT, company_name TEXT, ask_text TEXT NOT NULL,
+        result_type TEXT NOT NULL, clarifying_question TEXT, match_ids TEXT,
+        match_names TEXT, clarity_secs REAL, stage1_secs REAL, stage2_secs REAL,
+        total_secs REAL, feedback TEXT, created_at TEXT DEFAULT (datetime('now')))""")
+    conn.execute("INSERT INTO query_log (timestamp, slack_user_id, ask_text, result_type) "
+                 "VALUES (1.0, 'U2', 'old ask', 'matches')")
+    conn.commit()
+    conn.close()
+
+    rid = ql.log_query(slack_user_id="U2", company_name="Passu", ask_text="new ask",
+                       result_type="matches", channel="C9", message_ts="200.5").result(timeout=5)
+    # A reaction on some unrelated message matches no row and changes nothing
+    ql.log_feedback(slack_user_id="U2", channel="C9", message_ts="999.9", reaction="-1")
+    ql.flush(timeout=5)
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(query_log)")}
+    indexes = {row["name"] for row in conn.execute("PRAGMA index_list(query_log)")}
+    new_row = dict(conn.execute("SELECT * FROM query_log WHERE id=?", (rid,)).fetchone())
+    feedback = [row[0] for row in conn.execute("SELECT feedback FROM query_log")]
+    conn.close()
+
+    assert {"channel", "message_ts"} <= columns
+    assert {"idx_query_log_user_time", "idx_query_log_message"} <= indexes
+    assert new_row["message_ts"] == "200.5"
+    assert feedback == [None, None]
+
+
+def _seed_latencies(db_path, now):
+    """Two days of matches: Aerium's stage 2 gets slower in the latest day."""
+    conn = ql._connect()
+    rows = []
+    for day, stage2 in ((1, 5.0), (0, 9.0)):
+        for i in range(10):
+            ts = now - day * 86400 - 60 * (i + 1)
+            rows.append((ts, "Aerium", "matches", "claude", 1.0, 10.0 + i, stage2 + i * 0.1, 20.0))
+            rows.append((ts, "Passu", "clarification", "gemini", 2.0, None, None, 2.0))
+    conn.executemany(
+        """INSERT INTO query_log (timestamp, company_name, result_type, backend, ask_text,
+               clarity_secs, stage1_secs, stage2_secs, total_secs)
+           VALUES (?, ?, ?, ?, 'ask', ?, ?, ?, ?)""",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_latency_report_percentiles_by_company(tmp_path):
+    from scripts.query_log_report import latency_report
+
+    db_path = _use_temp_db(tmp_path)
+    now = 1_700_000_000.0
+    _seed_latencies(db_path, now)
+
+    report = latency_report(db_path, window_secs=86400, windows=2, by="company", now=now)
+    rows = {(r["window"], r["group"], r["stage"]): r for r in report}
+
+    stage1 = rows[(0, "Aerium", "stage1")]
+    assert stage1["n"] == 10
+    assert (stage1["p50"], stage1["p90"], stage1["p99"]) == (14.0, 18.0, 19.0)
+    assert (0, "Passu", "stage1") not in rows
+    assert rows[(1, "Passu", "clarity")]["p99"] == 2.0
+
+
+def test_latency_report_flags_regressions_and_exports(tmp_path):
+    import json
+    from scripts.query_log_report import latency_report, find_regressions, main
+
+    db_path = _use_temp_db(tmp_path)
+    now = time.time()
+    _seed_latencies(db_path, now)
+
+    regressions = find_regressions(latency_report(db_path, 86400, 2, by="backend", now=now))
+    assert [(r["group"], r["stage"]) for r in regressions] == [("claude", "stage2")]
+
+    json_path = os.path.join(tmp_path, "report.json")
+    csv_path = os.path.join(tmp_path, "report.csv")
+    exit_code = main(["--db", db_path, "--windows", "2", "--by", "result_type",
+                      "--json", json_path, "--csv", csv_path])
+    assert exit_code == 1
+    with open(json_path) as f:
+        exported = json.load(f)
+    assert {r["group"] for r in exported["report"]} == {"matches", "clarification"}
+    with open(csv_path) as f:
+        assert f.readline().strip() == "window,window_start,window_end,group,stage,n,p50,p90,p99"
+
+
+def test_log_query_stores_usage_totals(tmp_path):
+    import json
+    from src.backends import LLMUsage
+
+    db_path = _use_temp_db(tmp_path)
+    usage = {
+        "clarity": LLMUsage(1, 500, 50, 0, 0, 0.01),
+        "stage1": LLMUsage(1, 1000, 200, 45000, 0, 0.02),
+        "stage2": LLMUsage(1, 8000, 900, 2000, 500, 0.04),
+    }
+    rid = ql.log_query(slack_user_id="U1", company_name="Aerium", ask_text="sales",
+                       result_type="matches", usage_by_stage=usage).result(timeout=5)
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    row = dict(conn.execute("SELECT * FROM query_log WHERE id=?", (rid,)).fetchone())
+    conn.close()
+
+    assert (row["input_tokens"], row["output_tokens"]) == (9500, 1150)
+    assert (row["cache_read_tokens"], row["cache_creation_tokens"]) == (47000, 500)
+    assert abs(row["cache_hit_ratio"] - 47000 / 57000) < 1e-9
+    assert abs(row["cost_usd"] - 0.07) < 1e-9
+    assert json.loads(row["usage_by_stage"])["stage1"]["cache_read_tokens"] == 45000
@@ -0,0 +1,112 @@
+"""Thread session store and follow-up refinement — no LLM calls."""
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+from src.sessions import SessionStore, ThreadSession, is_refinement
+
+
+def _session(ask="enterprise sales advice", company="Aerium"):
+    return ThreadSession(company, ask, [1, 2], [])
+
+
+def test_session_store_ttl_and_size_cap(monkeypatch):
+    import src.sessions as sessions_mod
+
+    clock = [100.0]
+    monkeypatch.setattr(sessions_mod.time, "monotonic", lambda: clock[0])
+    store = SessionStore(ttl=60, maxsize=2)
+    store.put("a", _session())
+    store.put("b", _session())
+    clock[0] += 30
+    assert store.get("a") is not None  # refreshes a's TTL and recency
+    store.put("c", _session())
+    assert store.get("b") is None and len(store) == 2
+
+    clock[0] += 45
+    assert store.get("a") is not None
+    clock[0] += 20
+    assert store.get("a") is not None
+    assert store.get("c") is None  # idle for 65 seconds
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("any of them in NYC?", True),
+    ("which of those has raised a Series A?", True),
+    ("only operators please", True),
+    ("prefer someone based in London", True),
+    ("none of them are in fintech", True),
+    ("are those people open to advising?", True),
+    ("founders who've sold to banks — they should know compliance", False),
+    ("someone to introduce them to our first customers", False),
+    ("I need help hiring our first enterprise AE in the US", False),
+    ("Looking for a fintech compliance expert", False),
+    ("who can help us with fundraising in Europe?", False),
+    ("which VCs invest in biotech?", False),
+    ("Looking for one investor in climate tech", False),
+    ("any intros to a GTM leader at a fintech?", False),
+    ("someone who knows hardware supply chain", False),
+])
+def test_is_refinement(text, expected):
+    assert is_refinement(text) is expected
+
+
+def test_refinement_reranks_cached_candidates_only(fake_pipeline):
+    matching, db_path, calls = fake_pipeline
+    first = matching.run_matching_pipeline("enterprise sales advice", "Aerium", db_path, thread="C1:1.0")
+    assert [m["contact_id"] for m in first["matches"]] == [1, 2, 3]
+    assert [c[0] for c in calls] == ["clarity", "stage1", "stage2"]
+    cached = matching.sessions.get("C1:1.0")
+    assert len(cached.candidate_ids) == 5
+
+    calls.clear()
+    refined = matching.run_matching_pipeline("any of them in NYC?", "Aerium", db_path, thread="C1:1.0")
+    assert [m["contact_id"] for m in refined["matches"]] == [1]
+    assert calls == [("stage2", "enterprise sales advice\nFollow-up: any of them in NYC?")]
+    assert set(refined["usage"]) == {"stage2"}
+    assert matching.sessions.get("C1:1.0").refinements == 1
+
+    # Other threads, other companies and fresh asks run the full pipeline
+    for ask, company, thread in (("any of them in NYC?", "Aerium", "C1:2.0"),
+                                 ("any of them in NYC?", "Passu", "C1:1.0"),
+                                 ("Looking for a fintech compliance expert", "Aerium", "C1:1.0")):
+        calls.clear()
+        matching.run_matching_pipeline(ask, company, db_path, thread=thread)
+        assert [c[0] for c in calls] == ["clarity", "stage1", "stage2"]
+
+
+def test_refinement_rerenders_profiles_for_the_follow_up(fake_pipeline, monkeypatch):
+    matching, db_path, calls = fake_pipeline
+    rendered = []
+    real_get_full_profiles = matching.get_full_profiles
+    monkeypatch.setattr(matching, "get_full_profiles", lambda db, ids, budget, priority: rendered.append(
+        (list(ids), priority)) or real_get_full_profiles(db, ids, budget, priority))
+
+    matching.run_matching_pipeline("enterprise sales advice", "Aerium", db_path, thread="C1:1.0")
+    matching.run_matching_pipeline("any of them in NYC?", "Aerium", db_path, thread="C1:1.0")
+    (first_ids, first_priority), (refined_ids, refined_priority) = rendered
+    assert refined_ids == first_ids
+    # The follow-up asks about location, so a tight budget must keep it this time
+    assert refined_priority.index("location") < first_priority.index("location")
+
+
+def test_refinement_with_no_fit_falls_back_to_full_pipeline(fake_pipeline):
+    matching, db_path, calls = fake_pipeline
+    matching.run_matching_pipeline("enterprise sales advice", "Aerium", db_path, thread="C1:1.0")
+    calls.clear()
+    result = matching.run_matching_pipeline("any of them on Mars?", "Aerium", db_path, thread="C1:1.0")
+    assert [c[0] for c in calls] == ["stage2", "clarity", "stage1", "stage2"]
+
+    # The abandoned refinement's Stage 2 call is still counted against this query
+    import json
+    import sqlite3
+    import src.query_log as ql
+
+    assert set(result["usage"]) == {"refinement", "clarity", "stage1", "stage2"}
+    ql.flush(timeout=5)
+    with sqlite3.connect(ql.LOG_DB_PATH) as conn:
+        usage, input_tokens = conn.execute("SELECT usage_by_stage, input_tokens FROM query_log "
+                                           "ORDER BY id DESC LIMIT 1").fetchone()
+    assert json.loads(usage)["refinement"]["calls"] == 1
+    assert input_tokens == sum(u["input_tokens"] for u in result["usage"].values())
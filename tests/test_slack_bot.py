@@ -129,3 +129,50 @@ def test_max_ask_length_is_positive():
     """MAX_ASK_LENGTH config is a positive integer."""
     assert isinstance(MAX_ASK_LENGTH, int)
     assert MAX_ASK_LENGTH > 0
+
+
+def test_extract_profile_debug_flag():
+    """A --profile flag is stripped from the ask and turns profiling on."""
+    from src.slack_bot import _extract_debug_flags
+    assert _extract_debug_flags("enterprise sales --profile") == ("enterprise sales", True)
+    assert _extract_debug_flags("enterprise sales") == ("enterprise sales", False)
+
+
+def test_import_defers_slack_and_pipeline():
+    """Importing the bot module does not pull in slack_bolt or the matching pipeline."""
+    import subprocess
+    root = os.path.join(os.path.dirname(__file__), "..")
+    code = "import sys, src.slack_bot; print('slack_bolt' in sys.modules, 'src.matching' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ["False", "False"]
+
+
+def test_warm_up_builds_caches(tmp_path, monkeypatch):
+    """warm_up() initializes the backend and caches the corpus and company list."""
+    import sqlite3
+    import src.slack_bot as bot
+    import src.matching as matching
+    import src.profiles as profiles
+
+    db_path = str(tmp_path / "network.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE contacts (contact_id INTEGER PRIMARY KEY, full_name, current_title, current_company, "
+                 "seniority, persona_category, contact_type, linkedin_url)")
+    conn.execute("CREATE TABLE person_research (contact_id, primary_expertise, secondary_expertise, "
+                 "industry_verticals, actively_advising_startups, open_to_outreach)")
+    conn.execute("CREATE TABLE era30_companies (name, website, industry, funding_stage, one_liner, description)")
+    conn.execute("INSERT INTO contacts VALUES (1, 'Ada', 'CEO', 'Acme', '', 'Operator', '', '')")
+    conn.execute("INSERT INTO person_research VALUES (1, 'Sales', '', '', 'yes', 'yes')")
+    conn.execute("INSERT INTO era30_companies VALUES ('Aerium', '', 'SaaS', 'Seed', '', '')")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(bot, "DB_PATH", db_path)
+    monkeypatch.setattr(bot, "_company_options_cache", None)
+    monkeypatch.setattr(matching, "_backend", object())
+
+    timings = bot.warm_up(warm_prompt_cache=False)
+    assert {"import_slack_bolt", "import_matching", "backend", "corpus", "companies", "total"} <= set(timings)
+    assert db_path in profiles._corpus_cache
+    assert bot._company_options()[0]["value"] == "Aerium"
+    assert bot._company_options_cache is not None
@@ -0,0 +1,80 @@
+"""Tests for the Stage 1 recall benchmark (fake backend, no LLM calls)."""
+import sys, os, re
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import src.matching as matching
+from src.backends.base import LLMBackend, LLMUsage
+from src.profiles import get_compressed_profiles
+from scripts import stage1_benchmark as bench
+from tests.test_fixtures import build_network_db
+
+_IDS = re.compile(r"\[ID:(c?\d+)\]")
+
+
+class _IdOrderBackend(LLMBackend):
+    """Stage 2 ranks higher contact IDs first; Stage 1 keeps the first 20 profiles it reads."""
+
+    def __init__(self):
+        super().__init__()
+        self.rank_calls = 0
+
+    def assess_clarity(self, ask, company_context, system_prompt, response_schema):
+        return {"is_clear": True, "clarifying_question": None}, LLMUsage()
+
+    def screen_candidates(self, ask, company_context, compressed_profiles, system_prompt, response_schema):
+        ids = [int(i) if i.isdigit() else i for i in _IDS.findall(compressed_profiles)]
+        return ids[:20], LLMUsage(1, len(compressed_profiles) // 4, 100, 0, 0, 0.01)
+
+    def rank_matches(self, ask, company_context, full_profiles, system_prompt, response_schema, top_k):
+        self.rank_calls += 1
+        ids = sorted((int(i) for i in _IDS.findall(full_profiles)), reverse=True)[:top_k]
+        matches = [{"contact_id": i, "name": "", "title": "", "company": "", "linkedin_url": "",
+                    "explanation": "", "conversation_hooks": ""} for i in ids]
+        return {"matches": matches, "notes": ""}, LLMUsage()
+
+
+def test_recall_vs_cost_table(tmp_path, monkeypatch):
+    db_path = build_network_db(str(tmp_path / "network.db"),
+                               [{"contact_id": i, "full_name": f"Contact {i}"} for i in range(1, 61)])
+    backend = _IdOrderBackend()
+    monkeypatch.setattr(matching, "_backend", backend)
+    cases = [{"id": "sales", "ask": "enterprise sales", "company": "Aerium"}]
+    reverse = bench.Stage1Config(
+        "reverse", lambda db, seed, ask: "\n\n".join(reversed(get_compressed_profiles(db, shuffle=False).split("\n\n"))))
+    cache_path = str(tmp_path / "reference.json")
+
+    rows = bench.run_benchmark([bench.CONFIGS["db_order"], reverse], cases, db_path, cache_path=cache_path)
+    by_config = {r["config"]: r for r in rows}
+    assert by_config["db_order"]["recall@10"] == 0.0
+    assert by_config["reverse"]["recall@3"] == by_config["reverse"]["recall@10"] == 1.0
+    assert by_config["reverse"]["candidates"] == 20
+    assert by_config["db_order"]["cost_usd"] == 0.01
+
+    # The reference ranking is computed once and then served from the cache file
+    calls = backend.rank_calls
+    bench.run_benchmark([reverse], cases, db_path, cache_path=cache_path)
+    assert backend.rank_calls == calls
+
+
+class _HallucinatingBackend(_IdOrderBackend):
+    """Stage 2 also returns an ID it was never shown, and repeats its top pick."""
+
+    def rank_matches(self, ask, company_context, full_profiles, system_prompt, response_schema, top_k):
+        result, usage = super().rank_matches(ask, company_context, full_profiles, system_prompt, response_schema,
+                                             top_k)
+        result["matches"] = [dict(result["matches"][0], contact_id=999)] + result["matches"] + result["matches"][:1]
+        return result, usage
+
+
+def test_reference_ranking_drops_unshown_ids(tmp_path, monkeypatch):
+    db_path = build_network_db(str(tmp_path / "network.db"),
+                               [{"contact_id": i, "full_name": f"Contact {i}"} for i in range(1, 61)])
+    monkeypatch.setattr(matching, "_backend", _HallucinatingBackend())
+    ranking = bench.reference_ranking("enterprise sales", "", db_path, cache_path=str(tmp_path / "reference.json"))
+    assert ranking == list(range(60, 50, -1))
+
+
+def test_recall_at_k():
+    assert bench.recall_at_k([5, 4, 3, 2], [4, 9, 2], 2) == 0.5
+    assert bench.recall_at_k([5, 4, 3, 2], [4, 9, 2], 4) == 0.5
+    assert bench.recall_at_k([], [1], 3) == 0.0
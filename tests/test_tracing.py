@@ -0,0 +1,113 @@
+"""Tests for the tracing layer (no LLM or Slack calls)."""
+import sys, os, json, sqlite3
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+import src.tracing as tracing
+from src.db import get_company_context
+
+
+@pytest.fixture
+def memory_tracing():
+    tracing.configure("memory")
+    tracing.clear()
+    yield
+    tracing.configure("none")
+    tracing.clear()
+
+
+def test_noop_when_disabled():
+    tracing.configure("none")
+    tracing.clear()
+    with tracing.span("outer") as s:
+        s.set_attribute("ignored", 1)
+    assert tracing.get_spans() == []
+
+
+def test_nested_spans_share_trace(memory_tracing):
+    with tracing.span("outer", ask="sales"):
+        with tracing.span("inner") as inner:
+            inner.set_attribute("rows", 3)
+
+    inner, outer = tracing.get_spans()
+    assert (outer.name, inner.name) == ("outer", "inner")
+    assert inner.trace_id == outer.trace_id
+    assert inner.parent_id == outer.span_id
+    assert outer.parent_id is None
+    assert inner.attributes == {"rows": 3}
+    assert outer.end_ns >= inner.end_ns
+
+
+def test_span_records_errors(memory_tracing):
+    with pytest.raises(ValueError):
+        with tracing.span("failing"):
+            raise ValueError("boom")
+    (failed,) = tracing.get_spans()
+    assert failed.status == "ERROR"
+    assert failed.attributes["exception.type"] == "ValueError"
+
+
+def test_otel_span_records_errors(monkeypatch):
+    from contextlib import nullcontext
+    StatusCode = pytest.importorskip("opentelemetry.trace").StatusCode
+
+    class FakeOtelSpan:
+        def __init__(self):
+            self.exceptions, self.status = [], None
+
+        def set_attribute(self, key, value):
+            pass
+
+        def record_exception(self, exc):
+            self.exceptions.append(exc)
+
+        def set_status(self, status):
+            self.status = status
+
+    otel_span = FakeOtelSpan()
+
+    class FakeTracer:
+        def start_as_current_span(self, name, attributes=None):
+            return nullcontext(otel_span)
+
+    monkeypatch.setattr(tracing, "_exporter", "otel")
+    monkeypatch.setattr(tracing, "_otel_tracer", FakeTracer())
+    error = ValueError("boom")
+    with pytest.raises(ValueError):
+        with tracing.span("failing"):
+            raise error
+    tracing.clear()
+    assert otel_span.exceptions == [error]
+    assert otel_span.status.status_code is StatusCode.ERROR
+
+
+def test_every_db_function_is_traced(memory_tracing, tmp_path):
+    import inspect
+    import src.db as db
+
+    public = [fn for name, fn in inspect.getmembers(db, inspect.isfunction)
+              if not name.startswith("_") and fn.__module__ == db.__name__]
+    assert public and all(hasattr(fn, "__wrapped__") for fn in public)
+
+    db.get_contact_version(os.path.join(tmp_path, "missing.db"))
+    assert [s.name for s in tracing.get_spans()] == ["db.get_contact_version"]
+
+
+def test_db_calls_are_traced_and_dumped(memory_tracing, tmp_path):
+    db_path = os.path.join(tmp_path, "network.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE era30_companies (name, website, industry, funding_stage, one_liner, description)")
+    conn.execute("INSERT INTO era30_companies VALUES ('Aerium', '', 'SaaS', 'Seed', '', '')")
+    conn.commit()
+    conn.close()
+
+    with tracing.span("pipeline"):
+        assert get_company_context(db_path, "aerium")["name"] == "Aerium"
+
+    trace_path = os.path.join(tmp_path, "trace.json")
+    assert tracing.dump_trace(trace_path) == 2
+    with open(trace_path) as f:
+        events = json.load(f)["traceEvents"]
+    by_name = {e["name"]: e for e in events}
+    assert by_name["db.get_company_context"]["args"]["parent_id"] == by_name["pipeline"]["args"]["span_id"]
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)